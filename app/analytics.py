@@ -0,0 +1,415 @@
+"""Agregaciones de ventas, clientes, envíos y stock resueltas en SQL.
+
+Cada función devuelve solo el resultado agregado (unas decenas de filas como
+mucho); los ``JOIN``, ``GROUP BY`` y el filtrado por ciudad, estado y fechas
+los hace la base de datos en lugar de traer las tablas completas a pandas.
+
+Las ventas se calculan como ``quantity * unit_price`` de cada partida, igual
+que en los paneles de Streamlit. Con ``SALES_ROLLUPS=1`` los indicadores de
+ventas se leen de los resúmenes diarios de ``app.rollups``, que dan el mismo
+resultado recorriendo muchas menos filas.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import String, case, func, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, join
+from sqlalchemy.sql.functions import FunctionElement
+
+from . import models, rollups
+
+DEFAULT_TOP = 10
+
+
+class month_of(FunctionElement):
+    """Mes de una fecha como texto ``YYYY-MM`` (PostgreSQL y SQLite)."""
+
+    type = String()
+    name = "month_of"
+    inherit_cache = True
+
+
+@compiles(month_of)
+def _month_of_default(element, compiler, **kw):
+    return "to_char(%s, 'YYYY-MM')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_of, "sqlite")
+def _month_of_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m', %s)" % compiler.process(element.clauses, **kw)
+
+
+@dataclass(frozen=True)
+class SalesFilters:
+    """Filtros comunes sobre pedidos: ciudad del cliente, estados y fechas."""
+
+    city: Optional[str] = None
+    statuses: tuple[str, ...] = ()
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def apply(
+        self,
+        query,
+        day=models.Order.order_date,
+        status=models.Order.status,
+        customer_id=models.Order.customer_id,
+    ):
+        """Añade los filtros a ``query`` usando las columnas indicadas.
+
+        Por defecto son las de ``orders``; con los resúmenes diarios se pasan
+        las equivalentes de ``daily_sales``/``daily_order_totals``.
+        """
+
+        if self.city is not None:
+            query = query.join(models.Customer, models.Customer.id == customer_id).filter(
+                models.Customer.city == self.city
+            )
+        if self.statuses:
+            # Coincidencia exacta, como /orders/?status=, para usar idx_orders_status
+            query = query.filter(status.in_(self.statuses))
+        if self.date_from is not None:
+            query = query.filter(day >= self.date_from)
+        if self.date_to is not None:
+            query = query.filter(day <= self.date_to)
+        return query
+
+
+NO_FILTERS = SalesFilters()
+
+
+@dataclass(frozen=True)
+class SalesSource:
+    """Origen de los indicadores de ventas: partidas en bruto o resúmenes diarios.
+
+    ``quantity`` y ``amount`` se suman para unidades e importe; ``order_count``
+    es ya el agregado del número de pedidos sobre ``orders_from`` y
+    ``orders_per_row`` lo que aporta cada fila a ese número (para sumarlo por
+    periodo con ``CASE``).
+    """
+
+    sales_from: object
+    day: object
+    status: object
+    customer_id: object
+    product_id: object
+    quantity: object
+    amount: object
+    orders_from: object
+    order_day: object
+    order_status: object
+    order_customer_id: object
+    order_count: object
+    orders_per_row: object
+
+    def sales_query(self, db: Session, filters: SalesFilters, *columns):
+        query = db.query(*columns).select_from(self.sales_from)
+        return filters.apply(query, self.day, self.status, self.customer_id)
+
+    def orders_query(self, db: Session, filters: SalesFilters, *columns):
+        query = db.query(*columns).select_from(self.orders_from)
+        return filters.apply(query, self.order_day, self.order_status, self.order_customer_id)
+
+
+RAW_SALES = SalesSource(
+    sales_from=join(
+        models.OrderItem, models.Order, models.Order.id == models.OrderItem.order_id
+    ),
+    day=models.Order.order_date,
+    status=models.Order.status,
+    customer_id=models.Order.customer_id,
+    product_id=models.OrderItem.product_id,
+    quantity=models.OrderItem.quantity,
+    amount=models.OrderItem.quantity * models.OrderItem.unit_price,
+    orders_from=models.Order,
+    order_day=models.Order.order_date,
+    order_status=models.Order.status,
+    order_customer_id=models.Order.customer_id,
+    order_count=func.count(models.Order.id),
+    orders_per_row=literal(1),
+)
+
+ROLLUP_SALES = SalesSource(
+    sales_from=models.DailySales,
+    day=models.DailySales.day,
+    status=models.DailySales.status,
+    customer_id=models.DailySales.customer_id,
+    product_id=models.DailySales.product_id,
+    quantity=models.DailySales.quantity,
+    amount=models.DailySales.total_sales,
+    orders_from=models.DailyOrderTotals,
+    order_day=models.DailyOrderTotals.day,
+    order_status=models.DailyOrderTotals.status,
+    order_customer_id=models.DailyOrderTotals.customer_id,
+    order_count=func.coalesce(func.sum(models.DailyOrderTotals.order_count), 0),
+    orders_per_row=models.DailyOrderTotals.order_count,
+)
+
+
+def sales_source(use_rollups: bool | None = None) -> SalesSource:
+    """Resúmenes diarios si están activados (``SALES_ROLLUPS``), si no partidas."""
+
+    if use_rollups is None:
+        use_rollups = rollups.ENABLED
+    return ROLLUP_SALES if use_rollups else RAW_SALES
+
+
+def get_summary(
+    db: Session, filters: SalesFilters = NO_FILTERS, source: SalesSource | None = None
+) -> dict:
+    source = source or sales_source()
+    total_sales = source.sales_query(
+        db, filters, func.coalesce(func.sum(source.amount), 0)
+    ).scalar()
+    orders = source.orders_query(db, filters, source.order_count).scalar()
+    return {
+        "total_sales": total_sales,
+        "orders": orders,
+        "customers": db.query(func.count(models.Customer.id)).scalar(),
+        "products": db.query(func.count(models.Product.id)).scalar(),
+    }
+
+
+def get_monthly_sales(
+    db: Session, filters: SalesFilters = NO_FILTERS, source: SalesSource | None = None
+) -> list[dict]:
+    source = source or sales_source()
+    month = month_of(source.day).label("month")
+    rows = (
+        source.sales_query(db, filters, month, func.sum(source.amount).label("total_sales"))
+        .group_by(month)
+        .order_by(month)
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_top_products(
+    db: Session,
+    filters: SalesFilters = NO_FILTERS,
+    limit: int = DEFAULT_TOP,
+    source: SalesSource | None = None,
+) -> list[dict]:
+    source = source or sales_source()
+    quantity = func.sum(source.quantity).label("quantity")
+    rows = (
+        source.sales_query(
+            db,
+            filters,
+            models.Product.id.label("product_id"),
+            models.Product.name,
+            quantity,
+            func.sum(source.amount).label("total_sales"),
+        )
+        .join(models.Product, models.Product.id == source.product_id)
+        .group_by(models.Product.id, models.Product.name)
+        .order_by(quantity.desc(), models.Product.id)
+        .limit(limit)
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_top_suppliers(
+    db: Session,
+    filters: SalesFilters = NO_FILTERS,
+    limit: int = DEFAULT_TOP,
+    source: SalesSource | None = None,
+) -> list[dict]:
+    source = source or sales_source()
+    total = func.sum(source.amount).label("total_sales")
+    rows = (
+        source.sales_query(
+            db,
+            filters,
+            models.Supplier.id.label("supplier_id"),
+            models.Supplier.name,
+            total,
+        )
+        .join(models.Product, models.Product.id == source.product_id)
+        .join(models.Supplier, models.Supplier.id == models.Product.supplier_id)
+        .group_by(models.Supplier.id, models.Supplier.name)
+        .order_by(total.desc(), models.Supplier.id)
+        .limit(limit)
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_customers_by_city(db: Session) -> list[dict]:
+    customers = func.count(models.Customer.id).label("customers")
+    rows = (
+        db.query(models.Customer.city, customers)
+        .group_by(models.Customer.city)
+        .order_by(customers.desc(), models.Customer.city)
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_shipment_status(db: Session, filters: SalesFilters = NO_FILTERS) -> list[dict]:
+    shipments = func.count(models.Shipment.id).label("shipments")
+    query = db.query(models.Shipment.delivery_status.label("status"), shipments)
+    if filters != NO_FILTERS:
+        query = filters.apply(
+            query.join(models.Order, models.Order.id == models.Shipment.order_id)
+        )
+    rows = query.group_by(models.Shipment.delivery_status).order_by(shipments.desc())
+    return [row._asdict() for row in rows]
+
+
+def get_stock_by_warehouse(db: Session) -> list[dict]:
+    rows = (
+        db.query(
+            models.Warehouse.id.label("warehouse_id"),
+            models.Warehouse.name,
+            func.coalesce(func.sum(models.Inventory.quantity_on_hand), 0).label(
+                "quantity_on_hand"
+            ),
+        )
+        .outerjoin(models.Inventory, models.Inventory.warehouse_id == models.Warehouse.id)
+        .group_by(models.Warehouse.id, models.Warehouse.name)
+        .order_by(models.Warehouse.name)
+    )
+    return [row._asdict() for row in rows]
+
+
+@dataclass(frozen=True)
+class Period:
+    date_from: date
+    date_to: date
+
+    def contains(self, column):
+        return column.between(self.date_from, self.date_to)
+
+    def previous(self) -> "Period":
+        """Periodo de la misma duración inmediatamente anterior."""
+
+        length = self.date_to - self.date_from
+        end = self.date_from - timedelta(days=1)
+        return Period(end - length, end)
+
+
+def _change(current, previous) -> dict:
+    delta = current - previous
+    percent = float(delta / previous * 100) if previous else None
+    return {"delta": delta, "percent": percent}
+
+
+def _period_totals(
+    db: Session, filters: SalesFilters, current: Period, previous: Period, source: SalesSource
+):
+    in_current = current.contains(source.day)
+    in_previous = previous.contains(source.day)
+    sales = source.sales_query(
+        db,
+        filters,
+        func.coalesce(func.sum(case((in_current, source.amount))), 0),
+        func.coalesce(func.sum(case((in_previous, source.amount))), 0),
+    ).filter(in_current | in_previous).one()
+
+    order_day = source.order_day
+    orders = source.orders_query(
+        db,
+        filters,
+        func.coalesce(
+            func.sum(case((current.contains(order_day), source.orders_per_row))),
+            0,
+        ),
+        func.coalesce(
+            func.sum(case((previous.contains(order_day), source.orders_per_row))),
+            0,
+        ),
+    ).filter(current.contains(order_day) | previous.contains(order_day)).one()
+
+    totals = []
+    for period, total_sales, order_count in zip((current, previous), sales, orders):
+        totals.append(
+            {
+                "date_from": period.date_from,
+                "date_to": period.date_to,
+                "total_sales": total_sales,
+                "orders": order_count,
+                "average_ticket": (
+                    (Decimal(total_sales) / order_count).quantize(Decimal("0.01"))
+                    if order_count
+                    else Decimal("0.00")
+                ),
+            }
+        )
+    return totals
+
+
+def _top_movers(
+    db: Session,
+    filters: SalesFilters,
+    current: Period,
+    previous: Period,
+    entity,
+    source_key,
+    limit: int,
+    source: SalesSource,
+) -> list[dict]:
+    """Filas de ``entity`` (productos o clientes) con mayor variación de ventas."""
+
+    in_current = current.contains(source.day)
+    in_previous = previous.contains(source.day)
+    current_sales = func.coalesce(func.sum(case((in_current, source.amount))), 0)
+    previous_sales = func.coalesce(func.sum(case((in_previous, source.amount))), 0)
+    delta = current_sales - previous_sales
+    query = source.sales_query(
+        db,
+        filters,
+        entity.id,
+        entity.name,
+        current_sales.label("current_sales"),
+        previous_sales.label("previous_sales"),
+        delta.label("delta"),
+    )
+    # El filtro por ciudad ya une ``customers``
+    if not (entity is models.Customer and filters.city is not None):
+        query = query.join(entity, entity.id == source_key)
+    rows = (
+        query.filter(in_current | in_previous)
+        .group_by(entity.id, entity.name)
+        .order_by(func.abs(delta).desc(), entity.id)
+        .limit(limit)
+    )
+    return [row._asdict() for row in rows]
+
+
+def compare_periods(
+    db: Session,
+    current: Period,
+    previous: Optional[Period] = None,
+    filters: SalesFilters = NO_FILTERS,
+    limit: int = DEFAULT_TOP,
+    source: SalesSource | None = None,
+) -> dict:
+    """Ventas, pedidos, ticket medio y mayores variaciones entre dos periodos.
+
+    Con ``SALES_ROLLUPS=1`` se resuelve con los resúmenes diarios
+    (``daily_sales`` y ``daily_order_totals``), cuyas claves primarias empiezan
+    por el día: cada periodo es un recorrido por rango de índice, sea cual sea
+    el histórico. Sin ellos (nadie vacía la cola de días pendientes y podrían
+    estar desfasados) se calcula con las partidas, como el resto de
+    indicadores. ``filters`` aplica ciudad y estados; las fechas las dan los
+    periodos.
+    """
+
+    source = source or sales_source()
+    previous = previous or current.previous()
+    current_totals, previous_totals = _period_totals(db, filters, current, previous, source)
+    return {
+        "current": current_totals,
+        "previous": previous_totals,
+        "change": {
+            field: _change(current_totals[field], previous_totals[field])
+            for field in ("total_sales", "orders", "average_ticket")
+        },
+        "products": _top_movers(
+            db, filters, current, previous, models.Product, source.product_id, limit, source
+        ),
+        "customers": _top_movers(
+            db, filters, current, previous, models.Customer, source.customer_id, limit, source
+        ),
+    }
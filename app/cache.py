@@ -0,0 +1,146 @@
+"""Caché en memoria para los datos de referencia (proveedores, categorías, almacenes).
+
+Estos catálogos cambian pocas veces al mes, así que los listados y las
+consultas por id se sirven desde memoria con el JSON ya serializado. Cada
+entrada caduca tras ``REFERENCE_CACHE_TTL`` segundos y cada caché guarda como
+mucho ``REFERENCE_CACHE_MAXSIZE`` entradas (se descartan las menos usadas).
+Cualquier commit que toque una de estas tablas vacía su caché, y los avisos
+de ``app.notifications`` hacen lo mismo con los cambios de otros procesos.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_MAXSIZE = int(os.getenv("REFERENCE_CACHE_MAXSIZE", "256"))
+
+
+class TTLCache:
+    """Diccionario LRU con caducidad por entrada y contadores de aciertos."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Sube con cada vaciado: una carga empezada antes no debe guardarse
+        self.generation = 0
+
+    def get(self, key: Hashable):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value, generation: int | None = None) -> None:
+        """Guarda ``value``; con ``generation``, solo si no se ha vaciado desde entonces."""
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Una caché por tabla de referencia, indexada por nombre de tabla
+reference_caches = {
+    table: TTLCache(table, REFERENCE_CACHE_TTL, REFERENCE_CACHE_MAXSIZE)
+    for table in ("suppliers", "categories", "warehouses")
+}
+
+
+def invalidate_table(table: str) -> None:
+    """Vacía la caché asociada a ``table`` (si la tabla tiene caché)."""
+
+    cache = reference_caches.get(table)
+    if cache is not None:
+        cache.clear()
+
+
+def invalidate_all() -> None:
+    for cache in reference_caches.values():
+        cache.clear()
+
+
+async def cached_json(
+    cache: TTLCache,
+    key: Hashable,
+    load: Callable[[], Awaitable[object]],
+    schema: type[BaseModel],
+) -> Response | None:
+    """Devuelve la respuesta JSON cacheada o la genera con ``load``.
+
+    Devuelve ``None`` (sin cachear nada) cuando ``load`` no encuentra el
+    registro, para que el endpoint responda 404. Si la caché se vacía mientras
+    ``load`` consulta, la respuesta se sirve pero no se guarda: podría ser
+    anterior al cambio que provocó el vaciado.
+    """
+
+    body = cache.get(key)
+    if body is None:
+        generation = cache.generation
+        result = await load()
+        if result is None:
+            return None
+        body = schema.model_validate(result, from_attributes=True).model_dump_json()
+        cache.set(key, body, generation)
+    return Response(content=body, media_type="application/json")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    tables = session.info.setdefault("changed_tables", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tables.add(instance.__table__.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tables(session):
+    for table in session.info.pop("changed_tables", ()):
+        invalidate_table(table)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
@@ -1,20 +1,167 @@
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from . import models, schemas
+from .fieldsets import FieldSelection, FieldSpec, Relation
+from .pagination import DEFAULT_PAGE_SIZE, Page, SortKey, paginate
+
+
+# Filas que se piden de cada vez al cursor del servidor en las exportaciones.
+STREAM_BATCH_SIZE = 1000
+
+# Orden de cada listado. El identificador cierra siempre la clave para que el
+# orden sea total y el cursor apunte a una única fila.
+SUPPLIER_SORT = (SortKey(models.Supplier.name), SortKey(models.Supplier.id))
+CATEGORY_SORT = (SortKey(models.Category.name), SortKey(models.Category.id))
+PRODUCT_SORT = (SortKey(models.Product.name), SortKey(models.Product.id))
+WAREHOUSE_SORT = (SortKey(models.Warehouse.name), SortKey(models.Warehouse.id))
+INVENTORY_SORT = (SortKey(models.Inventory.id),)
+CUSTOMER_SORT = (SortKey(models.Customer.name), SortKey(models.Customer.id))
+ORDER_SORT = (
+    SortKey(models.Order.order_date, descending=True),
+    SortKey(models.Order.id, descending=True),
+)
+SHIPMENT_SORT = (
+    SortKey(models.Shipment.shipped_at, descending=True, nulls_last=True),
+    SortKey(models.Shipment.id, descending=True),
+)
+
+# Opciones de carga de las relaciones que exponen los esquemas anidados. Las
+# relaciones muchos-a-uno se resuelven con JOIN en la misma consulta y las
+# colecciones con un SELECT ... IN adicional, de modo que el número de consultas
+# por petición es fijo e independiente del número de filas devueltas.
+PRODUCT_LOAD_OPTIONS = (
+    joinedload(models.Product.supplier),
+    joinedload(models.Product.category),
+)
+
+INVENTORY_LOAD_OPTIONS = (
+    joinedload(models.Inventory.product),
+    joinedload(models.Inventory.warehouse),
+)
+
+ORDER_LOAD_OPTIONS = (
+    joinedload(models.Order.customer),
+    selectinload(models.Order.items).joinedload(models.OrderItem.product),
+)
+
+SHIPMENT_LOAD_OPTIONS = (
+    joinedload(models.Shipment.order).joinedload(models.Order.customer),
+    joinedload(models.Shipment.warehouse),
+)
+
+# Campos y relaciones que se pueden pedir con ``?fields=`` / ``?include=``. Las
+# relaciones incluidas cargan solo las columnas de su esquema resumido.
+PRODUCT_FIELDS = FieldSpec(
+    models.Product,
+    schemas.Product,
+    {
+        "supplier": Relation(
+            joinedload(models.Product.supplier).load_only(
+                models.Supplier.id, models.Supplier.name
+            ),
+            schemas.SupplierSummary,
+        ),
+        "category": Relation(
+            joinedload(models.Product.category).load_only(
+                models.Category.id, models.Category.name
+            ),
+            schemas.CategorySummary,
+        ),
+    },
+)
+
+CUSTOMER_FIELDS = FieldSpec(models.Customer, schemas.Customer)
+
+ORDER_FIELDS = FieldSpec(
+    models.Order,
+    schemas.Order,
+    {
+        "customer": Relation(
+            joinedload(models.Order.customer).load_only(
+                models.Customer.id, models.Customer.name
+            ),
+            schemas.CustomerSummary,
+        ),
+        "items": Relation(
+            selectinload(models.Order.items)
+            .joinedload(models.OrderItem.product)
+            .load_only(models.Product.id, models.Product.name, models.Product.sku),
+            schemas.OrderItem,
+            many=True,
+        ),
+    },
+)
+
+
+def load_options(
+    selection: Optional[FieldSelection],
+    default: tuple,
+    sort: tuple[SortKey, ...] = (),
+) -> tuple:
+    """Opciones de carga: las por defecto o las de una selección de campos."""
+
+    if selection is None:
+        return default
+    return tuple(selection.load_options(tuple(key.name for key in sort)))
+
+
+# Criterios de filtrado de los listados, compartidos con las exportaciones y
+# con la ruta rápida de ``fastpath``.
+def product_filters(
+    supplier_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    only_active: bool = False,
+) -> list:
+    criteria = []
+    if supplier_id is not None:
+        criteria.append(models.Product.supplier_id == supplier_id)
+    if category_id is not None:
+        criteria.append(models.Product.category_id == category_id)
+    if only_active:
+        criteria.append(models.Product.is_active == "Y")
+    return criteria
+
+
+def inventory_filters(
+    warehouse_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+) -> list:
+    criteria = []
+    if warehouse_id is not None:
+        criteria.append(models.Inventory.warehouse_id == warehouse_id)
+    if product_id is not None:
+        criteria.append(models.Inventory.product_id == product_id)
+    return criteria
 
-from . import models
 
+def order_filters(status: Optional[str] = None) -> list:
+    return [models.Order.status == status] if status else []
 
-def get_suppliers(db: Session):
-    return db.query(models.Supplier).order_by(models.Supplier.name).all()
+
+def shipment_filters(status: Optional[str] = None) -> list:
+    return [models.Shipment.delivery_status == status] if status else []
+
+
+def get_suppliers(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    return paginate(db.query(models.Supplier), SUPPLIER_SORT, cursor, limit)
 
 
 def get_supplier(db: Session, supplier_id: int):
     return db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
 
 
-def get_categories(db: Session):
-    return db.query(models.Category).order_by(models.Category.name).all()
+def get_categories(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    return paginate(db.query(models.Category), CATEGORY_SORT, cursor, limit)
 
 
 def get_category(db: Session, category_id: int):
@@ -26,23 +173,44 @@ def get_products(
     supplier_id: Optional[int] = None,
     category_id: Optional[int] = None,
     only_active: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    selection: Optional[FieldSelection] = None,
+) -> Page:
+    query = (
+        db.query(models.Product)
+        .options(*load_options(selection, PRODUCT_LOAD_OPTIONS, PRODUCT_SORT))
+        .filter(*product_filters(supplier_id, category_id, only_active))
+    )
+    return paginate(query, PRODUCT_SORT, cursor, limit)
+
+
+def iter_products(db: Session, only_active: bool = False):
+    query = (
+        db.query(models.Product)
+        .options(*PRODUCT_LOAD_OPTIONS)
+        .filter(*product_filters(only_active=only_active))
+    )
+    return query.order_by(models.Product.id).yield_per(STREAM_BATCH_SIZE)
+
+
+def get_product(
+    db: Session, product_id: int, selection: Optional[FieldSelection] = None
 ):
-    query = db.query(models.Product)
-    if supplier_id is not None:
-        query = query.filter(models.Product.supplier_id == supplier_id)
-    if category_id is not None:
-        query = query.filter(models.Product.category_id == category_id)
-    if only_active:
-        query = query.filter(models.Product.is_active == "Y")
-    return query.order_by(models.Product.name).all()
-
+    return (
+        db.query(models.Product)
+        .options(*load_options(selection, PRODUCT_LOAD_OPTIONS))
+        .filter(models.Product.id == product_id)
+        .first()
+    )
 
-def get_product(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
 
-
-def get_warehouses(db: Session):
-    return db.query(models.Warehouse).order_by(models.Warehouse.name).all()
+def get_warehouses(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    return paginate(db.query(models.Warehouse), WAREHOUSE_SORT, cursor, limit)
 
 
 def get_warehouse(db: Session, warehouse_id: int):
@@ -53,40 +221,109 @@ def get_inventory(
     db: Session,
     warehouse_id: Optional[int] = None,
     product_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    query = (
+        db.query(models.Inventory)
+        .options(*INVENTORY_LOAD_OPTIONS)
+        .filter(*inventory_filters(warehouse_id, product_id))
+    )
+    return paginate(query, INVENTORY_SORT, cursor, limit)
+
+
+def iter_inventory(db: Session, warehouse_id: Optional[int] = None):
+    query = (
+        db.query(models.Inventory)
+        .options(*INVENTORY_LOAD_OPTIONS)
+        .filter(*inventory_filters(warehouse_id=warehouse_id))
+    )
+    return query.order_by(models.Inventory.id).yield_per(STREAM_BATCH_SIZE)
+
+
+def get_customers(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    selection: Optional[FieldSelection] = None,
+) -> Page:
+    query = db.query(models.Customer).options(
+        *load_options(selection, (), CUSTOMER_SORT)
+    )
+    return paginate(query, CUSTOMER_SORT, cursor, limit)
+
+
+def get_customer(
+    db: Session, customer_id: int, selection: Optional[FieldSelection] = None
 ):
-    query = db.query(models.Inventory)
-    if warehouse_id is not None:
-        query = query.filter(models.Inventory.warehouse_id == warehouse_id)
-    if product_id is not None:
-        query = query.filter(models.Inventory.product_id == product_id)
-    return query.order_by(models.Inventory.id).all()
-
+    return (
+        db.query(models.Customer)
+        .options(*load_options(selection, ()))
+        .filter(models.Customer.id == customer_id)
+        .first()
+    )
 
-def get_customers(db: Session):
-    return db.query(models.Customer).order_by(models.Customer.name).all()
 
-
-def get_customer(db: Session, customer_id: int):
-    return db.query(models.Customer).filter(models.Customer.id == customer_id).first()
-
-
-def get_orders(db: Session, status: Optional[str] = None):
-    query = db.query(models.Order)
-    if status:
-        query = query.filter(models.Order.status == status)
-    return query.order_by(models.Order.order_date.desc()).all()
-
-
-def get_order(db: Session, order_id: int):
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
-
-
-def get_shipments(db: Session, status: Optional[str] = None):
-    query = db.query(models.Shipment)
-    if status:
-        query = query.filter(models.Shipment.delivery_status == status)
-    return query.order_by(models.Shipment.shipped_at.desc().nullslast()).all()
+def get_orders(
+    db: Session,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    selection: Optional[FieldSelection] = None,
+) -> Page:
+    query = (
+        db.query(models.Order)
+        .options(*load_options(selection, ORDER_LOAD_OPTIONS, ORDER_SORT))
+        .filter(*order_filters(status))
+    )
+    return paginate(query, ORDER_SORT, cursor, limit)
+
+
+def iter_orders(db: Session, status: Optional[str] = None):
+    query = (
+        db.query(models.Order)
+        .options(*ORDER_LOAD_OPTIONS)
+        .filter(*order_filters(status))
+    )
+    return query.order_by(models.Order.id).yield_per(STREAM_BATCH_SIZE)
+
+
+def get_order(db: Session, order_id: int, selection: Optional[FieldSelection] = None):
+    return (
+        db.query(models.Order)
+        .options(*load_options(selection, ORDER_LOAD_OPTIONS))
+        .filter(models.Order.id == order_id)
+        .first()
+    )
+
+
+def get_shipments(
+    db: Session,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    query = (
+        db.query(models.Shipment)
+        .options(*SHIPMENT_LOAD_OPTIONS)
+        .filter(*shipment_filters(status))
+    )
+    return paginate(query, SHIPMENT_SORT, cursor, limit)
+
+
+def iter_shipments(db: Session, status: Optional[str] = None):
+    query = (
+        db.query(models.Shipment)
+        .options(*SHIPMENT_LOAD_OPTIONS)
+        .filter(*shipment_filters(status))
+    )
+    return query.order_by(models.Shipment.id).yield_per(STREAM_BATCH_SIZE)
 
 
 def get_shipment(db: Session, shipment_id: int):
-    return db.query(models.Shipment).filter(models.Shipment.id == shipment_id).first()
+    return (
+        db.query(models.Shipment)
+        .options(*SHIPMENT_LOAD_OPTIONS)
+        .filter(models.Shipment.id == shipment_id)
+        .first()
+    )
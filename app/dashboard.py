@@ -2,11 +2,15 @@
 # dashboard.py  –  Panel Streamlit Distribuidor
 # ===========================================
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
-import psycopg2
 import plotly.express as px
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # -------------------------------
 # 🧩 Configuración de conexión
@@ -20,18 +24,116 @@ DB_CONFIG = {
     "options": "-c client_encoding=LATIN1"
 }
 
+# Conexiones abiertas como máximo por proceso (compartidas entre sesiones)
+POOL_MAX_CONNECTIONS = 10
+CACHE_TTL = 300
+
 # -------------------------------
-# 📡 Función de conexión
+# 📡 Pool de conexiones
 # -------------------------------
-@st.cache_data(ttl=300)
+class BlockingPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool que espera a que haya una conexión libre.
+
+    El pool de psycopg2 lanza PoolError al agotarse; con varias sesiones de
+    Streamlit consultando a la vez es preferible esperar turno.
+    """
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        super().__init__(minconn, maxconn, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            conn = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        conn.autocommit = True  # solo lecturas: sin transacciones abiertas en el pool
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close=close or conn.closed)
+        finally:
+            self._slots.release()
+
+
+@st.cache_resource
+def get_pool():
+    # Un único pool por proceso, reutilizado en todas las sesiones y recargas
+    return BlockingPool(1, POOL_MAX_CONNECTIONS, cursor_factory=RealDictCursor, **DB_CONFIG)
+
+
+# -------------------------------
+# 📡 Consultas
+# -------------------------------
+@st.cache_data(ttl=CACHE_TTL)
 def run_query(query):
-    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
-    with conn.cursor() as cur:
-        cur.execute(query)
-        rows = cur.fetchall()
-    conn.close()
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query)
+            rows = cur.fetchall()
+    finally:
+        pool.putconn(conn)
     return pd.DataFrame(rows)
 
+
+def run_queries(queries):
+    """Lanza a la vez consultas independientes y devuelve {nombre: DataFrame | error}.
+
+    Cada consulta usa su propia conexión del pool y su propia entrada de caché
+    (los errores no se cachean), así que una carga en frío tarda lo que la
+    consulta más lenta y no la suma de todas. Los hilos reciben el contexto de
+    la ejecución actual: sin él ``st.cache_data`` avisa en cada recarga de que
+    falta el ScriptRunContext.
+    """
+    ctx = get_script_run_ctx()
+    workers = min(len(queries), POOL_MAX_CONNECTIONS)
+    with ThreadPoolExecutor(
+        max_workers=workers,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as executor:
+        futures = {name: executor.submit(run_query, query) for name, query in queries.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = e
+    return results
+
+
+DASHBOARD_QUERIES = {
+    "products": "SELECT COUNT(*) AS total FROM public.products;",
+    "clients": "SELECT COUNT(*) AS total FROM public.clients;",
+    "orders": "SELECT COUNT(*) AS total FROM public.orders;",
+    "sales": """
+        SELECT SUM(quantity * unit_price_net) AS total_sales
+        FROM public.order_items;
+    """,
+    "monthly": """
+        SELECT DATE_TRUNC('month', order_date) AS mes,
+               SUM(total_gross) AS ventas
+        FROM public.orders
+        GROUP BY mes
+        ORDER BY mes;
+    """,
+    "tab_products": "SELECT * FROM public.products LIMIT 100;",
+    "tab_clients": "SELECT * FROM public.clients LIMIT 100;",
+    "tab_orders": "SELECT * FROM public.orders LIMIT 100;",
+    "tab_items": """
+        SELECT o.id AS order_id, p.name AS product, oi.quantity, oi.unit_price_net,
+               (oi.quantity * oi.unit_price_net) AS subtotal
+        FROM public.order_items oi
+        JOIN public.orders o ON oi.order_id = o.id
+        JOIN public.products p ON oi.product_id = p.id
+        LIMIT 100;
+    """,
+}
+
 # -------------------------------
 # 🧭 Layout principal
 # -------------------------------
@@ -44,22 +146,24 @@ st.set_page_config(
 st.title("📦 Panel de Control – Distribución Mayorista")
 st.markdown("### Datos sincronizados desde *PostgreSQL → public schema*")
 
+data = run_queries(DASHBOARD_QUERIES)
+
+
+def result(name):
+    value = data[name]
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
 # -------------------------------
-# 🔍 Cargar métricas principales
+# 🔍 Métricas principales
 # -------------------------------
 try:
-    df_products = run_query("SELECT COUNT(*) AS total FROM public.products;")
-    df_clients = run_query("SELECT COUNT(*) AS total FROM public.clients;")
-    df_orders = run_query("SELECT COUNT(*) AS total FROM public.orders;")
-    df_items = run_query("""
-        SELECT SUM(quantity * unit_price_net) AS total_sales
-        FROM public.order_items;
-    """)
-
-    total_products = int(df_products.iloc[0]["total"])
-    total_clients = int(df_clients.iloc[0]["total"])
-    total_orders = int(df_orders.iloc[0]["total"])
-    total_sales = round(df_items.iloc[0]["total_sales"] or 0, 2)
+    total_products = int(result("products").iloc[0]["total"])
+    total_clients = int(result("clients").iloc[0]["total"])
+    total_orders = int(result("orders").iloc[0]["total"])
+    total_sales = round(result("sales").iloc[0]["total_sales"] or 0, 2)
 
     # KPIs
     col1, col2, col3, col4 = st.columns(4)
@@ -77,13 +181,7 @@ except Exception as e:
 # -------------------------------
 st.markdown("## 📈 Ventas por mes")
 try:
-    df_sales = run_query("""
-        SELECT DATE_TRUNC('month', order_date) AS mes,
-               SUM(total_gross) AS ventas
-        FROM public.orders
-        GROUP BY mes
-        ORDER BY mes;
-    """)
+    df_sales = result("monthly")
     if not df_sales.empty:
         fig = px.bar(df_sales, x="mes", y="ventas",
                      title="Evolución mensual de ventas (€)",
@@ -101,24 +199,12 @@ st.markdown("## 📊 Datos Detallados")
 
 tabs = st.tabs(["Productos", "Clientes", "Pedidos", "Items"])
 
-with tabs[0]:
-    st.dataframe(run_query("SELECT * FROM public.products LIMIT 100;"))
-
-with tabs[1]:
-    st.dataframe(run_query("SELECT * FROM public.clients LIMIT 100;"))
-
-with tabs[2]:
-    st.dataframe(run_query("SELECT * FROM public.orders LIMIT 100;"))
-
-with tabs[3]:
-    st.dataframe(run_query("""
-        SELECT o.id AS order_id, p.name AS product, oi.quantity, oi.unit_price_net,
-               (oi.quantity * oi.unit_price_net) AS subtotal
-        FROM public.order_items oi
-        JOIN public.orders o ON oi.order_id = o.id
-        JOIN public.products p ON oi.product_id = p.id
-        LIMIT 100;
-    """))
+for tab, name in zip(tabs, ["tab_products", "tab_clients", "tab_orders", "tab_items"]):
+    with tab:
+        try:
+            st.dataframe(result(name))
+        except Exception as e:
+            st.warning(f"No se pudo cargar la tabla: {e}")
 
 # -------------------------------
 # 🎯 Footer
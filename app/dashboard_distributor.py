@@ -1,14 +1,25 @@
 import os
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 import plotly.express as px
 
+import snapshot_cache
+
 # =======================================
-# ⚙️ CONFIGURACIÓN Y FIX DE CODIFICACIÓN
+# ⚙️ CONFIGURACIÓN
 # =======================================
+# Los textos se reparan una sola vez al cargar/sincronizar los datos
+# (scripts/repair_encoding.py), así que aquí se leen como UTF-8 sin más.
 os.environ["PYTHONIOENCODING"] = "utf-8"
-os.environ["PGCLIENTENCODING"] = "latin1"  # los datos están en ISO-8859-1
+
+# Segundos que se reutiliza el resultado de una consulta para los mismos filtros
+CACHE_TTL = 600
+
+# Con DASHBOARD_SNAPSHOTS=1 las ventas y el stock se calculan sobre una copia
+# local en Arrow de orders/order_items/inventories (app/snapshot_cache.py) que
+# sobrevive a los reinicios y solo pide a PostgreSQL las filas nuevas.
+SNAPSHOTS = os.getenv("DASHBOARD_SNAPSHOTS", "0").lower() in ("1", "true", "yes", "on")
 
 # =======================================
 # 🔗 CONEXIÓN A POSTGRESQL
@@ -19,43 +30,238 @@ DB_HOST = "localhost"
 DB_PORT = "5432"
 DB_NAME = "distributor_db"
 
-# Forzar conexión con latin1 (para leer acentos antiguos)
-engine = create_engine(
-    f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
-    connect_args={"client_encoding": "LATIN1"}
-)
+
+@st.cache_resource
+def get_engine():
+    # Un único engine (y su pool) por proceso, compartido por todas las sesiones
+    return create_engine(
+        f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+        connect_args={"client_encoding": "UTF8"},
+        pool_pre_ping=True,
+    )
+
+
+def read_sql(query, **params):
+    return pd.read_sql(text(query), get_engine(), params=params)
+
+
+@st.cache_resource
+def get_snapshots():
+    return snapshot_cache.SnapshotStore(
+        get_engine(),
+        [
+            snapshot_cache.SnapshotTable("orders", "id, customer_id, order_date, lower(status) AS status"),
+            snapshot_cache.SnapshotTable(
+                "order_items", "id, order_id, product_id, quantity, unit_price::float8 AS unit_price"
+            ),
+            snapshot_cache.SnapshotTable("inventories", "id, warehouse_id, quantity_on_hand"),
+        ],
+    )
+
+
+# =======================================
+# 🧮 FILTROS → SQL
+# =======================================
+def order_filters(city, statuses):
+    """Condiciones sobre `orders o` (y `customers c`) para los filtros de la barra lateral."""
+    clauses = ["TRUE"]
+    params = {}
+    if city is not None:
+        clauses.append("c.city = :city")
+        params["city"] = city
+    if statuses:
+        clauses.append("lower(o.status) = ANY(:statuses)")
+        params["statuses"] = list(statuses)
+    return " AND ".join(clauses), params
+
+
+# Partidas de los pedidos filtrados; el importe de cada línea es cantidad × precio
+SALES_FROM = """
+    FROM public.order_items oi
+    JOIN public.orders o ON o.id = oi.order_id
+    JOIN public.customers c ON c.id = o.customer_id
+"""
+
+
+# Dimensiones pequeñas que acompañan a la copia local
+@st.cache_data(ttl=CACHE_TTL)
+def load_customer_cities():
+    return read_sql("SELECT id, city FROM public.customers")
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_catalog():
+    return read_sql(
+        """
+        SELECT p.id AS product_id, p.name, s.id AS supplier_id, s.name AS name_sup
+        FROM public.products p
+        LEFT JOIN public.suppliers s ON s.id = p.supplier_id
+        """
+    )
+
+
+def snapshot_sales(city, statuses):
+    """Pedidos y partidas filtrados de la copia local, como `order_filters` en SQL."""
+    snapshots = get_snapshots()
+    customers = load_customer_cities()
+    if city is not None:
+        customers = customers[customers["city"] == city]
+    orders = snapshots.frame("orders")
+    orders = orders[orders["customer_id"].isin(customers["id"])]
+    if statuses:
+        orders = orders[orders["status"].isin(statuses)]
+    lines = snapshots.frame("order_items").merge(
+        orders[["id", "order_date"]].rename(columns={"id": "order_id"}), on="order_id"
+    )
+    lines["total_line"] = lines["quantity"] * lines["unit_price"]
+    return orders, lines
 
 # =======================================
-# 📊 FUNCIÓN DE CARGA DE DATOS
+# 📊 CONSULTAS (cacheadas por combinación de filtros)
 # =======================================
-@st.cache_data
-def load_data():
-    query_list = {
-        "products": "SELECT id, name, unit_price, supplier_id, category_id, vat_rate FROM public.products",
-        "orders": "SELECT id, customer_id, order_date, status, total_amount FROM public.orders",
-        "order_items": "SELECT order_id, product_id, quantity, unit_price FROM public.order_items",
-        "customers": "SELECT id, name, city, country FROM public.customers",
-        "suppliers": "SELECT id, name, city, country FROM public.suppliers",
-        "shipments": "SELECT id, order_id, warehouse_id, delivery_status FROM public.shipments",
-        "warehouses": "SELECT id, name, city FROM public.warehouses",
-        "inventories": "SELECT warehouse_id, quantity_on_hand FROM public.inventories"
-    }
-
-    data = {}
-    for key, query in query_list.items():
-        try:
-            df = pd.read_sql(query, engine)
-            # Convertimos internamente a UTF-8 limpio
-            df = df.applymap(lambda x: x.encode("latin1").decode("utf-8") if isinstance(x, str) else x)
-            data[key] = df
-        except Exception as e:
-            st.error(f"Error cargando {key}: {e}")
-    return data
-
-data = load_data()
-
-if "customers" not in data:
-    st.error("No se pudo cargar correctamente la base de datos. Verifica conexión o codificación.")
+@st.cache_data(ttl=CACHE_TTL)
+def load_cities():
+    df = read_sql("SELECT DISTINCT city FROM public.customers WHERE city IS NOT NULL ORDER BY city")
+    return df["city"].tolist()
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_kpis(city, statuses):
+    if SNAPSHOTS:
+        orders, lines = snapshot_sales(city, statuses)
+        return pd.Series({
+            "total_sales": float(lines["total_line"].sum()),
+            "orders": len(orders),
+            "customers": len(load_customer_cities()),
+            "products": len(load_catalog()),
+        })
+    where, params = order_filters(city, statuses)
+    return read_sql(
+        f"""
+        SELECT
+            (SELECT COALESCE(SUM(oi.quantity * oi.unit_price), 0)::float8
+               {SALES_FROM} WHERE {where}) AS total_sales,
+            (SELECT COUNT(*) FROM public.orders o
+               JOIN public.customers c ON c.id = o.customer_id WHERE {where}) AS orders,
+            (SELECT COUNT(*) FROM public.customers) AS customers,
+            (SELECT COUNT(*) FROM public.products) AS products
+        """,
+        **params,
+    ).iloc[0]
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_monthly_sales(city, statuses):
+    if SNAPSHOTS:
+        _, lines = snapshot_sales(city, statuses)
+        month = lines["order_date"].dt.strftime("%Y-%m").rename("month")
+        return lines.groupby(month)["total_line"].sum().reset_index()
+    where, params = order_filters(city, statuses)
+    return read_sql(
+        f"""
+        SELECT to_char(o.order_date, 'YYYY-MM') AS month,
+               SUM(oi.quantity * oi.unit_price)::float8 AS total_line
+        {SALES_FROM}
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1
+        """,
+        **params,
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_top_products(city, statuses, limit=10):
+    if SNAPSHOTS:
+        _, lines = snapshot_sales(city, statuses)
+        quantity = lines.groupby("product_id")["quantity"].sum().nlargest(limit).reset_index()
+        return quantity.merge(load_catalog(), on="product_id")[["name", "quantity"]]
+    where, params = order_filters(city, statuses)
+    return read_sql(
+        f"""
+        SELECT p.name, SUM(oi.quantity) AS quantity
+        {SALES_FROM}
+        JOIN public.products p ON p.id = oi.product_id
+        WHERE {where}
+        GROUP BY p.id, p.name
+        ORDER BY quantity DESC
+        LIMIT :limit
+        """,
+        limit=limit,
+        **params,
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_top_suppliers(city, statuses, limit=10):
+    if SNAPSHOTS:
+        _, lines = snapshot_sales(city, statuses)
+        lines = lines.merge(load_catalog().dropna(subset=["supplier_id"]), on="product_id")
+        totals = lines.groupby(["supplier_id", "name_sup"])["total_line"].sum().nlargest(limit)
+        return totals.reset_index()[["name_sup", "total_line"]]
+    where, params = order_filters(city, statuses)
+    return read_sql(
+        f"""
+        SELECT s.name AS name_sup, SUM(oi.quantity * oi.unit_price)::float8 AS total_line
+        {SALES_FROM}
+        JOIN public.products p ON p.id = oi.product_id
+        JOIN public.suppliers s ON s.id = p.supplier_id
+        WHERE {where}
+        GROUP BY s.id, s.name
+        ORDER BY total_line DESC
+        LIMIT :limit
+        """,
+        limit=limit,
+        **params,
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_clients_by_city():
+    return read_sql(
+        """
+        SELECT city, COUNT(*) AS clientes
+        FROM public.customers
+        GROUP BY city
+        ORDER BY clientes DESC
+        """
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_shipment_status():
+    return read_sql(
+        """
+        SELECT delivery_status AS "Estado", COUNT(*) AS "Cantidad"
+        FROM public.shipments
+        GROUP BY delivery_status
+        ORDER BY 2 DESC
+        """
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_stock_by_warehouse():
+    if SNAPSHOTS:
+        stock = get_snapshots().frame("inventories").groupby("warehouse_id")["quantity_on_hand"].sum()
+        warehouses = read_sql("SELECT id AS warehouse_id, name FROM public.warehouses ORDER BY name")
+        warehouses["quantity_on_hand"] = warehouses["warehouse_id"].map(stock).fillna(0).astype("int64")
+        return warehouses[["name", "quantity_on_hand"]]
+    return read_sql(
+        """
+        SELECT w.name, COALESCE(SUM(i.quantity_on_hand), 0) AS quantity_on_hand
+        FROM public.warehouses w
+        LEFT JOIN public.inventories i ON i.warehouse_id = w.id
+        GROUP BY w.id, w.name
+        ORDER BY w.name
+        """
+    )
+
+
+try:
+    cities = load_cities()
+except Exception as e:
+    st.error(f"No se pudo conectar con la base de datos: {e}")
     st.stop()
 
 # =======================================
@@ -64,101 +270,70 @@ if "customers" not in data:
 st.sidebar.title("📦 Distributor Analytics")
 selected_city = st.sidebar.selectbox(
     "Filtrar por ciudad de cliente:",
-    ["Todas"] + sorted(data["customers"]["city"].dropna().unique())
+    ["Todas"] + cities
 )
 selected_status = st.sidebar.multiselect(
     "Estado del pedido:",
     ["pendiente", "completado", "entregado", "en tránsito", "retrasado"],
     default=["entregado", "completado"]
 )
+# Solo se consulta la sección visible (st.tabs ejecutaría todas en cada recarga)
+section = st.sidebar.radio("Sección:", ["📊 General", "💰 Análisis Financiero"])
 
-# =======================================
-# 🧮 PREPARACIÓN DE DATOS
-# =======================================
-orders = data["orders"].copy()
-if selected_status:
-    orders = orders[orders["status"].str.lower().isin(selected_status)]
-
-if selected_city != "Todas":
-    customer_ids = data["customers"].query("city == @selected_city")["id"]
-    orders = orders[orders["customer_id"].isin(customer_ids)]
-
-merged = (
-    data["order_items"]
-    .merge(orders, left_on="order_id", right_on="id")
-    .merge(data["products"], left_on="product_id", right_on="id", suffixes=("_oi", "_p"))
-)
-
-merged["total_line"] = merged["quantity"] * merged["unit_price_oi"]
-merged["order_date"] = pd.to_datetime(merged["order_date"], errors="coerce")
-merged["month"] = merged["order_date"].dt.to_period("M").astype(str)
-
-# =======================================
-# 🧾 PESTAÑAS DE DASHBOARD
-# =======================================
-tabs = st.tabs(["📊 General", "💰 Análisis Financiero"])
+city = None if selected_city == "Todas" else selected_city
+statuses = tuple(sorted(s.lower() for s in selected_status))
 
 # =======================================
-# 🧱 TAB 1: GENERAL
+# 🧱 SECCIÓN 1: GENERAL
 # =======================================
-with tabs[0]:
+if section == "📊 General":
     st.title("📊 Panel General de Distribución Alimentaria")
     st.markdown("Datos generados desde `seed_distributor_db_full.sql`")
 
     # KPIs principales
+    kpis = load_kpis(city, statuses)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Ventas Totales (€)", f"{merged['total_line'].sum():,.2f}")
-    col2.metric("Pedidos", len(orders))
-    col3.metric("Clientes", len(data["customers"]))
-    col4.metric("Productos", len(data["products"]))
+    col1.metric("Ventas Totales (€)", f"{kpis['total_sales']:,.2f}")
+    col2.metric("Pedidos", int(kpis["orders"]))
+    col3.metric("Clientes", int(kpis["customers"]))
+    col4.metric("Productos", int(kpis["products"]))
 
     # Ventas por mes
-    if not merged.empty:
-        sales_month = merged.groupby("month")["total_line"].sum().reset_index()
+    sales_month = load_monthly_sales(city, statuses)
+    if not sales_month.empty:
         fig1 = px.bar(sales_month, x="month", y="total_line", title="Evolución mensual de ventas (€)")
         st.plotly_chart(fig1, use_container_width=True)
 
         # Top 10 productos
-        top_products = (
-            merged.groupby("name")["quantity"]
-            .sum()
-            .sort_values(ascending=False)
-            .head(10)
-            .reset_index()
-        )
+        top_products = load_top_products(city, statuses)
         fig2 = px.bar(top_products, x="quantity", y="name", orientation="h", title="Top 10 productos más vendidos")
         st.plotly_chart(fig2, use_container_width=True)
     else:
         st.warning("No hay datos disponibles para los filtros seleccionados.")
 
     # Distribución de clientes
-    client_city = data["customers"]["city"].value_counts().reset_index()
-    client_city.columns = ["city", "clientes"]
+    client_city = load_clients_by_city()
     fig3 = px.pie(client_city, names="city", values="clientes", title="Distribución de clientes por ciudad")
     st.plotly_chart(fig3, use_container_width=True)
 
     # Estado de envíos
-    shipment_status = data["shipments"]["delivery_status"].value_counts().reset_index()
-    shipment_status.columns = ["Estado", "Cantidad"]
+    shipment_status = load_shipment_status()
     fig4 = px.pie(shipment_status, names="Estado", values="Cantidad", title="Estado actual de los envíos")
     st.plotly_chart(fig4, use_container_width=True)
 
     # Stock por almacén
-    inv = data["inventories"].merge(data["warehouses"], left_on="warehouse_id", right_on="id")
-    inv_sum = inv.groupby("name")["quantity_on_hand"].sum().reset_index()
+    inv_sum = load_stock_by_warehouse()
     fig5 = px.bar(inv_sum, x="name", y="quantity_on_hand", title="Stock total por almacén", color="name")
     st.plotly_chart(fig5, use_container_width=True)
 
 # =======================================
-# 💰 TAB 2: ANÁLISIS FINANCIERO
+# 💰 SECCIÓN 2: ANÁLISIS FINANCIERO
 # =======================================
-with tabs[1]:
+else:
     st.title("💰 Análisis Financiero y Rentabilidad")
 
-    # Margen promedio
-    margin_avg = data["products"]["unit_price"].mean() * 0.25  # proxy
-    total_sales = merged["total_line"].sum()
-    vat_total = merged["total_line"].sum() * 0.10  # estimado 10%
+    total_sales = float(load_kpis(city, statuses)["total_sales"])
+    vat_total = total_sales * 0.10  # estimado 10%
     profit_est = total_sales - vat_total
 
     c1, c2, c3 = st.columns(3)
@@ -167,19 +342,12 @@ with tabs[1]:
     c3.metric("Beneficio neto estimado (€)", f"{profit_est:,.2f}")
 
     # Rentabilidad por proveedor
-    supplier_perf = (
-        merged.merge(data["suppliers"], left_on="supplier_id", right_on="id", suffixes=("", "_sup"))
-        .groupby("name_sup")["total_line"]
-        .sum()
-        .sort_values(ascending=False)
-        .head(10)
-        .reset_index()
-    )
+    supplier_perf = load_top_suppliers(city, statuses)
     fig6 = px.bar(supplier_perf, x="total_line", y="name_sup", orientation="h", title="Top proveedores por volumen (€)")
     st.plotly_chart(fig6, use_container_width=True)
 
     # Proyección de ingresos anual (simple)
-    monthly = merged.groupby("month")["total_line"].sum().reset_index()
+    monthly = load_monthly_sales(city, statuses)
     if len(monthly) >= 3:
         growth_rate = (monthly["total_line"].iloc[-1] / monthly["total_line"].iloc[0]) ** (1 / len(monthly)) - 1
         projected = total_sales * (1 + growth_rate) ** 12
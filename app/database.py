@@ -1,19 +1,204 @@
+"""Motores y sesiones de SQLAlchemy, creados la primera vez que se usan.
+
+Importar este módulo no lee ``DATABASE_URL`` ni abre conexiones: los motores se
+construyen en ``init_engines`` (lo llama el arranque de la API, o la primera
+sesión que se pida) y las tablas se crean aparte con
+``python -m app.manage create-schema``.
+"""
+import asyncio
+import os
+import threading
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-import os
 
-# Cargar variables desde .env
-load_dotenv()
+from . import query_profiler
+from .metrics import ENABLED as METRICS_ENABLED, instrument_queries
+from .pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+
+
+def database_url() -> str:
+    """``DATABASE_URL`` del entorno o del archivo ``.env``."""
+
+    load_dotenv()
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("❌ No se encontró DATABASE_URL. Verifica tu archivo .env")
+    return url
+
+
+# Controladores asíncronos equivalentes a los síncronos habituales
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Traduce una URL síncrona (psycopg2, sqlite) a su controlador asíncrono."""
+
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def async_database_url() -> str:
+    """``ASYNC_DATABASE_URL`` permite fijar otro controlador; por defecto se deriva."""
+
+    return os.getenv("ASYNC_DATABASE_URL") or to_async_url(database_url())
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_options(url: str, poolclass) -> dict:
+    """Ajustes del pool leídos del entorno (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...).
+
+    ``poolclass`` es la variante instrumentada que mide la espera al pedir una
+    conexión. SQLite usa sus propios pools sin tamaño ni desbordamiento, así
+    que solo recibe el pre-ping.
+    """
+
+    options = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    )
+    return options
+
+
+class _LazySessionmaker(sessionmaker):
+    """``sessionmaker`` que crea los motores si aún no existen."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            init_engines()
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            init_engines()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+# Sesiones del motor asíncrono (asyncpg) para los endpoints: una petición
+# esperando a PostgreSQL no ocupa un hilo del threadpool.
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+# Contadores de uso de cada pool, expuestos en /health/pool
+pool_stats = {}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def init_engines() -> None:
+    """Crea los motores síncrono y asíncrono una sola vez por proceso."""
+
+    with _engines_lock:
+        if _engines:
+            return
+        url = database_url()
+        async_url = async_database_url()
+        engine = create_engine(url, **pool_options(url, TimedQueuePool))
+        async_engine = create_async_engine(
+            async_url, **pool_options(async_url, TimedAsyncAdaptedQueuePool)
+        )
+
+        pool_stats["sync"] = instrument_engine(engine, "sync")
+        pool_stats["async"] = instrument_engine(async_engine.sync_engine, "async")
+
+        # Sentencias y tiempo en la base de datos por petición, expuestos en /metrics
+        if METRICS_ENABLED:
+            instrument_queries(engine, "sync")
+            instrument_queries(async_engine.sync_engine, "async")
+
+        # Consultas lentas, sus planes y N+1 (QUERY_PROFILING=1), en /health/queries
+        if query_profiler.ENABLED:
+            query_profiler.instrument_engine(engine)
+            query_profiler.instrument_engine(async_engine.sync_engine)
+
+        SessionLocal.configure(bind=engine)
+        AsyncSessionLocal.configure(bind=async_engine)
+        _engines.update({"sync": engine, "async": async_engine})
+
+
+def get_engine():
+    init_engines()
+    return _engines["sync"]
+
+
+def get_async_engine():
+    init_engines()
+    return _engines["async"]
+
+
+async def warm_up_pools(connections: int) -> int:
+    """Abre ``connections`` conexiones en cada pool y las devuelve a él.
+
+    Así las primeras peticiones tras un arranque no pagan el establecimiento
+    de la conexión (TCP, autenticación). No pasa del tamaño del pool; devuelve
+    las conexiones abiertas en total.
+    """
+
+    engine, async_engine = get_engine(), get_async_engine()
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        connections = min(connections, size())
+    if connections <= 0:
+        return 0
+
+    opened = [async_engine.connect() for _ in range(connections)]
+    started = await asyncio.gather(*(conn.start() for conn in opened), return_exceptions=True)
+    # Las que sí conectaron vuelven al pool aunque alguna haya fallado
+    await asyncio.gather(
+        *(
+            conn.close()
+            for conn, result in zip(opened, started)
+            if not isinstance(result, BaseException)
+        )
+    )
+    for result in started:
+        if isinstance(result, BaseException):
+            raise result
+
+    # El motor síncrono conecta en hilos para no bloquear el bucle
+    sync_opened = await asyncio.gather(
+        *(asyncio.to_thread(engine.connect) for _ in range(connections)), return_exceptions=True
+    )
+    for conn in sync_opened:
+        if not isinstance(conn, BaseException):
+            conn.close()
+    for conn in sync_opened:
+        if isinstance(conn, BaseException):
+            raise conn
+    return len(opened) + len(sync_opened)
+
+
+async def dispose_engines() -> None:
+    """Cierra las conexiones de los pools (al parar la API)."""
 
-# Leer la variable de entorno
-DATABASE_URL = os.getenv("DATABASE_URL")
+    if _engines:
+        await _engines["async"].dispose()
+        _engines["sync"].dispose()
 
-if not DATABASE_URL:
-    raise ValueError("❌ No se encontró DATABASE_URL. Verifica tu archivo .env")
 
-# Crear motor de conexión
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -1,8 +1,11 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
+from fastapi import Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import SessionLocal
+from .database import AsyncSessionLocal, SessionLocal
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageParams
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -13,3 +16,24 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Provee una sesión asíncrona por petición.
+
+    Las funciones de ``crud`` se ejecutan sobre ella con ``await db.run_sync(...)``:
+    el código es el mismo que en la ruta síncrona, pero la E/S con la base de
+    datos la hace el controlador asíncrono sin bloquear el bucle de eventos.
+    """
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_page_params(
+    cursor: str | None = Query(None, description="Cursor devuelto en `next_cursor`."),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> PageParams:
+    """Parámetros comunes de paginación por cursor de los listados."""
+
+    return PageParams(cursor=cursor, limit=limit)
@@ -0,0 +1,127 @@
+"""ETags fuertes a partir de los contadores de versión de cada tabla.
+
+Un listado depende de unas pocas tablas; mientras ninguna cambie, la misma URL
+produce exactamente la misma respuesta. El ETag se calcula con la URL y las
+versiones de ``table_versions`` (no con el cuerpo de la respuesta), así que la
+comprobación de ``If-None-Match`` se resuelve antes de lanzar la consulta ORM y
+de serializar: si coincide se responde ``304 Not Modified`` sin más trabajo.
+
+Con la escucha de ``app.notifications`` activa, las versiones se guardan en
+memoria y se actualizan con cada aviso, de modo que la comprobación no toca la
+base de datos. Sin escucha se leen de ``table_versions`` (una búsqueda por
+clave primaria). Las tablas sin fila en ``table_versions`` no generan ETag.
+
+El disparador que incrementa la versión bloquea la fila de la tabla hasta el
+commit: los escritores concurrentes de una misma tabla se serializan, pero la
+versión nueva nunca es visible antes que los datos que la acompañan (ver
+``sql/change_notifications.sql``).
+"""
+import hashlib
+import threading
+from collections.abc import Iterable
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .dependencies import get_async_db
+
+
+class TableVersions:
+    """Versiones conocidas por este proceso; solo válidas con la escucha activa."""
+
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.live = False
+
+    def record(self, table: str, version: int) -> None:
+        # Las versiones solo crecen: un valor leído de la base de datos nunca
+        # debe pisar uno más reciente llegado por aviso.
+        with self._lock:
+            if version > self._versions.get(table, 0):
+                self._versions[table] = version
+
+    def known(self, tables: Iterable[str]) -> dict[str, int] | None:
+        with self._lock:
+            if not self.live:
+                return None
+            try:
+                return {table: self._versions[table] for table in tables}
+            except KeyError:
+                return None
+
+    def activate(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self.live = True
+
+    def deactivate(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self.live = False
+
+
+table_versions = TableVersions()
+
+
+def record_change(change: dict) -> None:
+    """Manejador de avisos de ``ChangeListener``."""
+
+    version = change.get("version")
+    if version is not None:
+        table_versions.record(change["table"], int(version))
+
+
+async def get_table_versions(db: AsyncSession, tables: tuple[str, ...]) -> dict[str, int]:
+    known = table_versions.known(tables)
+    if known is not None:
+        return known
+
+    result = await db.execute(
+        select(models.TableVersion.table_name, models.TableVersion.version).where(
+            models.TableVersion.table_name.in_(tables)
+        )
+    )
+    versions = dict(result.all())
+    for table, version in versions.items():
+        table_versions.record(table, version)
+    return versions
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def etag_for(*tables: str):
+    """Dependencia que responde 304 si el cliente ya tiene la versión actual.
+
+    Si no, añade ``ETag`` a la respuesta y deja que el endpoint continúe.
+    """
+
+    async def check_etag(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+    ) -> None:
+        versions = await get_table_versions(db, tables)
+        if len(versions) != len(tables):
+            return
+
+        digest = hashlib.sha1(request.url.path.encode("utf-8"))
+        digest.update(str(sorted(request.query_params.multi_items())).encode("utf-8"))
+        for table in tables:
+            digest.update(f"{table}:{versions[table]};".encode("utf-8"))
+        etag = f'"{digest.hexdigest()}"'
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check_etag
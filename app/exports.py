@@ -0,0 +1,209 @@
+"""Exportaciones completas en streaming (NDJSON o CSV).
+
+Las filas se leen con un cursor del lado del servidor (``yield_per``) y se
+envían al cliente por bloques a medida que llegan, de modo que la memoria
+usada es constante y el primer byte sale sin esperar a recorrer la tabla.
+"""
+import csv
+import io
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from enum import Enum
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .crud import STREAM_BATCH_SIZE
+from .database import SessionLocal
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    """Cómo se vuelca una entidad: esquema para NDJSON y filas planas para CSV."""
+
+    name: str
+    schema: type[BaseModel]
+    csv_header: tuple[str, ...]
+    csv_rows: Callable[[object], Iterable[tuple]]
+
+
+def _ndjson_chunks(rows: Iterable, spec: ExportSpec) -> Iterator[str]:
+    buffer = []
+    for row in rows:
+        item = spec.schema.model_validate(row, from_attributes=True)
+        buffer.append(item.model_dump_json())
+        if len(buffer) >= STREAM_BATCH_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def _csv_chunks(rows: Iterable, spec: ExportSpec) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(spec.csv_header)
+    pending = 0
+    for row in rows:
+        writer.writerows(spec.csv_rows(row))
+        pending += 1
+        if pending >= STREAM_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def _stream(
+    load: Callable[[Session], Iterable],
+    spec: ExportSpec,
+    export_format: ExportFormat,
+) -> Iterator[str]:
+    # La sesión pertenece al generador: sigue abierta mientras se envía la
+    # respuesta y se cierra al terminar o si el cliente corta la descarga.
+    db = SessionLocal()
+    try:
+        rows = load(db)
+        if export_format is ExportFormat.csv:
+            yield from _csv_chunks(rows, spec)
+        else:
+            yield from _ndjson_chunks(rows, spec)
+    finally:
+        db.close()
+
+
+def export_response(
+    load: Callable[[Session], Iterable],
+    spec: ExportSpec,
+    export_format: ExportFormat,
+) -> StreamingResponse:
+    if export_format is ExportFormat.csv:
+        media_type = "text/csv; charset=utf-8"
+    else:
+        media_type = "application/x-ndjson"
+    filename = f"{spec.name}.{export_format.value}"
+    return StreamingResponse(
+        _stream(load, spec, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _product_rows(product) -> Iterable[tuple]:
+    return [(
+        product.id,
+        product.sku,
+        product.name,
+        product.unit,
+        product.unit_price,
+        product.supplier_id,
+        product.supplier.name if product.supplier else None,
+        product.category_id,
+        product.category.name if product.category else None,
+        product.is_active,
+    )]
+
+
+def _inventory_rows(inventory) -> Iterable[tuple]:
+    return [(
+        inventory.id,
+        inventory.product.id,
+        inventory.product.sku,
+        inventory.product.name,
+        inventory.warehouse.id,
+        inventory.warehouse.name,
+        inventory.quantity_on_hand,
+        inventory.safety_stock,
+        inventory.last_restocked,
+    )]
+
+
+def _order_rows(order) -> Iterable[tuple]:
+    # Una línea por partida: el CSV queda plano sin perder el detalle. Un
+    # pedido sin partidas ocupa una línea con las columnas de partida vacías.
+    head = (
+        order.id,
+        order.order_date,
+        order.required_date,
+        order.status,
+        order.total_amount,
+        order.customer.id,
+        order.customer.name,
+    )
+    if not order.items:
+        return [head + (None,) * 6]
+    return [
+        head
+        + (
+            item.id,
+            item.product.id,
+            item.product.sku,
+            item.quantity,
+            item.unit_price,
+            item.discount,
+        )
+        for item in order.items
+    ]
+
+
+def _shipment_rows(shipment) -> Iterable[tuple]:
+    return [(
+        shipment.id,
+        shipment.order.id,
+        shipment.order.customer.name,
+        shipment.warehouse.name if shipment.warehouse else None,
+        shipment.shipped_at,
+        shipment.estimated_delivery,
+        shipment.delivery_status,
+        shipment.tracking_number,
+    )]
+
+
+PRODUCT_EXPORT = ExportSpec(
+    name="products",
+    schema=schemas.Product,
+    csv_header=(
+        "id", "sku", "name", "unit", "unit_price", "supplier_id", "supplier_name",
+        "category_id", "category_name", "is_active",
+    ),
+    csv_rows=_product_rows,
+)
+
+INVENTORY_EXPORT = ExportSpec(
+    name="inventory",
+    schema=schemas.Inventory,
+    csv_header=(
+        "id", "product_id", "product_sku", "product_name", "warehouse_id",
+        "warehouse_name", "quantity_on_hand", "safety_stock", "last_restocked",
+    ),
+    csv_rows=_inventory_rows,
+)
+
+ORDER_EXPORT = ExportSpec(
+    name="orders",
+    schema=schemas.Order,
+    csv_header=(
+        "order_id", "order_date", "required_date", "status", "total_amount",
+        "customer_id", "customer_name", "item_id", "product_id", "product_sku",
+        "quantity", "unit_price", "discount",
+    ),
+    csv_rows=_order_rows,
+)
+
+SHIPMENT_EXPORT = ExportSpec(
+    name="shipments",
+    schema=schemas.Shipment,
+    csv_header=(
+        "id", "order_id", "customer_name", "warehouse_name", "shipped_at",
+        "estimated_delivery", "delivery_status", "tracking_number",
+    ),
+    csv_rows=_shipment_rows,
+)
@@ -0,0 +1,271 @@
+"""Ruta rápida de serialización para los listados más pesados.
+
+En lugar de cargar entidades ORM y validarlas una a una con los esquemas
+anidados de ``app.schemas``, se seleccionan solo las columnas necesarias como
+tuplas, se construyen los diccionarios de la respuesta directamente y se
+codifican con ``orjson`` si está instalado. El JSON resultante es idéntico al
+de la ruta normal (``scripts/bench_serialization.py`` lo comprueba).
+
+Se activa con ``FAST_SERIALIZATION=1``. La paginación y los filtros son los
+mismos que en ``app.crud``.
+"""
+import json
+import os
+from decimal import Decimal
+
+from fastapi import Response
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .pagination import Page, paginate
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+ENABLED = os.getenv("FAST_SERIALIZATION", "0").lower() in ("1", "true", "yes", "on")
+
+
+def _default(value):
+    # Igual que pydantic en modo JSON: los Decimal viajan como texto
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(
+        data, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_response(body: bytes, headers=None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _page_body(page: Page, build) -> bytes:
+    return dumps(
+        {"items": [build(row) for row in page.items], "next_cursor": page.next_cursor}
+    )
+
+
+def _product(row) -> dict:
+    return {
+        "name": row.name,
+        "sku": row.sku,
+        "unit": row.unit,
+        "unit_price": row.unit_price,
+        "supplier_id": row.supplier_id,
+        "category_id": row.category_id,
+        "is_active": row.is_active,
+        "id": row.id,
+        "supplier": (
+            {"id": row.supplier_id, "name": row.supplier_name}
+            if row.supplier_name is not None
+            else None
+        ),
+        "category": (
+            {"id": row.category_id, "name": row.category_name}
+            if row.category_name is not None
+            else None
+        ),
+    }
+
+
+def products_page(
+    db: Session,
+    supplier_id: int | None = None,
+    category_id: int | None = None,
+    only_active: bool = False,
+    cursor: str | None = None,
+    limit: int = crud.DEFAULT_PAGE_SIZE,
+) -> bytes:
+    product = models.Product
+    query = (
+        db.query(
+            product.id,
+            product.name,
+            product.sku,
+            product.unit,
+            product.unit_price,
+            product.supplier_id,
+            product.category_id,
+            product.is_active,
+            models.Supplier.name.label("supplier_name"),
+            models.Category.name.label("category_name"),
+        )
+        .outerjoin(models.Supplier, models.Supplier.id == product.supplier_id)
+        .outerjoin(models.Category, models.Category.id == product.category_id)
+        .filter(*crud.product_filters(supplier_id, category_id, only_active))
+    )
+    return _page_body(paginate(query, crud.PRODUCT_SORT, cursor, limit), _product)
+
+
+def _inventory(row) -> dict:
+    return {
+        "id": row.id,
+        "product": {"id": row.product_id, "name": row.product_name, "sku": row.product_sku},
+        "warehouse": {
+            "id": row.warehouse_id,
+            "name": row.warehouse_name,
+            "city": row.warehouse_city,
+        },
+        "quantity_on_hand": row.quantity_on_hand,
+        "safety_stock": row.safety_stock,
+        "last_restocked": row.last_restocked,
+    }
+
+
+def inventory_page(
+    db: Session,
+    warehouse_id: int | None = None,
+    product_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = crud.DEFAULT_PAGE_SIZE,
+) -> bytes:
+    inventory = models.Inventory
+    query = (
+        db.query(
+            inventory.id,
+            inventory.quantity_on_hand,
+            inventory.safety_stock,
+            inventory.last_restocked,
+            models.Product.id.label("product_id"),
+            models.Product.name.label("product_name"),
+            models.Product.sku.label("product_sku"),
+            models.Warehouse.id.label("warehouse_id"),
+            models.Warehouse.name.label("warehouse_name"),
+            models.Warehouse.city.label("warehouse_city"),
+        )
+        .join(models.Product, models.Product.id == inventory.product_id)
+        .join(models.Warehouse, models.Warehouse.id == inventory.warehouse_id)
+        .filter(*crud.inventory_filters(warehouse_id, product_id))
+    )
+    return _page_body(paginate(query, crud.INVENTORY_SORT, cursor, limit), _inventory)
+
+
+def orders_page(
+    db: Session,
+    status: str | None = None,
+    cursor: str | None = None,
+    limit: int = crud.DEFAULT_PAGE_SIZE,
+) -> bytes:
+    order = models.Order
+    query = (
+        db.query(
+            order.id,
+            order.order_date,
+            order.required_date,
+            order.status,
+            order.total_amount,
+            models.Customer.id.label("customer_id"),
+            models.Customer.name.label("customer_name"),
+        )
+        .join(models.Customer, models.Customer.id == order.customer_id)
+        .filter(*crud.order_filters(status))
+    )
+    page = paginate(query, crud.ORDER_SORT, cursor, limit)
+
+    # Las partidas de toda la página en una sola consulta
+    items_by_order = {row.id: [] for row in page.items}
+    if items_by_order:
+        item = models.OrderItem
+        items = (
+            db.query(
+                item.id,
+                item.order_id,
+                item.quantity,
+                item.unit_price,
+                item.discount,
+                models.Product.id.label("product_id"),
+                models.Product.name.label("product_name"),
+                models.Product.sku.label("product_sku"),
+            )
+            .join(models.Product, models.Product.id == item.product_id)
+            .filter(item.order_id.in_(list(items_by_order)))
+            .order_by(item.id)
+        )
+        for row in items:
+            items_by_order[row.order_id].append(
+                {
+                    "id": row.id,
+                    "product": {
+                        "id": row.product_id,
+                        "name": row.product_name,
+                        "sku": row.product_sku,
+                    },
+                    "quantity": row.quantity,
+                    "unit_price": row.unit_price,
+                    "discount": row.discount,
+                }
+            )
+
+    def build(row) -> dict:
+        return {
+            "id": row.id,
+            "customer": {"id": row.customer_id, "name": row.customer_name},
+            "order_date": row.order_date,
+            "required_date": row.required_date,
+            "status": row.status,
+            "total_amount": row.total_amount,
+            "items": items_by_order[row.id],
+        }
+
+    return _page_body(page, build)
+
+
+def _shipment(row) -> dict:
+    return {
+        "id": row.id,
+        "order": {
+            "id": row.order_id,
+            "order_date": row.order_date,
+            "status": row.order_status,
+            "customer": {"id": row.customer_id, "name": row.customer_name},
+        },
+        "warehouse": (
+            {"id": row.warehouse_id, "name": row.warehouse_name, "city": row.warehouse_city}
+            if row.warehouse_id is not None
+            else None
+        ),
+        "shipped_at": row.shipped_at,
+        "estimated_delivery": row.estimated_delivery,
+        "delivery_status": row.delivery_status,
+        "tracking_number": row.tracking_number,
+    }
+
+
+def shipments_page(
+    db: Session,
+    status: str | None = None,
+    cursor: str | None = None,
+    limit: int = crud.DEFAULT_PAGE_SIZE,
+) -> bytes:
+    shipment = models.Shipment
+    query = (
+        db.query(
+            shipment.id,
+            shipment.shipped_at,
+            shipment.estimated_delivery,
+            shipment.delivery_status,
+            shipment.tracking_number,
+            models.Order.id.label("order_id"),
+            models.Order.order_date,
+            models.Order.status.label("order_status"),
+            models.Customer.id.label("customer_id"),
+            models.Customer.name.label("customer_name"),
+            models.Warehouse.id.label("warehouse_id"),
+            models.Warehouse.name.label("warehouse_name"),
+            models.Warehouse.city.label("warehouse_city"),
+        )
+        .join(models.Order, models.Order.id == shipment.order_id)
+        .join(models.Customer, models.Customer.id == models.Order.customer_id)
+        .outerjoin(models.Warehouse, models.Warehouse.id == shipment.warehouse_id)
+        .filter(*crud.shipment_filters(status))
+    )
+    return _page_body(paginate(query, crud.SHIPMENT_SORT, cursor, limit), _shipment)
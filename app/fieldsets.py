@@ -0,0 +1,145 @@
+"""Selección de campos (``?fields=``) y relaciones (``?include=``) por petición.
+
+Los clientes que solo necesitan unos pocos campos piden por ejemplo
+``/products/?fields=id,name,unit_price`` o ``/orders/?fields=id,status&include=items``.
+La selección se traduce en ``load_only`` para las columnas y en la decisión de
+cargar o no cada relación, así que las columnas y los JOIN que no se piden
+nunca salen de la base de datos ni se serializan.
+
+Sin ``fields`` ni ``include`` los endpoints responden como siempre. Con
+``fields`` y sin ``include`` no se incluye ninguna relación; con ``include`` y
+sin ``fields`` se devuelven todas las columnas más las relaciones indicadas.
+"""
+from dataclasses import dataclass, field
+
+from fastapi import Query
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+from .pagination import Page
+
+
+class InvalidFieldSelection(ValueError):
+    """``fields`` o ``include`` nombran algo que el recurso no expone."""
+
+
+@dataclass(frozen=True)
+class Relation:
+    """Relación que se puede pedir con ``include``.
+
+    ``option`` es la opción de carga (``joinedload``/``selectinload``) que se
+    añade a la consulta y ``schema`` el esquema resumido con el que se serializa.
+    """
+
+    option: object
+    schema: type[BaseModel]
+    many: bool = False
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """Campos y relaciones seleccionables de un recurso."""
+
+    model: type
+    schema: type[BaseModel]
+    relations: dict[str, Relation] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        mapped = set(inspect(self.model).columns.keys())
+        return tuple(name for name in self.schema.model_fields if name in mapped)
+
+    def select(self, fields: str | None, include: str | None) -> "FieldSelection | None":
+        if fields is None and include is None:
+            return None
+
+        columns = self.columns
+        if fields is None:
+            chosen = set(columns)
+        else:
+            chosen = set(_split(fields))
+            unknown = chosen - set(columns)
+            if unknown:
+                raise InvalidFieldSelection(
+                    f"Campos desconocidos: {', '.join(sorted(unknown))}"
+                )
+
+        relations = set(_split(include)) if include is not None else set()
+        unknown = relations - set(self.relations)
+        if unknown:
+            raise InvalidFieldSelection(
+                f"Relaciones desconocidas: {', '.join(sorted(unknown))}"
+            )
+
+        # Se respeta el orden de los campos del esquema completo
+        return FieldSelection(
+            spec=self,
+            columns=tuple(name for name in columns if name in chosen),
+            relations=tuple(name for name in self.schema.model_fields if name in relations),
+        )
+
+
+def _split(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+@dataclass(frozen=True)
+class FieldSelection:
+    spec: FieldSpec
+    columns: tuple[str, ...]
+    relations: tuple[str, ...]
+
+    def load_options(self, required: tuple[str, ...] = ()) -> list:
+        """Opciones de carga para la consulta del recurso.
+
+        ``required`` son columnas que hay que cargar aunque no se devuelvan
+        (la clave primaria y las de ordenación, que usa el cursor).
+        """
+
+        model = self.spec.model
+        primary_key = [column.key for column in inspect(model).primary_key]
+        names = dict.fromkeys((*primary_key, *required, *self.columns))
+        options = [load_only(*(getattr(model, name) for name in names))]
+        options.extend(self.spec.relations[name].option for name in self.relations)
+        return options
+
+    def serialize(self, instance) -> dict:
+        data = {name: getattr(instance, name) for name in self.columns}
+        for name in self.relations:
+            relation = self.spec.relations[name]
+            value = getattr(instance, name)
+            if relation.many:
+                data[name] = [_dump(relation.schema, item) for item in value]
+            else:
+                data[name] = None if value is None else _dump(relation.schema, value)
+        return data
+
+    def serialize_page(self, page: Page) -> dict:
+        return {
+            "items": [self.serialize(item) for item in page.items],
+            "next_cursor": page.next_cursor,
+        }
+
+
+def _dump(schema: type[BaseModel], instance) -> dict:
+    return schema.model_validate(instance, from_attributes=True).model_dump(mode="json")
+
+
+def field_selector(spec: FieldSpec):
+    """Dependencia que lee ``fields``/``include`` y devuelve la selección (o ``None``)."""
+
+    fields_help = f"Columnas a devolver, separadas por comas: {', '.join(spec.columns)}."
+    include_help = (
+        f"Relaciones a incluir: {', '.join(spec.relations)}."
+        if spec.relations
+        else "Este recurso no tiene relaciones seleccionables."
+    )
+
+    def select_fields(
+        fields: str | None = Query(None, description=fields_help),
+        include: str | None = Query(None, description=include_help),
+    ) -> FieldSelection | None:
+        return spec.select(fields, include)
+
+    return select_fields
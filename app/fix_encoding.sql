@@ -2,36 +2,12 @@
 -- fix_encoding.sql
 -- Repara textos mal codificados (Latin1 → UTF8)
 -- ==============================================
+-- La reparación vive en sql/repair_encoding.sql: solo toca las filas con
+-- secuencias de mojibake, deja intactos los textos que ya son UTF-8 válido y
+-- registra cada columna reparada en encoding_repairs.
+-- Ejecutar desde la raíz del proyecto: psql -d <base> -f app/fix_encoding.sql
 
-DO $$
-DECLARE
-    tbl text;
-    col text;
-    qry text;
-BEGIN
-    -- Lista de tablas que contienen texto
-    FOR tbl IN SELECT unnest(ARRAY[
-        'products',
-        'clients',
-        'providers',
-        'orders'
-    ])
-    LOOP
-        -- Para cada tabla, identificar columnas de texto y recodificarlas
-        FOR col IN
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = tbl
-              AND data_type IN ('character varying','text')
-        LOOP
-            qry := format($f$
-                UPDATE public.%I
-                SET %I = convert_from(convert_to(%I, 'LATIN1'), 'UTF8')
-                WHERE %I IS NOT NULL;
-            $f$, tbl, col, col, col);
-            RAISE NOTICE 'Corrigiendo %.%', tbl, col;
-            EXECUTE qry;
-        END LOOP;
-    END LOOP;
-END$$;
+\set ON_ERROR_STOP on
+\ir ../sql/repair_encoding.sql
+
+SELECT * FROM repair_text_encoding('public', ARRAY['products', 'clients', 'providers', 'orders']);
@@ -1,24 +1,129 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, suppress
 
-from . import models
-from .database import engine
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import make_url
+
+from . import metrics, query_profiler, rollups
+from .cache import invalidate_all, invalidate_table
+from .database import (
+    AsyncSessionLocal,
+    async_database_url,
+    dispose_engines,
+    init_engines,
+    warm_up_pools,
+)
+from .etags import record_change, table_versions
+from .fieldsets import InvalidFieldSelection
+from .notifications import ChangeListener
+from .pagination import InvalidCursor
 from .routers import (
+    analytics,
     categories,
     customers,
+    health,
     inventory,
     orders,
     products,
+    prometheus,
     shipments,
     suppliers,
     warehouses,
 )
 
-# Crear las tablas si no existen
-models.Base.metadata.create_all(bind=engine)
+# Conexiones que se abren en cada pool al arrancar (0 lo desactiva)
+POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+# Arranque por encima del cual se avisa en el log
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def on_table_change(change: dict) -> None:
+    invalidate_table(change["table"])
+
+
+def on_listener_reconnect() -> None:
+    invalidate_all()
+    table_versions.activate()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los motores se crean aquí y no al importar: el esquema se crea aparte
+    # con `python -m app.manage create-schema`
+    started = time.perf_counter()
+    init_engines()
+    engines_ready = time.perf_counter()
+    warmed = 0
+    try:
+        warmed = await warm_up_pools(POOL_WARMUP)
+    except Exception:
+        # La API arranca igual; las conexiones se abrirán con las peticiones
+        logger.warning("No se pudo precalentar el pool de conexiones", exc_info=True)
+    pools_ready = time.perf_counter()
+
+    # Escucha de cambios entre procesos (solo PostgreSQL; se desactiva con
+    # DB_CHANGE_LISTENER=0)
+    listener = None
+    async_url = async_database_url()
+    is_postgres = make_url(async_url).get_backend_name() == "postgresql"
+    listener_enabled = os.getenv("DB_CHANGE_LISTENER", "1") not in ("0", "false", "no")
+    if listener_enabled and is_postgres:
+        listener = ChangeListener(
+            async_url,
+            handlers=[on_table_change, record_change],
+            on_reconnect=on_listener_reconnect,
+            on_disconnect=table_versions.deactivate,
+        )
+        listener.start()
+    app.state.change_listener = listener
+
+    # Recalculo periódico de los días marcados por los disparadores de
+    # sql/sales_rollups.sql (solo PostgreSQL y con SALES_ROLLUPS=1)
+    rollup_task = None
+    if rollups.ENABLED and is_postgres:
+        rollup_task = asyncio.create_task(rollups.refresh_loop(AsyncSessionLocal))
+
+    finished = time.perf_counter()
+    app.state.startup = {
+        "pid": os.getpid(),
+        "startup_seconds": finished - started,
+        "engines_seconds": engines_ready - started,
+        "warmup_seconds": pools_ready - engines_ready,
+        "warmed_connections": warmed,
+        "budget_seconds": STARTUP_BUDGET_SECONDS,
+    }
+    if finished - started > STARTUP_BUDGET_SECONDS:
+        logger.warning(
+            "Arranque lento: %.2f s (presupuesto %.2f s; motores %.2f s, precalentamiento %.2f s)",
+            finished - started,
+            STARTUP_BUDGET_SECONDS,
+            engines_ready - started,
+            pools_ready - engines_ready,
+        )
+    else:
+        logger.info("API lista en %.2f s (%d conexiones precalentadas)", finished - started, warmed)
+    try:
+        yield
+    finally:
+        if rollup_task is not None:
+            rollup_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await rollup_task
+        if listener is not None:
+            await listener.stop()
+        await dispose_engines()
+
 
 app = FastAPI(
     title="Distribuidora de Alimentos API",
     description="Catálogo y operaciones principales del banco de datos de la distribuidora",
+    lifespan=lifespan,
 )
 
 # Incluir las rutas
@@ -30,6 +135,27 @@ app.include_router(inventory.router)
 app.include_router(customers.router)
 app.include_router(orders.router)
 app.include_router(shipments.router)
+app.include_router(analytics.router)
+app.include_router(health.router)
+
+# Latencia, tamaño y SQL por ruta, expuestos en /metrics (METRICS_ENABLED=0 lo desactiva)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.include_router(prometheus.router)
+
+# Sentencias repetidas por petición (N+1); solo con QUERY_PROFILING=1
+if query_profiler.ENABLED:
+    app.add_middleware(query_profiler.ProfilingMiddleware)
+
+
+@app.exception_handler(InvalidCursor)
+def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": "Cursor de paginación inválido"})
+
+
+@app.exception_handler(InvalidFieldSelection)
+def invalid_field_selection_handler(request: Request, exc: InvalidFieldSelection):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
 
 
 @app.get("/")
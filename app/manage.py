@@ -0,0 +1,73 @@
+"""Tareas de mantenimiento de la base de datos.
+
+Uso:
+    python -m app.manage create-schema
+    python -m app.manage rebuild-rollups [--from AAAA-MM-DD] [--to AAAA-MM-DD]
+    python -m app.manage refresh-rollups
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import inspect
+
+from . import models, rollups
+from .database import SessionLocal, get_engine
+
+
+def create_schema(args: argparse.Namespace) -> dict:
+    engine = get_engine()
+    existing = set(inspect(engine).get_table_names())
+    models.Base.metadata.create_all(bind=engine)
+    created = [table for table in models.Base.metadata.tables if table not in existing]
+    return {"created": len(created), "existing": len(models.Base.metadata.tables) - len(created)}
+
+
+def rebuild_rollups(args: argparse.Namespace) -> dict:
+    with SessionLocal() as db:
+        return rollups.rebuild(db, args.date_from, args.date_to)
+
+
+def refresh_rollups(args: argparse.Namespace) -> dict:
+    with SessionLocal() as db:
+        return rollups.refresh_dirty(db)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.manage", description=__doc__.splitlines()[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    schema = commands.add_parser(
+        "create-schema", help="Crea las tablas de app/models.py que aún no existen."
+    )
+    schema.set_defaults(handler=create_schema)
+
+    rebuild = commands.add_parser(
+        "rebuild-rollups", help="Recalcula los resúmenes diarios de ventas."
+    )
+    rebuild.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    rebuild.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    refresh = commands.add_parser(
+        "refresh-rollups", help="Recalcula solo los días marcados como pendientes."
+    )
+    refresh.set_defaults(handler=refresh_rollups)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+    result = args.handler(args)
+    elapsed = time.perf_counter() - started
+    details = ", ".join(f"{key}={value}" for key, value in result.items())
+    print(f"{args.command}: {details} ({elapsed:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Métricas de la API en formato de texto de Prometheus (``GET /metrics``).
+
+``MetricsMiddleware`` es un middleware ASGI que mide cada petición HTTP hasta
+enviar el último byte de la respuesta (también en las exportaciones en
+streaming) y la anota bajo la plantilla de su ruta (``/products/{product_id}``,
+no la URL concreta) con su método y su código de estado:
+
+* histograma de latencia y de tamaño de la respuesta;
+* peticiones en curso;
+* número de sentencias SQL y tiempo en la base de datos de cada petición,
+  sumados con los eventos ``before/after_cursor_execute`` de los motores que
+  registra ``instrument_queries``. La petición en curso se localiza con una
+  ``ContextVar``, que llega tanto al hilo de los endpoints síncronos como a
+  ``AsyncSession.run_sync``.
+
+Las sentencias ejecutadas fuera de una petición (escucha de cambios, resúmenes
+periódicos) solo cuentan en los totales por motor. Cada proceso de uvicorn
+lleva sus propias métricas; Prometheus debe consultar cada uno o sumarlas.
+Se desactiva con ``METRICS_ENABLED=0``.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes", "on")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Etiqueta de las peticiones que no corresponden a ninguna ruta (404)
+UNMATCHED_ROUTE = "<sin ruta>"
+
+
+class RequestStats:
+    """Sentencias SQL y tiempo en la base de datos de la petición en curso."""
+
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador acumulado por combinación de etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (peticiones en curso)."""
+
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Histograma con cubos fijos, como ``prometheus_client.Histogram``."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        # Por etiquetas: [cuenta de cada cubo..., cuenta > último cubo, suma]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = _labels(self.labelnames, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+REQUEST_LABELS = ("method", "route", "status")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Tiempo hasta enviar la respuesta completa.",
+    REQUEST_LABELS,
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de la respuesta.", REQUEST_LABELS, SIZE_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "Sentencias SQL ejecutadas por petición.",
+    REQUEST_LABELS,
+    STATEMENT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Tiempo de la petición esperando a la base de datos.",
+    REQUEST_LABELS,
+    LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Peticiones en curso.")
+DB_STATEMENTS = Counter(
+    "db_statements_total", "Sentencias SQL ejecutadas por motor.", ("engine",)
+)
+DB_TIME = Counter(
+    "db_statement_seconds_total", "Tiempo total de las sentencias SQL por motor.", ("engine",)
+)
+
+METRICS = (
+    REQUEST_DURATION,
+    RESPONSE_SIZE,
+    REQUEST_STATEMENTS,
+    REQUEST_DB_TIME,
+    IN_FLIGHT,
+    DB_STATEMENTS,
+    DB_TIME,
+)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que alimenta las métricas de petición."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            current_request.reset(token)
+            # El enrutador deja en el scope la ruta que atendió la petición
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            labels = (scope["method"], route, str(status))
+            REQUEST_DURATION.observe(labels, elapsed)
+            RESPONSE_SIZE.observe(labels, size)
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            REQUEST_DB_TIME.observe(labels, stats.db_seconds)
+
+
+def instrument_queries(engine, name: str) -> None:
+    """Cuenta y cronometra las sentencias de ``engine`` (el síncrono del motor asíncrono)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        DB_STATEMENTS.inc((name,))
+        DB_TIME.inc((name,), elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        # La sentencia falló: no habrá after_cursor_execute que retire su inicio
+        connection = context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+
+def _family(name: str, kind: str, documentation: str, lines) -> list[str]:
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", *lines]
+
+
+def render(pools=(), caches=()) -> str:
+    """Todas las métricas en formato de texto de Prometheus.
+
+    ``pools`` son las instantáneas de ``PoolStats.snapshot`` y ``caches`` las
+    de ``TTLCache.stats``; se exportan tal como están en ese momento.
+    """
+
+    lines = []
+    for metric in METRICS:
+        lines += _family(metric.name, metric.kind, metric.documentation, metric.samples())
+
+    pool_metrics = (
+        ("db_pool_checked_out", "gauge", "Conexiones prestadas ahora.", "checked_out"),
+        ("db_pool_idle", "gauge", "Conexiones libres en el pool.", "idle"),
+        ("db_pool_overflow", "gauge", "Conexiones abiertas por encima del tamaño.", "overflow"),
+        ("db_pool_size", "gauge", "Tamaño configurado del pool.", "size"),
+        ("db_pool_checkouts_total", "counter", "Conexiones pedidas al pool.", "checkouts"),
+        ("db_pool_timeouts_total", "counter", "Esperas de conexión agotadas.", "timeouts"),
+        ("db_pool_connects_total", "counter", "Conexiones nuevas abiertas.", "connects"),
+        ("db_pool_wait_max_seconds", "gauge", "Mayor espera para obtener conexión.", "wait_max_ms"),
+    )
+    for name, kind, documentation, key in pool_metrics:
+        samples = [
+            f"{name}{_labels(('pool',), (pool['name'],))} "
+            f"{_number(pool[key] / 1000 if key.endswith('_ms') else pool[key])}"
+            for pool in pools
+            if key in pool
+        ]
+        if samples:
+            lines += _family(name, kind, documentation, samples)
+
+    cache_metrics = (
+        ("cache_hits_total", "counter", "Aciertos de la caché.", "hits"),
+        ("cache_misses_total", "counter", "Fallos de la caché.", "misses"),
+        ("cache_entries", "gauge", "Entradas guardadas.", "entries"),
+    )
+    for name, kind, documentation, key in cache_metrics:
+        samples = [
+            f"{name}{_labels(('cache',), (cache['name'],))} {_number(cache[key])}"
+            for cache in caches
+            if key in cache
+        ]
+        if samples:
+            lines += _family(name, kind, documentation, samples)
+    return "\n".join(lines) + "\n"
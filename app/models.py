@@ -1,4 +1,15 @@
-from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Numeric,
+    PrimaryKeyConstraint,
+    String,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -131,3 +142,57 @@ class Shipment(Base):
 
     order = relationship("Order", back_populates="shipments")
     warehouse = relationship("Warehouse", back_populates="shipments")
+
+
+class TableVersion(Base):
+    """Contador de cambios por tabla, mantenido por ``sql/change_notifications.sql``."""
+
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class DailySales(Base):
+    """Ventas por día, producto, cliente, almacén y estado (``app.rollups``).
+
+    ``warehouse_id`` es 0 para los pedidos sin envío con almacén asignado.
+    """
+
+    __tablename__ = "daily_sales"
+    __table_args__ = (
+        PrimaryKeyConstraint("day", "product_id", "customer_id", "warehouse_id", "status"),
+    )
+
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer, nullable=False, index=True)
+    customer_id = Column(Integer, nullable=False, index=True)
+    warehouse_id = Column(Integer, nullable=False)
+    status = Column(String(40), nullable=False)
+    quantity = Column(BigInteger, nullable=False)
+    total_sales = Column(Numeric(14, 2), nullable=False)
+    line_count = Column(Integer, nullable=False)
+
+
+class DailyOrderTotals(Base):
+    """Pedidos e importes por día, cliente, almacén y estado (``app.rollups``)."""
+
+    __tablename__ = "daily_order_totals"
+    __table_args__ = (PrimaryKeyConstraint("day", "customer_id", "warehouse_id", "status"),)
+
+    day = Column(Date, nullable=False)
+    customer_id = Column(Integer, nullable=False, index=True)
+    warehouse_id = Column(Integer, nullable=False)
+    status = Column(String(40), nullable=False)
+    order_count = Column(Integer, nullable=False)
+    total_amount = Column(Numeric(14, 2), nullable=False)
+
+
+class RollupDirtyDay(Base):
+    """Días pendientes de recalcular, marcados por ``sql/sales_rollups.sql``."""
+
+    __tablename__ = "rollup_dirty_days"
+
+    day = Column(Date, primary_key=True)
+    marked_at = Column(DateTime, nullable=False, server_default=func.now())
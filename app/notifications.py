@@ -0,0 +1,107 @@
+"""Escucha de cambios en PostgreSQL (LISTEN/NOTIFY) para invalidar cachés.
+
+Los disparadores de ``sql/change_notifications.sql`` publican en el canal
+``table_changes`` cada sentencia que modifica una tabla. Cada proceso de la API
+mantiene una conexión dedicada escuchando ese canal y, al recibir un aviso,
+invalida lo que tenga en memoria de esa tabla. Así varios workers de uvicorn
+comparten la misma vista de los datos aunque cada uno tenga su propia caché.
+"""
+import asyncio
+import json
+import logging
+from collections.abc import Callable, Iterable
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "table_changes"
+# Cada cuánto se comprueba que la conexión de escucha sigue viva
+KEEPALIVE_SECONDS = 30
+RECONNECT_SECONDS = 5
+
+
+class ChangeListener:
+    """Tarea en segundo plano que reenvía los avisos de ``CHANNEL`` a ``handlers``.
+
+    Cada manejador recibe el aviso decodificado (``{"table": ..., "op": ...,
+    "version": ...}``). Tras (re)conectar se llama a ``on_reconnect``: mientras
+    la conexión estuvo caída pudieron perderse avisos, así que lo prudente es
+    invalidarlo todo. ``on_disconnect`` se llama cada vez que se pierde.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        handlers: Iterable[Callable[[dict], None]],
+        on_reconnect: Callable[[], None] | None = None,
+        on_disconnect: Callable[[], None] | None = None,
+    ):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.handlers = list(handlers)
+        self.on_reconnect = on_reconnect
+        self.on_disconnect = on_disconnect
+        self.connected = False
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            change = None
+        if not isinstance(change, dict) or "table" not in change:
+            logger.warning("Aviso de cambio ilegible: %r", payload)
+            return
+        for handler in self.handlers:
+            handler(change)
+
+    async def _listen_once(self):
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.add_listener(CHANNEL, self._on_notify)
+            self.connected = True
+            if self.on_reconnect is not None:
+                self.on_reconnect()
+            logger.info("Escuchando cambios en el canal %s", CHANNEL)
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1")
+        finally:
+            self.connected = False
+            if self.on_disconnect is not None:
+                self.on_disconnect()
+            await connection.close()
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Conexión de escucha perdida; reintentando")
+            if not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=RECONNECT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=RECONNECT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._task = None
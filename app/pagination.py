@@ -0,0 +1,126 @@
+"""Paginación por clave (keyset) para los listados de la API.
+
+En lugar de ``OFFSET`` cada página se pide a partir de los valores de ordenación
+de la última fila entregada, codificados en un cursor opaco. Así la página mil
+cuesta lo mismo que la primera: la base de datos salta directamente a la
+posición usando el índice de las columnas de ordenación.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, NamedTuple, Sequence
+
+from sqlalchemy import and_, false, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no se puede decodificar para el listado pedido."""
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """Columna que participa en el orden (y por tanto en el cursor) de un listado."""
+
+    column: Any
+    descending: bool = False
+    nulls_last: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.column.key
+
+    def order_by(self):
+        clause = self.column.desc() if self.descending else self.column.asc()
+        return clause.nullslast() if self.nulls_last else clause
+
+    def equals(self, value):
+        if value is None:
+            return self.column.is_(None)
+        return self.column == value
+
+    def after(self, value):
+        if value is None:
+            # Los nulos van al final: detrás de un nulo no hay valores distintos.
+            return false()
+        clause = self.column < value if self.descending else self.column > value
+        if self.nulls_last:
+            clause = or_(clause, self.column.is_(None))
+        return clause
+
+
+@dataclass(frozen=True)
+class PageParams:
+    cursor: str | None = None
+    limit: int = DEFAULT_PAGE_SIZE
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: str | None = None
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(key: SortKey, value):
+    if value is None:
+        return None
+    python_type = key.column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[SortKey]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [_from_json(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_filter(keys: Sequence[SortKey], values: Sequence):
+    """Condición "fila posterior al cursor" para un orden compuesto."""
+
+    clauses = []
+    for position, key in enumerate(keys):
+        prefix = [keys[i].equals(values[i]) for i in range(position)]
+        clauses.append(and_(*prefix, key.after(values[position])))
+    return or_(*clauses)
+
+
+def paginate(query, keys: Sequence[SortKey], cursor: str | None, limit: int) -> Page:
+    """Aplica orden, cursor y límite a ``query`` y devuelve una página."""
+
+    query = query.order_by(*(key.order_by() for key in keys))
+    if cursor:
+        query = query.filter(keyset_filter(keys, decode_cursor(cursor, keys)))
+
+    # Se pide una fila de más solo para saber si existe una página siguiente.
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor([getattr(last, key.name) for key in keys]))
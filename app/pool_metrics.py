@@ -0,0 +1,134 @@
+"""Telemetría del pool de conexiones de SQLAlchemy.
+
+Los contadores se alimentan con los eventos del pool (``connect``, ``checkout``,
+``checkin``, ``invalidate``) y el tiempo de espera se mide en el propio
+``Pool.connect`` mediante las subclases ``Timed*Pool``.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Contadores acumulados de un pool; seguros entre hilos."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+
+    def _incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self, checked_out: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool) -> dict:
+        """Estado actual del pool más los contadores acumulados."""
+
+        with self._lock:
+            data = {
+                "name": self.name,
+                "pool_class": type(pool).__name__,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_count": self.wait_count,
+                "wait_avg_ms": (
+                    self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0
+                ),
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        return data
+
+
+class _TimedPoolMixin:
+    """Mide cuánto espera cada ``connect()`` hasta obtener una conexión."""
+
+    stats: PoolStats | None = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # ``dispose()`` y la reconexión crean un pool nuevo: conserva las métricas.
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> PoolStats:
+    """Registra los eventos del pool de ``engine`` y devuelve sus contadores."""
+
+    stats = PoolStats(name)
+    pool = engine.pool
+    if isinstance(pool, _TimedPoolMixin):
+        pool.stats = stats
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats._incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        current = engine.pool
+        checked_out = current.checkedout() if isinstance(current, QueuePool) else 0
+        stats.record_checkout(checked_out)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats._incr("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats._incr("invalidations")
+
+    return stats
@@ -0,0 +1,251 @@
+"""Perfilado de consultas opcional: consultas lentas, sus planes y N+1.
+
+Con ``QUERY_PROFILING=1`` los motores de ``app.database`` registran:
+
+* cada sentencia que tarda más de ``SLOW_QUERY_MS`` milisegundos (200 por
+  defecto), que se escribe en el log ``app.query_profiler`` con sus parámetros
+  y la ruta que la originó;
+* las ``SLOW_QUERY_KEEP`` sentencias distintas más lentas (10), con su plan:
+  la primera vez que un ``SELECT`` entra en esa lista se ejecuta
+  ``EXPLAIN (ANALYZE, BUFFERS)`` (``EXPLAIN QUERY PLAN`` en SQLite) sobre la
+  misma conexión y con los mismos parámetros, dentro de un ``SAVEPOINT`` para
+  que un fallo no aborte la transacción de la petición. ``SLOW_QUERY_EXPLAIN=0``
+  lo evita; conviene saber que ``ANALYZE`` vuelve a ejecutar la consulta;
+* las peticiones que ejecutan la misma sentencia parametrizada más de
+  ``N_PLUS_ONE_THRESHOLD`` veces (10), la huella de una carga perezosa por
+  fila, como recorrer ``Order.items`` o ``Inventory.product`` sin cargarlos
+  antes. Se avisa la primera vez por ruta y sentencia.
+
+``GET /health/queries`` devuelve lo acumulado por el proceso. Está pensado
+para desarrollo y pruebas de carga, no para dejarlo siempre activo.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+ENABLED = os.getenv("QUERY_PROFILING", "0").lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "10"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1").lower() in ("1", "true", "yes", "on")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# Longitud máxima de los parámetros en el log
+MAX_PARAMS_CHARS = 500
+OUTSIDE_REQUEST = "<fuera de petición>"
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """Sentencias ejecutadas por la petición en curso, contadas por texto."""
+
+    __slots__ = ("scope", "counts")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.counts: dict[str, int] = {}
+
+    @property
+    def route(self) -> str:
+        # Tras el enrutado el scope lleva la ruta; antes, solo la URL
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", OUTSIDE_REQUEST)
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar("current_profile", default=None)
+
+
+class QueryLog:
+    """Sentencias más lentas y detecciones de N+1 acumuladas; seguro entre hilos."""
+
+    def __init__(self, keep: int = SLOW_QUERY_KEEP):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._slow: dict[str, dict] = {}
+        self._n_plus_one: dict[tuple[str, str], dict] = {}
+
+    def record_slow(self, statement: str, ms: float, parameters: str, route: str) -> bool:
+        """Anota una ejecución lenta; devuelve ``True`` si falta el plan de la sentencia."""
+
+        with self._lock:
+            entry = self._slow.get(statement)
+            if entry is None:
+                if len(self._slow) >= self.keep:
+                    fastest = min(self._slow.values(), key=lambda item: item["max_ms"])
+                    if fastest["max_ms"] >= ms:
+                        return False
+                    del self._slow[fastest["statement"]]
+                entry = self._slow[statement] = {
+                    "statement": statement,
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "parameters": parameters,
+                    "route": route,
+                    "plan": None,
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += ms
+            if ms >= entry["max_ms"]:
+                entry.update(max_ms=ms, parameters=parameters, route=route)
+            return entry["plan"] is None
+
+    def record_plan(self, statement: str, plan: str) -> None:
+        with self._lock:
+            entry = self._slow.get(statement)
+            if entry is not None:
+                entry["plan"] = plan
+
+    def record_n_plus_one(self, route: str, statement: str, executions: int) -> bool:
+        """Anota una petición con la sentencia repetida; ``True`` si es la primera vez."""
+
+        with self._lock:
+            entry = self._n_plus_one.get((route, statement))
+            if entry is None:
+                self._n_plus_one[(route, statement)] = {
+                    "route": route,
+                    "statement": statement,
+                    "requests": 1,
+                    "max_executions": executions,
+                }
+                return True
+            entry["requests"] += 1
+            entry["max_executions"] = max(entry["max_executions"], executions)
+            return False
+
+    def report(self) -> dict:
+        with self._lock:
+            slow = sorted(
+                (dict(entry) for entry in self._slow.values()),
+                key=lambda item: item["max_ms"],
+                reverse=True,
+            )
+            n_plus_one = sorted(
+                (dict(entry) for entry in self._n_plus_one.values()),
+                key=lambda item: item["max_executions"],
+                reverse=True,
+            )
+        return {
+            "enabled": ENABLED,
+            "slow_query_ms": SLOW_QUERY_MS,
+            "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+            "slow_queries": slow,
+            "n_plus_one": n_plus_one,
+        }
+
+
+query_log = QueryLog()
+
+
+def _short(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_CHARS:
+        return text[:MAX_PARAMS_CHARS] + "..."
+    return text
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """Plan de ``statement`` con un cursor nuevo de la misma conexión."""
+
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN (ANALYZE, BUFFERS) "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if not sqlite:
+            cursor.execute("SAVEPOINT query_profiler_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            if not sqlite:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_profiler_explain")
+            raise
+        if not sqlite:
+            cursor.execute("RELEASE SAVEPOINT query_profiler_explain")
+    finally:
+        cursor.close()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def instrument_engine(engine) -> None:
+    """Cronometra las sentencias de ``engine`` (el síncrono del motor asíncrono)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("profiler_started")
+        if not started:
+            return
+        ms = (time.perf_counter() - started.pop()) * 1000
+        profile = current_profile.get()
+        if profile is not None:
+            profile.counts[statement] = profile.counts.get(statement, 0) + 1
+        if ms < SLOW_QUERY_MS:
+            return
+
+        route = profile.route if profile is not None else OUTSIDE_REQUEST
+        params = _short(parameters)
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s:\n%s\nParámetros: %s", ms, route, statement, params
+        )
+        missing_plan = query_log.record_slow(statement, ms, params, route)
+        if (
+            missing_plan
+            and SLOW_QUERY_EXPLAIN
+            and not executemany
+            # Una exportación en streaming se volvería a recorrer entera
+            and not (context is not None and context.execution_options.get("stream_results"))
+            and statement.lstrip().upper().startswith("SELECT")
+        ):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception:
+                logger.warning("No se pudo obtener el plan de la consulta lenta", exc_info=True)
+                # Sin reintentos: la sentencia queda con un plan vacío
+                plan = ""
+            query_log.record_plan(statement, plan)
+            if plan:
+                logger.warning("Plan de la consulta lenta (%.1f ms):\n%s", ms, plan)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        connection = context.connection
+        if connection is not None and connection.info.get("profiler_started"):
+            connection.info["profiler_started"].pop()
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que cuenta las sentencias de cada petición y avisa de los N+1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_profile.reset(token)
+            for statement, executions in profile.counts.items():
+                if executions > N_PLUS_ONE_THRESHOLD and query_log.record_n_plus_one(
+                    profile.route, statement, executions
+                ):
+                    logger.warning(
+                        "Posible N+1 en %s %s: la misma sentencia se ejecutó %d veces\n%s",
+                        scope["method"],
+                        profile.route,
+                        executions,
+                        statement,
+                    )
@@ -0,0 +1,201 @@
+"""Tablas de resumen diario de ventas.
+
+``daily_sales`` guarda por día, producto, cliente, almacén y estado las unidades,
+el importe (``quantity * unit_price``) y el número de partidas, y
+``daily_order_totals`` el número de pedidos y su ``total_amount`` por día,
+cliente, almacén y estado. Un mes de ventas son unos pocos miles de filas de
+resumen en lugar de millones de partidas.
+
+Las tablas se mantienen por días completos: un día se recalcula borrando sus
+filas y volviendo a agregarlas desde ``orders``/``order_items``/``shipments``.
+En PostgreSQL los disparadores de ``sql/sales_rollups.sql`` apuntan en
+``rollup_dirty_days`` los días que tocan las escrituras (API, ``psql`` o la
+sincronización desde ``raw``) y ``refresh_dirty`` recalcula solo esos días.
+``rebuild`` recalcula un rango o todo el histórico.
+"""
+import asyncio
+import logging
+import os
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, insert, select, true
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Días que se recalculan por transacción al procesar la cola de días marcados.
+REFRESH_BATCH_DAYS = 31
+
+# Almacén de los pedidos sin envío (o con envíos sin almacén)
+NO_WAREHOUSE = 0
+
+# Con SALES_ROLLUPS=1 los indicadores de ventas de /analytics leen los resúmenes
+# y cada proceso de la API recalcula los días marcados cada tanto.
+ENABLED = os.getenv("SALES_ROLLUPS", "0").lower() in ("1", "true", "yes", "on")
+REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "60"))
+
+
+def _order_warehouses():
+    """Almacén de cada pedido: el menor de sus envíos."""
+
+    return (
+        select(
+            models.Shipment.order_id,
+            func.min(models.Shipment.warehouse_id).label("warehouse_id"),
+        )
+        .group_by(models.Shipment.order_id)
+        .subquery()
+    )
+
+
+def _sales_select(days):
+    order, item = models.Order, models.OrderItem
+    warehouses = _order_warehouses()
+    warehouse_id = func.coalesce(warehouses.c.warehouse_id, NO_WAREHOUSE)
+    status = func.coalesce(order.status, "")
+    return (
+        select(
+            order.order_date,
+            item.product_id,
+            order.customer_id,
+            warehouse_id,
+            status,
+            func.sum(item.quantity),
+            func.sum(item.quantity * item.unit_price),
+            func.count(item.id),
+        )
+        .select_from(item)
+        .join(order, order.id == item.order_id)
+        .outerjoin(warehouses, warehouses.c.order_id == order.id)
+        .where(days(order.order_date))
+        .group_by(order.order_date, item.product_id, order.customer_id, warehouse_id, status)
+    )
+
+
+def _order_totals_select(days):
+    order = models.Order
+    warehouses = _order_warehouses()
+    warehouse_id = func.coalesce(warehouses.c.warehouse_id, NO_WAREHOUSE)
+    status = func.coalesce(order.status, "")
+    return (
+        select(
+            order.order_date,
+            order.customer_id,
+            warehouse_id,
+            status,
+            func.count(order.id),
+            func.sum(order.total_amount),
+        )
+        .outerjoin(warehouses, warehouses.c.order_id == order.id)
+        .where(days(order.order_date))
+        .group_by(order.order_date, order.customer_id, warehouse_id, status)
+    )
+
+
+def _recompute(db: Session, days) -> dict:
+    """Sustituye las filas de resumen de los días que cumplen ``days(columna)``."""
+
+    sales, totals = models.DailySales, models.DailyOrderTotals
+    db.execute(delete(sales).where(days(sales.day)))
+    db.execute(delete(totals).where(days(totals.day)))
+    inserted_sales = db.execute(
+        insert(sales).from_select(
+            [
+                "day",
+                "product_id",
+                "customer_id",
+                "warehouse_id",
+                "status",
+                "quantity",
+                "total_sales",
+                "line_count",
+            ],
+            _sales_select(days),
+        )
+    ).rowcount
+    inserted_totals = db.execute(
+        insert(totals).from_select(
+            ["day", "customer_id", "warehouse_id", "status", "order_count", "total_amount"],
+            _order_totals_select(days),
+        )
+    ).rowcount
+    return {"daily_sales": inserted_sales, "daily_order_totals": inserted_totals}
+
+
+def rebuild(
+    db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> dict:
+    """Recalcula los resúmenes entre ``date_from`` y ``date_to`` (incluidos).
+
+    Sin límites recalcula todo el histórico y vacía la cola de días marcados.
+    """
+
+    def days(column):
+        criteria = [true()]
+        if date_from is not None:
+            criteria.append(column >= date_from)
+        if date_to is not None:
+            criteria.append(column <= date_to)
+        return and_(*criteria)
+
+    # La cola se vacía antes de recalcular, por lo mismo que en refresh_dirty
+    dirty = models.RollupDirtyDay
+    db.execute(delete(dirty).where(days(dirty.day)))
+    result = _recompute(db, days)
+    db.commit()
+    return result
+
+
+def refresh_dirty(db: Session, batch_days: int = REFRESH_BATCH_DAYS) -> dict:
+    """Recalcula los días marcados en ``rollup_dirty_days`` hasta vaciar la cola.
+
+    Cada lote se saca de la cola y se recalcula en la misma transacción. Los
+    días cuya marca tiene bloqueada una escritura aún sin confirmar se saltan
+    (``SKIP LOCKED``) y quedan para una pasada posterior, cuando sus filas ya
+    son visibles. Si una escritura marca uno de los días del lote mientras se
+    recalcula, su marca espera a que termine el lote y lo vuelve a dejar en la
+    cola, así que no se pierde.
+    """
+
+    dirty = models.RollupDirtyDay
+    totals = {"days": 0, "daily_sales": 0, "daily_order_totals": 0}
+    while True:
+        pending = (
+            select(dirty.day)
+            .order_by(dirty.day)
+            .limit(batch_days)
+            .with_for_update(skip_locked=True)
+        )
+        days = db.scalars(
+            delete(dirty).where(dirty.day.in_(pending)).returning(dirty.day)
+        ).all()
+        if not days:
+            db.commit()
+            return totals
+
+        result = _recompute(db, lambda column: column.in_(days))
+        db.commit()
+        totals["days"] += len(days)
+        for table, rows in result.items():
+            totals[table] += rows
+
+
+async def refresh_loop(session_factory, interval: float = REFRESH_INTERVAL) -> None:
+    """Procesa la cola de días marcados cada ``interval`` segundos.
+
+    Con varios workers cada uno ejecuta su bucle; ``SKIP LOCKED`` reparte los
+    días entre ellos sin recalcular dos veces el mismo lote.
+    """
+
+    while True:
+        try:
+            async with session_factory() as db:
+                result = await db.run_sync(refresh_dirty)
+            if result["days"]:
+                logger.info("Resúmenes de ventas recalculados: %s", result)
+        except Exception:
+            logger.exception("No se pudieron recalcular los resúmenes de ventas")
+        await asyncio.sleep(interval)
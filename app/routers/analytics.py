@@ -0,0 +1,179 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import analytics, rollups, schemas
+from ..dependencies import get_async_db
+from ..etags import etag_for
+
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+# Tablas de las que dependen los indicadores de ventas (para el ETag)
+ROLLUP_TABLES = ("daily_sales", "daily_order_totals", "customers", "products")
+SALES_TABLES = (
+    ROLLUP_TABLES if rollups.ENABLED else ("orders", "order_items", "customers", "products")
+)
+
+
+def get_sales_filters(
+    city: str | None = Query(None, description="Ciudad del cliente."),
+    status: list[str] = Query([], description="Estados del pedido (se puede repetir)."),
+    date_from: date | None = Query(None, description="Fecha de pedido mínima (incluida)."),
+    date_to: date | None = Query(None, description="Fecha de pedido máxima (incluida)."),
+) -> analytics.SalesFilters:
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from es posterior a date_to")
+    return analytics.SalesFilters(
+        city=city, statuses=tuple(status), date_from=date_from, date_to=date_to
+    )
+
+
+@router.get(
+    "/summary",
+    response_model=schemas.SalesSummary,
+    dependencies=[Depends(etag_for(*SALES_TABLES))],
+)
+async def sales_summary(
+    filters: analytics.SalesFilters = Depends(get_sales_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Ventas y pedidos con los filtros aplicados; clientes y productos totales."""
+
+    return await db.run_sync(analytics.get_summary, filters)
+
+
+@router.get(
+    "/monthly-sales",
+    response_model=list[schemas.MonthlySales],
+    dependencies=[Depends(etag_for(*SALES_TABLES))],
+)
+async def monthly_sales(
+    filters: analytics.SalesFilters = Depends(get_sales_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(analytics.get_monthly_sales, filters)
+
+
+@router.get(
+    "/top-products",
+    response_model=list[schemas.TopProduct],
+    dependencies=[Depends(etag_for(*SALES_TABLES))],
+)
+async def top_products(
+    limit: int = Query(analytics.DEFAULT_TOP, ge=1, le=100),
+    filters: analytics.SalesFilters = Depends(get_sales_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Productos con más unidades vendidas."""
+
+    return await db.run_sync(analytics.get_top_products, filters, limit)
+
+
+@router.get(
+    "/top-suppliers",
+    response_model=list[schemas.TopSupplier],
+    dependencies=[Depends(etag_for(*SALES_TABLES, "suppliers"))],
+)
+async def top_suppliers(
+    limit: int = Query(analytics.DEFAULT_TOP, ge=1, le=100),
+    filters: analytics.SalesFilters = Depends(get_sales_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Proveedores con mayor volumen de ventas."""
+
+    return await db.run_sync(analytics.get_top_suppliers, filters, limit)
+
+
+@router.get(
+    "/compare",
+    response_model=schemas.PeriodComparison,
+    dependencies=[Depends(etag_for(*SALES_TABLES))],
+)
+async def compare_periods(
+    date_from: date = Query(..., description="Inicio del periodo a analizar."),
+    date_to: date = Query(..., description="Fin del periodo a analizar (incluido)."),
+    compare_from: date | None = Query(
+        None, description="Inicio del periodo de referencia. Por defecto, el anterior."
+    ),
+    compare_to: date | None = Query(None, description="Fin del periodo de referencia."),
+    city: str | None = Query(None, description="Ciudad del cliente."),
+    status: list[str] = Query([], description="Estados del pedido (se puede repetir)."),
+    limit: int = Query(analytics.DEFAULT_TOP, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Compara ventas, pedidos, ticket medio y mayores variaciones entre dos periodos.
+
+    Con ``SALES_ROLLUPS=1`` se calcula con los resúmenes diarios
+    (``python -m app.manage rebuild-rollups``); si no, con las partidas.
+    """
+
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from es posterior a date_to")
+    current = analytics.Period(date_from, date_to)
+    previous = None
+    if compare_from is not None or compare_to is not None:
+        if compare_from is None or compare_to is None:
+            raise HTTPException(
+                status_code=400, detail="Indica compare_from y compare_to a la vez"
+            )
+        if compare_from > compare_to:
+            raise HTTPException(
+                status_code=400, detail="compare_from es posterior a compare_to"
+            )
+        previous = analytics.Period(compare_from, compare_to)
+    filters = analytics.SalesFilters(city=city, statuses=tuple(status))
+    return await db.run_sync(analytics.compare_periods, current, previous, filters, limit)
+
+
+@router.get(
+    "/customers-by-city",
+    response_model=list[schemas.CityCustomers],
+    dependencies=[Depends(etag_for("customers"))],
+)
+async def customers_by_city(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.get_customers_by_city)
+
+
+@router.get(
+    "/shipment-status",
+    response_model=list[schemas.ShipmentStatusCount],
+    dependencies=[Depends(etag_for("shipments", "orders", "customers"))],
+)
+async def shipment_status(
+    filters: analytics.SalesFilters = Depends(get_sales_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Envíos por estado de entrega, filtrables por los datos de su pedido."""
+
+    return await db.run_sync(analytics.get_shipment_status, filters)
+
+
+@router.get(
+    "/stock-by-warehouse",
+    response_model=list[schemas.WarehouseStock],
+    dependencies=[Depends(etag_for("inventories", "warehouses"))],
+)
+async def stock_by_warehouse(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.get_stock_by_warehouse)
+
+
+@router.post("/rollups/refresh", response_model=schemas.RollupResult)
+async def refresh_rollups(db: AsyncSession = Depends(get_async_db)):
+    """Recalcula ya los días marcados como pendientes en los resúmenes de ventas."""
+
+    return await db.run_sync(rollups.refresh_dirty)
+
+
+@router.post("/rollups/rebuild", response_model=schemas.RollupResult)
+async def rebuild_rollups(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Recalcula los resúmenes de un rango de fechas (o de todo el histórico)."""
+
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from es posterior a date_to")
+    return await db.run_sync(rollups.rebuild, date_from, date_to)
@@ -1,21 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import crud, schemas
-from ..dependencies import get_db
+from ..cache import cached_json, reference_caches
+from ..dependencies import get_async_db, get_page_params
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+cache = reference_caches["categories"]
 
-@router.get("/", response_model=list[schemas.Category])
-def list_categories(db: Session = Depends(get_db)):
-    return crud.get_categories(db)
+
+@router.get("/", response_model=schemas.CategoryPage)
+async def list_categories(
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await cached_json(
+        cache,
+        ("list", page.cursor, page.limit),
+        lambda: db.run_sync(crud.get_categories, cursor=page.cursor, limit=page.limit),
+        schemas.CategoryPage,
+    )
 
 
 @router.get("/{category_id}", response_model=schemas.Category)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = crud.get_category(db, category_id)
-    if category is None:
+async def get_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    response = await cached_json(
+        cache,
+        ("id", category_id),
+        lambda: db.run_sync(crud.get_category, category_id),
+        schemas.Category,
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
-    return category
+    return response
@@ -1,21 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..dependencies import get_db
+from .. import crud, fastpath, schemas
+from ..dependencies import get_async_db, get_page_params
+from ..fieldsets import FieldSelection, field_selector
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
 
-@router.get("/", response_model=list[schemas.Customer])
-def list_customers(db: Session = Depends(get_db)):
-    return crud.get_customers(db)
+@router.get("/", response_model=schemas.CustomerPage)
+async def list_customers(
+    page: PageParams = Depends(get_page_params),
+    selection: FieldSelection | None = Depends(field_selector(crud.CUSTOMER_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    result = await db.run_sync(
+        crud.get_customers, cursor=page.cursor, limit=page.limit, selection=selection
+    )
+    if selection is not None:
+        return fastpath.json_response(fastpath.dumps(selection.serialize_page(result)))
+    return result
 
 
 @router.get("/{customer_id}", response_model=schemas.Customer)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = crud.get_customer(db, customer_id)
+async def get_customer(
+    customer_id: int,
+    selection: FieldSelection | None = Depends(field_selector(crud.CUSTOMER_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    customer = await db.run_sync(crud.get_customer, customer_id, selection)
     if customer is None:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    if selection is not None:
+        return fastpath.json_response(fastpath.dumps(selection.serialize(customer)))
     return customer
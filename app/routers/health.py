@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from .. import query_profiler, schemas
+from ..cache import reference_caches
+from ..database import get_async_engine, get_engine, pool_stats
+
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/pool", response_model=list[schemas.PoolStatus])
+def pool_status():
+    """Conexiones en uso, libres y en desbordamiento, y espera media por pool."""
+
+    # Crea los motores si aún no existen, y con ellos sus contadores
+    engine, async_engine = get_engine(), get_async_engine()
+    return [
+        pool_stats["sync"].snapshot(engine.pool),
+        pool_stats["async"].snapshot(async_engine.sync_engine.pool),
+    ]
+
+
+@router.get("/cache", response_model=list[schemas.CacheStatus])
+def cache_status():
+    """Aciertos, fallos y tamaño de las cachés de datos de referencia."""
+
+    return [cache.stats() for cache in reference_caches.values()]
+
+
+@router.get("/queries", response_model=schemas.QueryProfile)
+def query_profile():
+    """Consultas más lentas con su plan y sentencias repetidas por petición (N+1).
+
+    Solo acumula datos con ``QUERY_PROFILING=1``.
+    """
+
+    return query_profiler.query_log.report()
+
+
+@router.get("/startup", response_model=schemas.StartupStatus)
+def startup_status(request: Request):
+    """Duración del último arranque de este proceso y conexiones precalentadas."""
+
+    startup = getattr(request.app.state, "startup", None)
+    if startup is None:
+        raise HTTPException(status_code=503, detail="La API no ha completado el arranque")
+    return startup
@@ -1,17 +1,54 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..dependencies import get_db
+from .. import crud, exports, fastpath, schemas
+from ..dependencies import get_async_db, get_page_params
+from ..etags import etag_for
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
 
-@router.get("/", response_model=list[schemas.Inventory])
-def list_inventory(
+@router.get(
+    "/",
+    response_model=schemas.InventoryPage,
+    dependencies=[Depends(etag_for("inventories", "products", "warehouses"))],
+)
+async def list_inventory(
+    response: Response,
     warehouse_id: int | None = None,
     product_id: int | None = None,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_inventory(db, warehouse_id=warehouse_id, product_id=product_id)
+    if fastpath.ENABLED:
+        body = await db.run_sync(
+            fastpath.inventory_page,
+            warehouse_id=warehouse_id,
+            product_id=product_id,
+            cursor=page.cursor,
+            limit=page.limit,
+        )
+        return fastpath.json_response(body, headers=response.headers)
+    return await db.run_sync(
+        crud.get_inventory,
+        warehouse_id=warehouse_id,
+        product_id=product_id,
+        cursor=page.cursor,
+        limit=page.limit,
+    )
+
+
+@router.get("/export")
+def export_inventory(
+    warehouse_id: int | None = None,
+    format: exports.ExportFormat = exports.ExportFormat.ndjson,
+):
+    """Descarga el inventario completo en NDJSON o CSV."""
+
+    return exports.export_response(
+        lambda db: crud.iter_inventory(db, warehouse_id=warehouse_id),
+        exports.INVENTORY_EXPORT,
+        format,
+    )
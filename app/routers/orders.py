@@ -1,21 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..dependencies import get_db
+from .. import crud, exports, fastpath, schemas
+from ..dependencies import get_async_db, get_page_params
+from ..fieldsets import FieldSelection, field_selector
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-@router.get("/", response_model=list[schemas.Order])
-def list_orders(status: str | None = None, db: Session = Depends(get_db)):
-    return crud.get_orders(db, status=status)
+@router.get("/", response_model=schemas.OrderPage)
+async def list_orders(
+    response: Response,
+    status: str | None = None,
+    page: PageParams = Depends(get_page_params),
+    selection: FieldSelection | None = Depends(field_selector(crud.ORDER_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if selection is not None:
+        result = await db.run_sync(
+            crud.get_orders,
+            status=status,
+            cursor=page.cursor,
+            limit=page.limit,
+            selection=selection,
+        )
+        body = fastpath.dumps(selection.serialize_page(result))
+        return fastpath.json_response(body, headers=response.headers)
+    if fastpath.ENABLED:
+        body = await db.run_sync(
+            fastpath.orders_page,
+            status=status,
+            cursor=page.cursor,
+            limit=page.limit,
+        )
+        return fastpath.json_response(body, headers=response.headers)
+    return await db.run_sync(
+        crud.get_orders, status=status, cursor=page.cursor, limit=page.limit
+    )
+
+
+@router.get("/export")
+def export_orders(
+    status: str | None = None,
+    format: exports.ExportFormat = exports.ExportFormat.ndjson,
+):
+    """Descarga todos los pedidos (NDJSON por pedido o CSV por partida)."""
+
+    return exports.export_response(
+        lambda db: crud.iter_orders(db, status=status), exports.ORDER_EXPORT, format
+    )
 
 
 @router.get("/{order_id}", response_model=schemas.Order)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    order = crud.get_order(db, order_id)
+async def get_order(
+    order_id: int,
+    selection: FieldSelection | None = Depends(field_selector(crud.ORDER_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    order = await db.run_sync(crud.get_order, order_id, selection)
     if order is None:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    if selection is not None:
+        return fastpath.json_response(fastpath.dumps(selection.serialize(order)))
     return order
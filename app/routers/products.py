@@ -1,31 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..dependencies import get_db
+from .. import crud, exports, fastpath, schemas
+from ..dependencies import get_async_db, get_page_params
+from ..etags import etag_for
+from ..fieldsets import FieldSelection, field_selector
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
-@router.get("/", response_model=list[schemas.Product])
-def list_products(
+@router.get(
+    "/",
+    response_model=schemas.ProductPage,
+    dependencies=[Depends(etag_for("products", "suppliers", "categories"))],
+)
+async def list_products(
+    response: Response,
     supplier_id: int | None = None,
     category_id: int | None = None,
     only_active: bool = False,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(get_page_params),
+    selection: FieldSelection | None = Depends(field_selector(crud.PRODUCT_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_products(
-        db,
+    if selection is not None:
+        result = await db.run_sync(
+            crud.get_products,
+            supplier_id=supplier_id,
+            category_id=category_id,
+            only_active=only_active,
+            cursor=page.cursor,
+            limit=page.limit,
+            selection=selection,
+        )
+        body = fastpath.dumps(selection.serialize_page(result))
+        return fastpath.json_response(body, headers=response.headers)
+    if fastpath.ENABLED:
+        body = await db.run_sync(
+            fastpath.products_page,
+            supplier_id=supplier_id,
+            category_id=category_id,
+            only_active=only_active,
+            cursor=page.cursor,
+            limit=page.limit,
+        )
+        return fastpath.json_response(body, headers=response.headers)
+    return await db.run_sync(
+        crud.get_products,
         supplier_id=supplier_id,
         category_id=category_id,
         only_active=only_active,
+        cursor=page.cursor,
+        limit=page.limit,
+    )
+
+
+@router.get("/export")
+def export_products(
+    only_active: bool = False,
+    format: exports.ExportFormat = exports.ExportFormat.ndjson,
+):
+    """Descarga el catálogo completo en NDJSON o CSV."""
+
+    return exports.export_response(
+        lambda db: crud.iter_products(db, only_active=only_active),
+        exports.PRODUCT_EXPORT,
+        format,
     )
 
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = crud.get_product(db, product_id)
+async def get_product(
+    product_id: int,
+    selection: FieldSelection | None = Depends(field_selector(crud.PRODUCT_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    product = await db.run_sync(crud.get_product, product_id, selection)
     if product is None:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
+    if selection is not None:
+        return fastpath.json_response(fastpath.dumps(selection.serialize(product)))
     return product
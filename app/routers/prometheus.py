@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .. import metrics
+from ..cache import reference_caches
+from ..database import get_async_engine, get_engine, pool_stats
+
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Métricas de peticiones, SQL, pools y cachés para Prometheus."""
+
+    # Crea los motores si aún no existen, y con ellos sus contadores
+    engine, async_engine = get_engine(), get_async_engine()
+    pools = [
+        pool_stats["sync"].snapshot(engine.pool),
+        pool_stats["async"].snapshot(async_engine.sync_engine.pool),
+    ]
+    caches = [cache.stats() for cache in reference_caches.values()]
+    return PlainTextResponse(
+        metrics.render(pools, caches), media_type=metrics.CONTENT_TYPE
+    )
@@ -1,21 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..dependencies import get_db
+from .. import crud, exports, fastpath, schemas
+from ..dependencies import get_async_db, get_page_params
+from ..etags import etag_for
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/shipments", tags=["shipments"])
 
 
-@router.get("/", response_model=list[schemas.Shipment])
-def list_shipments(status: str | None = None, db: Session = Depends(get_db)):
-    return crud.get_shipments(db, status=status)
+@router.get(
+    "/",
+    response_model=schemas.ShipmentPage,
+    dependencies=[Depends(etag_for("shipments", "orders", "customers", "warehouses"))],
+)
+async def list_shipments(
+    response: Response,
+    status: str | None = None,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if fastpath.ENABLED:
+        body = await db.run_sync(
+            fastpath.shipments_page,
+            status=status,
+            cursor=page.cursor,
+            limit=page.limit,
+        )
+        return fastpath.json_response(body, headers=response.headers)
+    return await db.run_sync(
+        crud.get_shipments, status=status, cursor=page.cursor, limit=page.limit
+    )
+
+
+@router.get("/export")
+def export_shipments(
+    status: str | None = None,
+    format: exports.ExportFormat = exports.ExportFormat.ndjson,
+):
+    """Descarga todos los envíos en NDJSON o CSV."""
+
+    return exports.export_response(
+        lambda db: crud.iter_shipments(db, status=status),
+        exports.SHIPMENT_EXPORT,
+        format,
+    )
 
 
 @router.get("/{shipment_id}", response_model=schemas.Shipment)
-def get_shipment(shipment_id: int, db: Session = Depends(get_db)):
-    shipment = crud.get_shipment(db, shipment_id)
+async def get_shipment(shipment_id: int, db: AsyncSession = Depends(get_async_db)):
+    shipment = await db.run_sync(crud.get_shipment, shipment_id)
     if shipment is None:
         raise HTTPException(status_code=404, detail="Envío no encontrado")
     return shipment
@@ -1,21 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import crud, schemas
-from ..dependencies import get_db
+from ..cache import cached_json, reference_caches
+from ..dependencies import get_async_db, get_page_params
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
+cache = reference_caches["suppliers"]
 
-@router.get("/", response_model=list[schemas.Supplier])
-def list_suppliers(db: Session = Depends(get_db)):
-    return crud.get_suppliers(db)
+
+@router.get("/", response_model=schemas.SupplierPage)
+async def list_suppliers(
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await cached_json(
+        cache,
+        ("list", page.cursor, page.limit),
+        lambda: db.run_sync(crud.get_suppliers, cursor=page.cursor, limit=page.limit),
+        schemas.SupplierPage,
+    )
 
 
 @router.get("/{supplier_id}", response_model=schemas.Supplier)
-def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
-    supplier = crud.get_supplier(db, supplier_id)
-    if supplier is None:
+async def get_supplier(supplier_id: int, db: AsyncSession = Depends(get_async_db)):
+    response = await cached_json(
+        cache,
+        ("id", supplier_id),
+        lambda: db.run_sync(crud.get_supplier, supplier_id),
+        schemas.Supplier,
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Proveedor no encontrado")
-    return supplier
+    return response
@@ -1,21 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import crud, schemas
-from ..dependencies import get_db
+from ..cache import cached_json, reference_caches
+from ..dependencies import get_async_db, get_page_params
+from ..pagination import PageParams
 
 
 router = APIRouter(prefix="/warehouses", tags=["warehouses"])
 
+cache = reference_caches["warehouses"]
 
-@router.get("/", response_model=list[schemas.Warehouse])
-def list_warehouses(db: Session = Depends(get_db)):
-    return crud.get_warehouses(db)
+
+@router.get("/", response_model=schemas.WarehousePage)
+async def list_warehouses(
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await cached_json(
+        cache,
+        ("list", page.cursor, page.limit),
+        lambda: db.run_sync(crud.get_warehouses, cursor=page.cursor, limit=page.limit),
+        schemas.WarehousePage,
+    )
 
 
 @router.get("/{warehouse_id}", response_model=schemas.Warehouse)
-def get_warehouse(warehouse_id: int, db: Session = Depends(get_db)):
-    warehouse = crud.get_warehouse(db, warehouse_id)
-    if warehouse is None:
+async def get_warehouse(warehouse_id: int, db: AsyncSession = Depends(get_async_db)):
+    response = await cached_json(
+        cache,
+        ("id", warehouse_id),
+        lambda: db.run_sync(crud.get_warehouse, warehouse_id),
+        schemas.Warehouse,
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Almacén no encontrado")
-    return warehouse
+    return response
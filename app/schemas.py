@@ -182,3 +182,208 @@ class Shipment(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+# Páginas de los listados: ``next_cursor`` se envía tal cual en el parámetro
+# ``cursor`` para pedir la página siguiente y es ``None`` en la última.
+class SupplierPage(BaseModel):
+    items: list[Supplier]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class CategoryPage(BaseModel):
+    items: list[Category]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProductPage(BaseModel):
+    items: list[Product]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class WarehousePage(BaseModel):
+    items: list[Warehouse]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class InventoryPage(BaseModel):
+    items: list[Inventory]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class CustomerPage(BaseModel):
+    items: list[Customer]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class OrderPage(BaseModel):
+    items: list[Order]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class ShipmentPage(BaseModel):
+    items: list[Shipment]
+    next_cursor: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class PoolStatus(BaseModel):
+    name: str
+    pool_class: str
+    size: int | None = None
+    checked_out: int | None = None
+    idle: int | None = None
+    overflow: int | None = None
+    connects: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    timeouts: int
+    peak_checked_out: int
+    wait_count: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+class StartupStatus(BaseModel):
+    pid: int
+    startup_seconds: float
+    engines_seconds: float
+    warmup_seconds: float
+    warmed_connections: int
+    budget_seconds: float
+
+
+class CacheStatus(BaseModel):
+    name: str
+    entries: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class SlowQuery(BaseModel):
+    statement: str
+    calls: int
+    total_ms: float
+    max_ms: float
+    parameters: str
+    route: str
+    plan: str | None = None
+
+
+class RepeatedStatement(BaseModel):
+    route: str
+    statement: str
+    requests: int
+    max_executions: int
+
+
+class QueryProfile(BaseModel):
+    enabled: bool
+    slow_query_ms: float
+    n_plus_one_threshold: int
+    slow_queries: list[SlowQuery]
+    n_plus_one: list[RepeatedStatement]
+
+
+class SalesSummary(BaseModel):
+    total_sales: Decimal
+    orders: int
+    customers: int
+    products: int
+
+
+class MonthlySales(BaseModel):
+    month: str
+    total_sales: Decimal
+
+
+class TopProduct(BaseModel):
+    product_id: int
+    name: str
+    quantity: int
+    total_sales: Decimal
+
+
+class TopSupplier(BaseModel):
+    supplier_id: int
+    name: str
+    total_sales: Decimal
+
+
+class CityCustomers(BaseModel):
+    city: str | None = None
+    customers: int
+
+
+class ShipmentStatusCount(BaseModel):
+    status: str | None = None
+    shipments: int
+
+
+class WarehouseStock(BaseModel):
+    warehouse_id: int
+    name: str
+    quantity_on_hand: int
+
+
+class RollupResult(BaseModel):
+    days: int | None = None
+    daily_sales: int
+    daily_order_totals: int
+
+
+class PeriodTotals(BaseModel):
+    date_from: date
+    date_to: date
+    total_sales: Decimal
+    orders: int
+    average_ticket: Decimal
+
+
+class MetricChange(BaseModel):
+    delta: Decimal
+    percent: float | None = None
+
+
+class PeriodMover(BaseModel):
+    id: int
+    name: str
+    current_sales: Decimal
+    previous_sales: Decimal
+    delta: Decimal
+
+
+class PeriodComparison(BaseModel):
+    current: PeriodTotals
+    previous: PeriodTotals
+    change: dict[str, MetricChange]
+    products: list[PeriodMover]
+    customers: list[PeriodMover]
@@ -0,0 +1,269 @@
+"""Copia local en columnas (Arrow) de las tablas de hechos para los paneles.
+
+Los paneles de Streamlit vuelven a leer ``orders``, ``order_items`` e
+``inventories`` de PostgreSQL cada vez que caduca su caché, y tras un reinicio
+el primer usuario espera a que se transfiera todo. Con este módulo cada tabla
+se guarda en disco como ficheros Arrow IPC sin comprimir que se abren con
+``memory_map`` (sin copiar ni decodificar), y al refrescar solo se piden a la
+base de datos las filas con ``id`` mayor que la marca de agua guardada.
+
+Para no servir filas modificadas o borradas, cada copia guarda el número de
+filas y la suma de ``hashtext`` de cada fila hasta la marca de agua. Si la
+tabla cambió (su versión en ``table_versions`` es otra, o no hay versiones),
+PostgreSQL recalcula esa huella sobre el rango ya copiado; si no coincide, la
+tabla se vuelve a copiar entera. Si la versión no cambió, refrescar no
+transfiere ninguna fila.
+
+Las filas nuevas se añaden como segmentos y cuando hay más de
+``SNAPSHOT_MAX_SEGMENTS`` se compactan en uno. Necesita ``pyarrow``.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+
+SNAPSHOT_DIR = os.getenv("DASHBOARD_SNAPSHOT_DIR", ".snapshots")
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("DASHBOARD_SNAPSHOT_REFRESH", "60"))
+SNAPSHOT_MAX_SEGMENTS = int(os.getenv("SNAPSHOT_MAX_SEGMENTS", "8"))
+SNAPSHOT_BATCH_ROWS = 50_000
+
+# Cambia si cambia el formato de los ficheros: las copias antiguas se descartan
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    """Tabla que se copia: ``columns`` es la lista del SELECT (admite casts).
+
+    ``key`` es la columna entera y creciente que hace de marca de agua.
+    """
+
+    name: str
+    columns: str
+    key: str = "id"
+
+    def source(self, condition: str) -> str:
+        return f"SELECT {self.columns} FROM public.{self.name} WHERE {condition}"
+
+
+class SnapshotStore:
+    """Copias en disco de varias tablas, compartidas por todas las sesiones.
+
+    ``table(name)`` devuelve la copia en memoria y la refresca como mucho una
+    vez cada ``refresh_interval`` segundos.
+    """
+
+    def __init__(
+        self,
+        engine,
+        tables,
+        directory=SNAPSHOT_DIR,
+        refresh_interval: float = SNAPSHOT_REFRESH_INTERVAL,
+    ):
+        if pa is None:
+            raise RuntimeError("Las copias locales necesitan pyarrow (pip install pyarrow)")
+        self.engine = engine
+        self.tables = {table.name: table for table in tables}
+        self.directory = Path(directory)
+        self.refresh_interval = refresh_interval
+        self._loaded: dict[str, tuple[float, "pa.Table"]] = {}
+        self._frames: dict[str, tuple["pa.Table", object]] = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> "pa.Table":
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded is None or time.monotonic() - loaded[0] >= self.refresh_interval:
+                self._refresh(self.tables[name])
+            return self._loaded[name][1]
+
+    def frame(self, name: str):
+        """La copia como DataFrame (fechas como ``datetime64``).
+
+        Solo se vuelve a convertir si la tabla cambió desde la última llamada.
+        """
+
+        table = self.table(name)
+        with self._lock:
+            cached = self._frames.get(name)
+            if cached is None or cached[0] is not table:
+                cached = (table, table.to_pandas(date_as_object=False))
+                self._frames[name] = cached
+            return cached[1]
+
+    def refresh(self) -> dict:
+        """Refresca todas las tablas ya y devuelve qué hizo con cada una."""
+
+        with self._lock:
+            return {name: self._refresh(table) for name, table in self.tables.items()}
+
+    # -- interno -----------------------------------------------------------
+
+    def _refresh(self, spec: SnapshotTable) -> dict:
+        started = time.perf_counter()
+        folder = self.directory / spec.name
+        manifest = _read_manifest(folder, spec)
+        current = self._loaded.get(spec.name)
+        table = current[1] if current else None
+
+        with self.engine.connect() as conn:
+            version = _table_version(conn, spec.name)
+            if manifest is not None and version is not None and version == manifest["table_version"]:
+                action, fetched = "unchanged", 0
+            elif manifest is not None and _fingerprint(conn, spec, manifest["watermark"]) == (
+                manifest["rows"],
+                manifest["row_hash"],
+            ):
+                delta, delta_hash = _fetch(conn, spec, f"{spec.key} > :watermark", manifest["watermark"])
+                action, fetched = "append", delta.num_rows
+                if delta.num_rows:
+                    if table is None:
+                        table = _load_segments(folder, manifest["segments"])
+                    table = pa.concat_tables([table, delta], promote_options="permissive")
+                    manifest["segments"].append(_write_segment(folder, delta))
+                    manifest["rows"] += delta.num_rows
+                    manifest["row_hash"] += delta_hash
+                    manifest["watermark"] = _max_key(delta, spec)
+                    if len(manifest["segments"]) > SNAPSHOT_MAX_SEGMENTS:
+                        manifest["segments"] = [_write_segment(folder, table)]
+            else:
+                table, row_hash = _fetch(conn, spec, "TRUE", None)
+                action, fetched = "full", table.num_rows
+                manifest = {
+                    "format": FORMAT_VERSION,
+                    "columns": spec.columns,
+                    "key": spec.key,
+                    "rows": table.num_rows,
+                    "row_hash": row_hash,
+                    "watermark": _max_key(table, spec),
+                    "segments": [_write_segment(folder, table)],
+                }
+            manifest["table_version"] = version
+
+        _write_manifest(folder, manifest)
+        _remove_stale_segments(folder, manifest["segments"])
+        if table is None:
+            table = _load_segments(folder, manifest["segments"])
+        self._loaded[spec.name] = (time.monotonic(), table)
+        return {
+            "action": action,
+            "fetched_rows": fetched,
+            "rows": table.num_rows,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+def _read_manifest(folder: Path, spec: SnapshotTable):
+    try:
+        manifest = json.loads((folder / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        manifest.get("format") != FORMAT_VERSION
+        or manifest.get("columns") != spec.columns
+        or manifest.get("key") != spec.key
+        or not all((folder / segment).exists() for segment in manifest.get("segments", ()))
+    ):
+        return None
+    return manifest
+
+
+def _write_manifest(folder: Path, manifest: dict) -> None:
+    tmp = folder / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, folder / MANIFEST)
+
+
+def _table_version(conn, name: str):
+    """Versión de la tabla en ``table_versions`` (``None`` si no se lleva)."""
+
+    exists = conn.execute(text("SELECT to_regclass('public.table_versions') IS NOT NULL")).scalar()
+    if not exists:
+        return None
+    return conn.execute(
+        text("SELECT version FROM public.table_versions WHERE table_name = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def _fingerprint(conn, spec: SnapshotTable, watermark) -> tuple[int, int]:
+    if watermark is None:
+        condition, params = "TRUE", {}
+    else:
+        condition, params = f"{spec.key} <= :watermark", {"watermark": watermark}
+    rows, row_hash = conn.execute(
+        text(
+            "SELECT count(*), COALESCE(sum(hashtext(s::text)::bigint), 0) "
+            f"FROM ({spec.source(condition)}) s"
+        ),
+        params,
+    ).one()
+    return int(rows), int(row_hash)
+
+
+def _fetch(conn, spec: SnapshotTable, condition: str, watermark):
+    """Filas que cumplen ``condition`` como tabla Arrow, más la suma de sus huellas."""
+
+    if watermark is None:
+        condition = "TRUE"
+    result = conn.execution_options(stream_results=True).execute(
+        text(
+            f"SELECT s.*, hashtext(s::text) AS _row_hash "
+            f"FROM ({spec.source(condition)} ORDER BY {spec.key}) s"
+        ),
+        {"watermark": watermark},
+    )
+    names = list(result.keys())[:-1]
+    batches, row_hash = [], 0
+    for rows in result.partitions(SNAPSHOT_BATCH_ROWS):
+        columns = list(zip(*rows))
+        row_hash += sum(columns[-1])
+        batches.append(pa.table(dict(zip(names, columns[:-1]))))
+    if not batches:
+        return pa.table({name: pa.array([], pa.null()) for name in names}), 0
+    return pa.concat_tables(batches, promote_options="permissive"), row_hash
+
+
+def _max_key(table: "pa.Table", spec: SnapshotTable):
+    if not table.num_rows:
+        return None
+    return pc.max(table[spec.key]).as_py()
+
+
+def _write_segment(folder: Path, table: "pa.Table") -> str:
+    folder.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time_ns()}.arrow"
+    tmp = folder / f"{name}.tmp"
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, folder / name)
+    return name
+
+
+def _load_segments(folder: Path, segments) -> "pa.Table":
+    tables = [
+        pa.ipc.open_file(pa.memory_map(str(folder / segment))).read_all() for segment in segments
+    ]
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def _remove_stale_segments(folder: Path, segments) -> None:
+    keep = set(segments)
+    for path in folder.glob("*.arrow*"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                # En Windows no se puede borrar un fichero mapeado; se reintenta la próxima vez
+                pass
@@ -0,0 +1,180 @@
+"""Compara la ruta rápida de serialización con la ruta ORM + Pydantic.
+
+Para cada listado pesado (productos, inventario, pedidos y envíos) recorre
+varias páginas con ambas rutas, comprueba que el JSON producido es idéntico y
+mide el tiempo medio de cada una. Sin ``--database-url`` crea una base SQLite
+temporal con datos sintéticos.
+
+Uso:
+    python scripts/bench_serialization.py --orders 5000 --page-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Base de datos ya poblada. Por defecto, SQLite temporal con datos sintéticos.",
+    )
+    parser.add_argument("--orders", type=int, default=2000, help="Pedidos sintéticos.")
+    parser.add_argument("--page-size", type=int, default=500, help="Filas por página.")
+    parser.add_argument("--pages", type=int, default=3, help="Páginas por listado.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición.")
+    return parser.parse_args()
+
+
+def seed(session_factory, models, n_orders: int) -> None:
+    rng = random.Random(42)
+    db = session_factory()
+    suppliers = [models.Supplier(name=f"Proveedor {i}", city="Madrid") for i in range(20)]
+    categories = [models.Category(name=f"Categoría {i}") for i in range(8)]
+    warehouses = [models.Warehouse(name=f"Almacén {i}", city="Bilbao") for i in range(4)]
+    db.add_all(suppliers + categories + warehouses)
+    db.flush()
+    products = [
+        models.Product(
+            name=f"Producto {i:04d}",
+            sku=f"SKU-{i:05d}",
+            unit="kg",
+            unit_price=Decimal(rng.randint(50, 5000)) / 100,
+            supplier_id=rng.choice(suppliers).id,
+            category_id=rng.choice(categories).id if i % 10 else None,
+        )
+        for i in range(500)
+    ]
+    customers = [models.Customer(name=f"Cliente {i}", city="Sevilla") for i in range(200)]
+    db.add_all(products + customers)
+    db.flush()
+    db.add_all(
+        models.Inventory(
+            product_id=product.id,
+            warehouse_id=warehouse.id,
+            quantity_on_hand=rng.randint(0, 1000),
+            safety_stock=50,
+            last_restocked=date(2024, 1, 1) + timedelta(days=rng.randint(0, 300)),
+        )
+        for product in products
+        for warehouse in warehouses
+    )
+    start = date(2023, 1, 1)
+    for i in range(n_orders):
+        order = models.Order(
+            customer_id=rng.choice(customers).id,
+            order_date=start + timedelta(days=rng.randint(0, 700)),
+            status=rng.choice(["pendiente", "entregado", "en tránsito"]),
+            total_amount=Decimal("0.00"),
+        )
+        db.add(order)
+        db.flush()
+        for _ in range(rng.randint(1, 6)):
+            db.add(
+                models.OrderItem(
+                    order_id=order.id,
+                    product_id=rng.choice(products).id,
+                    quantity=rng.randint(1, 50),
+                    unit_price=Decimal(rng.randint(50, 5000)) / 100,
+                    discount=Decimal("0.00"),
+                )
+            )
+        db.add(
+            models.Shipment(
+                order_id=order.id,
+                warehouse_id=rng.choice(warehouses).id if i % 7 else None,
+                shipped_at=(
+                    datetime(2023, 1, 1, 8, 30) + timedelta(hours=i) if i % 5 else None
+                ),
+                delivery_status="entregado",
+                tracking_number=f"TRK{i:07d}",
+            )
+        )
+    db.commit()
+    db.close()
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main() -> int:
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="bench_serialization_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+
+    from app import crud, fastpath, models, schemas
+    from app.database import SessionLocal, get_engine
+
+    if not args.database_url:
+        models.Base.metadata.create_all(bind=get_engine())
+        seed(SessionLocal, models, args.orders)
+
+    endpoints = [
+        ("products", crud.get_products, fastpath.products_page, schemas.ProductPage),
+        ("inventory", crud.get_inventory, fastpath.inventory_page, schemas.InventoryPage),
+        ("orders", crud.get_orders, fastpath.orders_page, schemas.OrderPage),
+        ("shipments", crud.get_shipments, fastpath.shipments_page, schemas.ShipmentPage),
+    ]
+
+    print(f"encoder: {'orjson' if fastpath.orjson else 'json'}")
+    print(f"{'listado':<10} {'página':>6} {'filas':>6} {'orm (ms)':>10} {'rápida (ms)':>12} {'x':>6}")
+    mismatches = 0
+    for name, load, fast, schema in endpoints:
+        cursor = None
+        for page_number in range(1, args.pages + 1):
+            def orm_path():
+                # Sesión nueva en cada repetición: sin mapa de identidad caliente
+                with SessionLocal() as db:
+                    page = load(db, cursor=cursor, limit=args.page_size)
+                    body = schema.model_validate(page, from_attributes=True)
+                    return body.model_dump_json().encode("utf-8"), page
+
+            def fast_path():
+                with SessionLocal() as db:
+                    return fast(db, cursor=cursor, limit=args.page_size)
+
+            orm_ms, (expected, page) = timed(orm_path, args.repeat)
+            fast_ms, body = timed(fast_path, args.repeat)
+            if body != expected:
+                mismatches += 1
+                print(f"  ¡diferencia en {name} página {page_number}!", file=sys.stderr)
+            speedup = orm_ms / fast_ms if fast_ms else float("inf")
+            print(
+                f"{name:<10} {page_number:>6} {len(page.items):>6} "
+                f"{orm_ms:>10.1f} {fast_ms:>12.1f} {speedup:>6.1f}"
+            )
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    if mismatches:
+        print(f"{mismatches} páginas con salida distinta", file=sys.stderr)
+        return 1
+    print("Salida idéntica en todas las páginas.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
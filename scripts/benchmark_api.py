@@ -0,0 +1,667 @@
+"""Mide el rendimiento HTTP de la API: peticiones por segundo y latencias.
+
+Arranca ``app.main:app`` con uvicorn en un proceso aparte sobre una base de
+datos poblada a una escala fija y recorre, uno tras otro, los escenarios de
+``SCENARIOS`` (al menos uno por cada ruta GET de ``app/routers/``) con
+``--concurrency`` clientes httpx simultáneos. Para cada escenario guarda el
+rendimiento (peticiones/s), las latencias p50/p95/p99, los errores y el tamaño
+medio de la respuesta en un JSON que incluye el commit, la escala y la
+configuración, de modo que dos ejecuciones se pueden comparar.
+
+Bases de datos:
+
+* por defecto, una SQLite temporal poblada con ``generate_dataset.py`` a la
+  escala ``--scale`` (``small``, ``medium`` o ``large``);
+* con ``--database-url`` una base existente tal cual está (por ejemplo cargada
+  antes con ``generate_dataset.py``); con ``--populate`` se vacía y se puebla
+  a la escala ``--scale`` (solo PostgreSQL, mediante ``COPY``).
+
+Uso::
+
+    python scripts/benchmark_api.py run --scale medium --concurrency 16
+    python scripts/benchmark_api.py run --database-url postgresql://... --env FAST_SERIALIZATION=1
+    python scripts/benchmark_api.py compare benchmarks/antes.json benchmarks/despues.json
+
+``compare`` muestra la variación de cada escenario y termina con código 1 si
+alguno empeora más de ``--threshold`` por ciento (p95 o peticiones/s).
+
+El informe guarda también el tiempo de arranque: desde lanzar uvicorn hasta
+la primera respuesta y el que cada proceso anota en ``GET /health/startup``.
+Con ``--startup-budget SEGUNDOS`` (útil junto a ``--workers``) la ejecución
+termina con código 1 si el arranque lo supera.
+
+Las latencias se miden desde el cliente e incluyen su propio coste; solo son
+comparables entre ejecuciones en la misma máquina y con la misma escala.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import calendar
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+# Partidas de pedido de cada escala (el resto de tablas se deriva de ellas)
+SCALES = {"small": 10_000, "medium": 100_000, "large": 1_000_000}
+
+# Colecciones de las que se toman los id de las rutas de detalle
+COLLECTIONS = ("suppliers", "categories", "warehouses", "customers", "products", "orders", "shipments")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Petición GET que se repite; ``ids`` indica de qué colección sale ``{id}``.
+
+    En ``params`` los valores pueden usar ``{date_from}`` y ``{date_to}``, que
+    se calculan con los meses que tienen ventas. Los escenarios ``heavy``
+    (exportaciones completas) se repiten solo ``--heavy-requests`` veces.
+    """
+
+    name: str
+    path: str
+    params: tuple[tuple[str, str], ...] = ()
+    ids: str | None = None
+    heavy: bool = False
+
+
+SCENARIOS = [
+    Scenario("root", "/"),
+    Scenario("suppliers.list", "/suppliers/"),
+    Scenario("suppliers.detail", "/suppliers/{id}", ids="suppliers"),
+    Scenario("categories.list", "/categories/"),
+    Scenario("categories.detail", "/categories/{id}", ids="categories"),
+    Scenario("warehouses.list", "/warehouses/"),
+    Scenario("warehouses.detail", "/warehouses/{id}", ids="warehouses"),
+    Scenario("customers.list", "/customers/"),
+    Scenario("customers.detail", "/customers/{id}", ids="customers"),
+    Scenario("products.list", "/products/"),
+    Scenario("products.list_500", "/products/", (("limit", "500"),)),
+    Scenario("products.fields", "/products/", (("fields", "id,name,unit_price"),)),
+    Scenario("products.detail", "/products/{id}", ids="products"),
+    Scenario("products.export", "/products/export", heavy=True),
+    Scenario("inventory.list", "/inventory/"),
+    Scenario("inventory.list_500", "/inventory/", (("limit", "500"),)),
+    Scenario("inventory.export", "/inventory/export", heavy=True),
+    Scenario("orders.list", "/orders/"),
+    Scenario("orders.list_500", "/orders/", (("limit", "500"),)),
+    Scenario("orders.by_status", "/orders/", (("status", "pendiente"),)),
+    Scenario("orders.detail", "/orders/{id}", ids="orders"),
+    Scenario("orders.export", "/orders/export", heavy=True),
+    Scenario("shipments.list", "/shipments/"),
+    Scenario("shipments.list_500", "/shipments/", (("limit", "500"),)),
+    Scenario("shipments.detail", "/shipments/{id}", ids="shipments"),
+    Scenario("shipments.export", "/shipments/export", heavy=True),
+    Scenario("analytics.summary", "/analytics/summary"),
+    Scenario(
+        "analytics.summary_filtered",
+        "/analytics/summary",
+        (("city", "Madrid"), ("status", "entregado"), ("date_from", "{date_from}"), ("date_to", "{date_to}")),
+    ),
+    Scenario("analytics.monthly_sales", "/analytics/monthly-sales"),
+    Scenario("analytics.top_products", "/analytics/top-products"),
+    Scenario("analytics.top_suppliers", "/analytics/top-suppliers"),
+    Scenario(
+        "analytics.compare",
+        "/analytics/compare",
+        (("date_from", "{date_from}"), ("date_to", "{date_to}")),
+    ),
+    Scenario("analytics.customers_by_city", "/analytics/customers-by-city"),
+    Scenario("analytics.shipment_status", "/analytics/shipment-status"),
+    Scenario("analytics.stock_by_warehouse", "/analytics/stock-by-warehouse"),
+    Scenario("health.pool", "/health/pool"),
+    Scenario("health.cache", "/health/cache"),
+    Scenario("health.queries", "/health/queries"),
+    Scenario("health.startup", "/health/startup"),
+]
+
+# Rutas GET que no son de la API en sí
+IGNORED_PATHS = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Ejecuta el banco de pruebas y guarda el resultado.")
+    run.add_argument(
+        "--database-url",
+        default=None,
+        help="Base de datos a usar. Por defecto, SQLite temporal poblada a la escala --scale.",
+    )
+    run.add_argument("--scale", choices=SCALES, default="small", help="Escala de los datos generados.")
+    run.add_argument(
+        "--populate",
+        action="store_true",
+        help="Vacía la base de --database-url y la puebla a la escala --scale.",
+    )
+    run.add_argument("--seed", type=int, default=42, help="Semilla de los datos y de los id pedidos.")
+    run.add_argument("--concurrency", type=int, default=8, help="Clientes simultáneos.")
+    run.add_argument("--requests", type=int, default=200, help="Peticiones por escenario.")
+    run.add_argument("--heavy-requests", type=int, default=3, help="Peticiones por exportación.")
+    run.add_argument("--warmup", type=int, default=10, help="Peticiones previas no medidas.")
+    run.add_argument("--workers", type=int, default=1, help="Procesos de uvicorn.")
+    run.add_argument(
+        "--only",
+        default=None,
+        help="Expresión regular: solo los escenarios cuyo nombre coincide.",
+    )
+    run.add_argument(
+        "--startup-budget",
+        type=float,
+        default=None,
+        metavar="SEGUNDOS",
+        help="Termina con error si la API tarda más en arrancar.",
+    )
+    run.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="CLAVE=VALOR",
+        help="Variable de entorno para la API (se puede repetir), p. ej. FAST_SERIALIZATION=1.",
+    )
+    run.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Fichero JSON de resultados. Por defecto benchmarks/api-<commit>-<escala>.json.",
+    )
+
+    compare = commands.add_parser("compare", help="Compara dos resultados.")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("candidate", type=Path)
+    compare.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Empeoramiento máximo tolerado, en por ciento.",
+    )
+    return parser.parse_args()
+
+
+# -- datos -------------------------------------------------------------------
+
+
+def populate(database_url: str, items: int, seed: int) -> dict:
+    """Crea el esquema, lo puebla con ``generate_dataset`` y recalcula los
+    resúmenes diarios de ventas; devuelve filas por tabla.
+    """
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.orm import Session
+
+    from app import models, rollups
+
+    from generate_dataset import TABLES, Dataset, Scale
+
+    engine = create_engine(database_url)
+    models.Base.metadata.create_all(bind=engine)
+    dataset = Dataset(Scale(items), seed=seed)
+    try:
+        if make_url(database_url).get_backend_name() == "sqlite":
+            counts = _insert_sqlite(engine, dataset, TABLES)
+        else:
+            counts = _copy_postgres(database_url, dataset, TABLES)
+        # La carga masiva no pasa por los disparadores que marcan días: sin
+        # esto, con SALES_ROLLUPS=1 las analíticas saldrían vacías
+        with Session(engine) as db:
+            rollups.rebuild(db)
+        return counts
+    finally:
+        engine.dispose()
+
+
+def _insert_sqlite(engine, dataset, tables: dict) -> dict:
+    import pandas as pd
+
+    from generate_dataset import DATE_COLUMNS
+
+    counts = {}
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        for table, columns in tables.items():
+            statement = (
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})"
+            )
+            counts[table] = 0
+            for frame in dataset.frames(table):
+                frame = frame[columns].copy()
+                for name in columns:
+                    if name in DATE_COLUMNS:
+                        frame[name] = frame[name].dt.strftime("%Y-%m-%d")
+                    elif pd.api.types.is_datetime64_any_dtype(frame[name]):
+                        frame[name] = frame[name].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+                frame = frame.astype(object).where(frame.notna(), None)
+                cur.executemany(statement, frame.itertuples(index=False, name=None))
+                counts[table] += len(frame)
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def _copy_postgres(database_url: str, dataset, tables: dict) -> dict:
+    import psycopg2
+    from sqlalchemy.engine import make_url
+
+    from bulk_load import BulkLoader, chunks_source
+    from generate_dataset import to_csv
+
+    dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    sources = [
+        chunks_source(
+            table,
+            columns,
+            lambda table=table, columns=columns: (to_csv(frame, columns) for frame in dataset.frames(table)),
+        )
+        for table, columns in tables.items()
+    ]
+    result = BulkLoader(lambda: psycopg2.connect(dsn), "public", 4).load(
+        sources, truncate=True, log=lambda message: None
+    )
+    return {table: info["rows"] for table, info in result["tables"].items()}
+
+
+# -- servidor ----------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, workers: int, extra_env: dict) -> subprocess.Popen:
+    env = {**os.environ, **extra_env, "DATABASE_URL": database_url}
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+def wait_ready(server: subprocess.Popen, base_url: str, timeout: float = 60.0) -> float:
+    """Espera a que la API responda y devuelve los segundos que tardó."""
+
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn terminó al arrancar (código {server.returncode})")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"La API no respondió en {timeout:.0f} s")
+
+
+def worker_startups(base_url: str, workers: int) -> dict:
+    """Arranque que anota cada proceso de uvicorn, por pid.
+
+    Las conexiones nuevas se reparten entre los procesos, así que se pregunta
+    varias veces hasta verlos todos (o agotar los intentos).
+    """
+
+    startups = {}
+    for _ in range(workers * 20):
+        response = httpx.get(f"{base_url}/health/startup", timeout=5.0)
+        if response.status_code == 200:
+            data = response.json()
+            startups[data["pid"]] = round(data["startup_seconds"], 3)
+        if len(startups) >= workers:
+            break
+    return startups
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+# -- medición ----------------------------------------------------------------
+
+
+async def discover(client: httpx.AsyncClient) -> dict:
+    """id disponibles por colección y periodo de fechas con ventas."""
+
+    context = {"ids": {}}
+    for collection in COLLECTIONS:
+        response = await client.get(f"/{collection}/", params={"limit": 500})
+        response.raise_for_status()
+        context["ids"][collection] = [item["id"] for item in response.json()["items"]]
+
+    # Los tres últimos meses con ventas
+    months = []
+    response = await client.get("/analytics/monthly-sales")
+    if response.status_code == 200:
+        months = [row["month"] for row in response.json()]
+    if months:
+        year, month = (int(part) for part in months[-1][:7].split("-"))
+        last_day = calendar.monthrange(year, month)[1]
+        first_year, first_month = (year, month - 2) if month > 2 else (year - 1, month + 10)
+        context["date_from"] = date(first_year, first_month, 1).isoformat()
+        context["date_to"] = date(year, month, last_day).isoformat()
+    else:
+        context["date_from"], context["date_to"] = "2024-01-01", "2024-03-31"
+    return context
+
+
+def uncovered_paths(openapi: dict) -> list[str]:
+    """Rutas GET de la API que no tiene ningún escenario."""
+
+    covered = {re.sub(r"\{[^}]+\}", "{}", scenario.path) for scenario in SCENARIOS}
+    missing = []
+    for path, operations in openapi.get("paths", {}).items():
+        if "get" in operations and path not in IGNORED_PATHS:
+            if re.sub(r"\{[^}]+\}", "{}", path) not in covered:
+                missing.append(path)
+    return missing
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada."""
+
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, round(q / 100 * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    context: dict,
+    requests: int,
+    warmup: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict:
+    params = [(key, value.format(**context)) for key, value in scenario.params]
+    if scenario.ids is not None:
+        ids = context["ids"].get(scenario.ids) or []
+        if not ids:
+            return {"skipped": f"sin filas en {scenario.ids}"}
+        paths = [scenario.path.format(id=rng.choice(ids)) for _ in range(warmup + requests)]
+    else:
+        paths = [scenario.path] * (warmup + requests)
+
+    latencies, statuses, sizes = [], {}, []
+
+    async def fetch(path: str, record: bool) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            status, size = str(response.status_code), len(response.content)
+        except httpx.HTTPError as exc:
+            status, size = type(exc).__name__, 0
+        if record:
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            sizes.append(size)
+
+    queue = asyncio.Queue()
+    for path in paths[warmup:]:
+        queue.put_nowait(path)
+
+    async def worker() -> None:
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await fetch(path, record=True)
+
+    for path in paths[:warmup]:
+        await fetch(path, record=False)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "path": scenario.path,
+        "params": params,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "response_bytes": round(sum(sizes) / len(sizes)),
+    }
+
+
+async def run_scenarios(base_url: str, args: argparse.Namespace) -> tuple[dict, list[str]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    rng = random.Random(args.seed)
+    pattern = re.compile(args.only) if args.only else None
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        response = await client.get("/openapi.json")
+        response.raise_for_status()
+        missing = uncovered_paths(response.json())
+        context = await discover(client)
+        for scenario in SCENARIOS:
+            if pattern is not None and not pattern.search(scenario.name):
+                continue
+            requests = args.heavy_requests if scenario.heavy else args.requests
+            warmup = min(1, args.warmup) if scenario.heavy else args.warmup
+            result = await measure(
+                client, scenario, context, requests, warmup, args.concurrency, rng
+            )
+            results[scenario.name] = result
+            print_result(scenario.name, result)
+    return results, missing
+
+
+# -- informes ----------------------------------------------------------------
+
+
+def git_revision() -> dict:
+    def git(*command) -> str:
+        completed = subprocess.run(
+            ["git", *command], cwd=ROOT, capture_output=True, text=True, check=False
+        )
+        return completed.stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_header() -> None:
+    print(
+        f"{'escenario':<32} {'pet.':>6} {'err.':>5} {'pet./s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'bytes':>10}"
+    )
+
+
+def print_result(name: str, result: dict) -> None:
+    if "skipped" in result:
+        print(f"{name:<32} omitido: {result['skipped']}")
+        return
+    latency = result["latency_ms"]
+    print(
+        f"{name:<32} {result['requests']:>6} {result['errors']:>5} {result['throughput_rps']:>9.1f} "
+        f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} {result['response_bytes']:>10}"
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    extra_env = {}
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            print(f"--env espera CLAVE=VALOR: {item}", file=sys.stderr)
+            return 1
+        extra_env[key] = value
+
+    if args.database_url:
+        database_url = args.database_url
+        backend = database_url.split(":", 1)[0].split("+", 1)[0]
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="benchmark_api_")
+        database_url = f"sqlite:///{tmpdir}/bench.db"
+        backend = "sqlite"
+    rows = None
+    scale = "existing"
+    if args.populate or not args.database_url:
+        if args.populate and backend != "postgresql":
+            print("--populate solo admite PostgreSQL", file=sys.stderr)
+            return 1
+        scale = args.scale
+        started = time.perf_counter()
+        rows = populate(database_url, SCALES[args.scale], args.seed)
+        print(f"Datos '{args.scale}': {sum(rows.values())} filas ({time.perf_counter() - started:.1f} s).")
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(database_url, port, args.workers, extra_env)
+    try:
+        startup = wait_ready(server, base_url)
+        print(f"API lista en {startup:.2f} s ({base_url}, {args.workers} proceso(s)).")
+        startups = worker_startups(base_url, args.workers)
+        if startups:
+            print(f"Arranque por proceso: {', '.join(f'{value:.2f} s' for value in startups.values())}.")
+        print_header()
+        results, missing = asyncio.run(run_scenarios(base_url, args))
+    except (RuntimeError, httpx.HTTPError) as exc:
+        print(f"Error durante la medición: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        stop_server(server)
+
+    if missing:
+        print(f"Rutas GET sin escenario: {', '.join(missing)}", file=sys.stderr)
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            **revision,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "scale": scale,
+            "rows": rows,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "heavy_requests": args.heavy_requests,
+            "workers": args.workers,
+            "env": extra_env,
+            "startup_seconds": round(startup, 3),
+            "worker_startup_seconds": startups,
+            "uncovered_paths": missing,
+        },
+        "endpoints": results,
+    }
+    output = args.output
+    if output is None:
+        commit = (revision["commit"] or "local")[:10]
+        output = ROOT / "benchmarks" / f"api-{commit}-{backend}-{scale}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados en {output}")
+    if args.startup_budget is not None and startup > args.startup_budget:
+        print(
+            f"El arranque ({startup:.2f} s) supera el presupuesto de {args.startup_budget:g} s.",
+            file=sys.stderr,
+        )
+        return 1
+    return 1 if any(result.get("errors") for result in results.values()) else 0
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    candidate = json.loads(args.candidate.read_text(encoding="utf-8"))
+    for key in ("backend", "scale", "concurrency", "workers", "env"):
+        if baseline["meta"].get(key) != candidate["meta"].get(key):
+            print(
+                f"Aviso: '{key}' distinto ({baseline['meta'].get(key)} → {candidate['meta'].get(key)})",
+                file=sys.stderr,
+            )
+
+    print(
+        f"{'escenario':<32} {'pet./s':>17} {'Δ%':>7} {'p50 ms':>17} {'p95 ms':>17} {'Δ%':>7} {'p99 ms':>17}"
+    )
+    regressions = []
+    for name, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(name)
+        if after is None or "skipped" in before or "skipped" in after:
+            continue
+        rps = change(before["throughput_rps"], after["throughput_rps"])
+        p95 = change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        slower = p95 > args.threshold or rps < -args.threshold
+        if slower:
+            regressions.append(name)
+        cells = [
+            f"{before['throughput_rps']:>7.1f}→{after['throughput_rps']:<9.1f}",
+            f"{rps:>+7.1f}",
+            f"{before['latency_ms']['p50']:>7.2f}→{after['latency_ms']['p50']:<9.2f}",
+            f"{before['latency_ms']['p95']:>7.2f}→{after['latency_ms']['p95']:<9.2f}",
+            f"{p95:>+7.1f}",
+            f"{before['latency_ms']['p99']:>7.2f}→{after['latency_ms']['p99']:<9.2f}",
+        ]
+        print(f"{name:<32} {' '.join(cells)}{'  ← peor' if slower else ''}")
+
+    before_startup = baseline["meta"].get("startup_seconds")
+    after_startup = candidate["meta"].get("startup_seconds")
+    if before_startup is not None and after_startup is not None:
+        print(
+            f"{'arranque (s)':<32} {before_startup:>7.2f}→{after_startup:<9.2f} "
+            f"{change(before_startup, after_startup):>+7.1f}"
+        )
+
+    new = sorted(set(candidate["endpoints"]) - set(baseline["endpoints"]))
+    if new:
+        print(f"Escenarios nuevos: {', '.join(new)}")
+    if regressions:
+        print(f"{len(regressions)} escenarios empeoran más de un {args.threshold:g} %.", file=sys.stderr)
+        return 1
+    print(f"Ningún escenario empeora más de un {args.threshold:g} %.")
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "compare":
+        return compare(args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
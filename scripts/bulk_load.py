@@ -0,0 +1,577 @@
+"""Carga masiva de tablas con ``COPY FROM STDIN``.
+
+Sustituye a ejecutar con ``psql`` ficheros de miles de ``INSERT``: cada tabla
+se envía con un único ``COPY`` a partir de un CSV (con cabecera) o un NDJSON
+(un objeto JSON por línea), opcionalmente comprimidos con gzip. Las tablas se
+cargan en paralelo, cada una por su propia conexión.
+
+Las tablas se cargan por capas según sus claves foráneas: las de una misma
+capa no dependen entre sí. Los índices que no respaldan una restricción (clave
+primaria, UNIQUE) se eliminan antes de cargar y se vuelven a crear al final,
+también en paralelo, de modo que se construyen una sola vez en lugar de
+actualizarse fila a fila (``--keep-indexes`` lo evita).
+
+Con ``--defer-constraints`` las claves foráneas también se quitan y todas las
+tablas se cargan a la vez; al final se añaden como ``NOT VALID`` y se validan
+con ``VALIDATE CONSTRAINT``, una consulta por clave (varias veces más rápido
+que comprobar cada fila). Una clave que no valida queda puesta, sin validar, y
+se informa de ella. Antes de quitar nada se escribe en ``--restore-file`` (por
+defecto, un fichero en el directorio temporal) el SQL que recrea los índices
+y las claves, por si la carga se interrumpe antes de restaurarlos.
+Después se ajustan las secuencias de los ``id`` y se ejecuta ``ANALYZE``.
+
+Uso::
+
+    python scripts/bulk_load.py datos/ --db-name fastapi_db --jobs 4
+
+donde ``datos/`` contiene ficheros como ``customers.csv`` u
+``order_items.ndjson.gz`` (el nombre del fichero es el de la tabla). Cada
+tabla se carga en su propia transacción: si una falla, las ya cargadas se
+quedan y los índices y las claves foráneas se recrean igualmente (si los datos
+cargados no las cumplen, el error lo indica).
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql
+
+SUFFIXES = {".csv": "csv", ".ndjson": "text", ".jsonl": "text"}
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class Source:
+    """Datos de una tabla listos para ``COPY``.
+
+    ``open`` devuelve un fichero binario en formato ``csv`` (sin cabecera) o
+    ``text`` (el formato por defecto de ``COPY``) con las columnas ``columns``.
+    """
+
+    table: str
+    columns: list[str]
+    format: str
+    open: Callable[[], io.RawIOBase]
+    label: str = ""
+
+
+class ChunkStream(io.RawIOBase):
+    """Fichero de solo lectura sobre un iterable de bloques de bytes."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        size = CHUNK_SIZE if size is None or size < 0 else size
+        # Cada bloque se copia una sola vez aunque sea mucho mayor que ``size``
+        while len(self._buffer) - self._offset < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer = self._buffer[self._offset :] + chunk
+            self._offset = 0
+        data = self._buffer[self._offset : self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def encode_rows(rows: Iterable[Iterable]) -> Iterable[bytes]:
+    """Codifica filas al formato ``text`` de ``COPY``, una línea por fila."""
+
+    for row in rows:
+        yield "\t".join(map(copy_text_value, row)).encode("utf-8") + b"\n"
+
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).translate(_ESCAPES)
+
+
+def _open_binary(path: Path):
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+def csv_source(table: str, path: Path) -> Source:
+    """CSV con cabecera; la cabecera da las columnas."""
+
+    def open_data():
+        handle = _open_binary(path)
+        handle.readline()  # la cabecera ya se leyó para obtener las columnas
+        return handle
+
+    with _open_binary(path) as handle:
+        header = handle.readline().decode("utf-8-sig")
+    columns = next(csv.reader([header]))
+    return Source(table, columns, "csv", open_data, str(path))
+
+
+def ndjson_source(table: str, path: Path) -> Source:
+    """Un objeto JSON por línea; las columnas son las claves del primero."""
+
+    with _open_binary(path) as handle:
+        first = handle.readline()
+    columns = list(json.loads(first)) if first.strip() else []
+
+    def rows():
+        with _open_binary(path) as handle:
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    yield [record.get(column) for column in columns]
+
+    return Source(table, columns, "text", lambda: ChunkStream(encode_rows(rows())), str(path))
+
+
+def chunks_source(
+    table: str, columns: list[str], chunks: Callable[[], Iterable[bytes]], format: str = "csv"
+) -> Source:
+    """Bloques ya codificados en ``format`` (por ejemplo, ``generate_dataset.py``)."""
+
+    return Source(table, list(columns), format, lambda: ChunkStream(chunks()), "<generado>")
+
+
+def sources_from_directory(directory: Path) -> list[Source]:
+    sources = []
+    for path in sorted(directory.iterdir()):
+        suffixes = [s for s in path.suffixes if s != ".gz"]
+        if not path.is_file() or not suffixes or suffixes[-1] not in SUFFIXES:
+            continue
+        table = path.name.split(".")[0]
+        if SUFFIXES[suffixes[-1]] == "csv":
+            sources.append(csv_source(table, path))
+        else:
+            sources.append(ndjson_source(table, path))
+    return sources
+
+
+def load_layers(conn, schema: str, tables: list[str]) -> list[list[str]]:
+    """Agrupa las tablas en capas: cada una solo referencia a capas anteriores."""
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT child.relname, parent.relname
+            FROM pg_constraint c
+            JOIN pg_class child ON child.oid = c.conrelid
+            JOIN pg_class parent ON parent.oid = c.confrelid
+            JOIN pg_namespace n ON n.oid = child.relnamespace
+            WHERE c.contype = 'f' AND n.nspname = %s AND c.conrelid <> c.confrelid
+            """,
+            (schema,),
+        )
+        edges = cur.fetchall()
+    pending = set(tables)
+    depends = {table: set() for table in tables}
+    for child, parent in edges:
+        if child in pending and parent in pending:
+            depends[child].add(parent)
+    layers = []
+    while pending:
+        layer = [table for table in tables if table in pending and not depends[table] & pending]
+        if not layer:
+            raise RuntimeError(f"Dependencias circulares entre: {', '.join(sorted(pending))}")
+        layers.append(layer)
+        pending -= set(layer)
+    return layers
+
+
+def deferrable_indexes(conn, schema: str, tables: list[str]) -> list[tuple[str, str, str]]:
+    """(tabla, índice, definición) de los índices que no respaldan restricciones."""
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT t.relname, i.relname, pg_get_indexdef(x.indexrelid)
+            FROM pg_index x
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = %s AND t.relname = ANY(%s)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            ORDER BY t.relname, i.relname
+            """,
+            (schema, tables),
+        )
+        return cur.fetchall()
+
+
+def deferrable_constraints(conn, schema: str, tables: list[str]) -> list[tuple[str, str, str]]:
+    """(tabla, restricción, definición) de las claves foráneas de las tablas a cargar."""
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT t.relname, c.conname, regexp_replace(pg_get_constraintdef(c.oid), ' NOT VALID$', '')
+            FROM pg_constraint c
+            JOIN pg_class t ON t.oid = c.conrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE c.contype = 'f' AND n.nspname = %s AND t.relname = ANY(%s)
+            ORDER BY t.relname, c.conname
+            """,
+            (schema, tables),
+        )
+        return cur.fetchall()
+
+
+def write_restore_file(path: Path, schema: str, indexes, constraints) -> None:
+    """SQL que vuelve a crear los índices y claves foráneas que se van a quitar."""
+
+    lines = [
+        f"-- Índices y claves foráneas quitados por bulk_load.py en el esquema {schema}.",
+        "-- Si la carga se interrumpe antes de restaurarlos: psql -f este_fichero",
+    ]
+    for _, _, definition in indexes:
+        lines.append(re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX IF NOT EXISTS ", definition) + ";")
+    for table, constraint, definition in constraints:
+        target = f'"{schema}"."{table}"'
+        lines.append(f'ALTER TABLE {target} ADD CONSTRAINT "{constraint}" {definition} NOT VALID;')
+        lines.append(f'ALTER TABLE {target} VALIDATE CONSTRAINT "{constraint}";')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class BulkLoader:
+    """Carga varias tablas por capas con ``COPY`` desde conexiones en paralelo."""
+
+    def __init__(self, connect: Callable, schema: str = "public", jobs: int = 4):
+        self.connect = connect
+        self.schema = schema
+        self.jobs = jobs
+
+    def _run(self, statement, params=None):
+        conn = self.connect()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(statement, params)
+        finally:
+            conn.close()
+
+    def _copy(self, source: Source) -> tuple[str, int, float]:
+        started = time.perf_counter()
+        statement = sql.SQL("COPY {}.{} ({}) FROM STDIN WITH (FORMAT {})").format(
+            sql.Identifier(self.schema),
+            sql.Identifier(source.table),
+            sql.SQL(", ").join(map(sql.Identifier, source.columns)),
+            sql.SQL(source.format),
+        )
+        conn = self.connect()
+        try:
+            with conn, conn.cursor() as cur, source.open() as stream:
+                cur.copy_expert(statement, stream, size=CHUNK_SIZE)
+                rows = cur.rowcount
+        finally:
+            conn.close()
+        return source.table, rows, time.perf_counter() - started
+
+    def _parallel(self, function, items):
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(items)))) as executor:
+            return list(executor.map(function, items))
+
+    def _copy_layer(self, sources: list[Source]) -> tuple[list[tuple[str, int, float]], Exception | None]:
+        """Copia una capa en paralelo; devuelve las copias terminadas y el primer error.
+
+        Se espera a todas aunque alguna falle: las que terminan quedan confirmadas
+        y hay que contarlas (secuencias, ``ANALYZE``) igual que en una carga completa.
+        """
+
+        done, error = [], None
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(sources)))) as executor:
+            for future in [executor.submit(self._copy, source) for source in sources]:
+                try:
+                    done.append(future.result())
+                except Exception as exc:
+                    error = error or exc
+        return done, error
+
+    def load(
+        self,
+        sources: list[Source],
+        truncate: bool = False,
+        defer_indexes: bool = True,
+        defer_constraints: bool = False,
+        restore_file: Path | None = None,
+        log=print,
+    ) -> dict:
+        """Carga ``sources`` y devuelve filas y tiempos por tabla y por fase.
+
+        Con ``defer_constraints`` las claves foráneas se quitan durante la carga,
+        todas las tablas se cargan a la vez y al final se añaden ``NOT VALID`` y
+        se validan. Las que no validan se devuelven en ``invalid_constraints``.
+        """
+
+        by_table = {source.table: source for source in sources}
+        tables = list(by_table)
+        timings = {}
+        conn = self.connect()
+        try:
+            if defer_constraints:
+                constraints = deferrable_constraints(conn, self.schema, tables)
+                layers = [tables]
+            else:
+                constraints = []
+                layers = load_layers(conn, self.schema, tables)
+            indexes = deferrable_indexes(conn, self.schema, tables) if defer_indexes else []
+        finally:
+            conn.close()
+
+        if indexes or constraints:
+            if restore_file is None:
+                restore_file = Path(tempfile.gettempdir()) / (
+                    f"bulk_load_restore_{self.schema}_{time.strftime('%Y%m%d_%H%M%S')}.sql"
+                )
+            write_restore_file(restore_file, self.schema, indexes, constraints)
+            log(f"SQL para recrear índices y claves foráneas: {restore_file}")
+
+        started = time.perf_counter()
+        if truncate:
+            self._run(
+                sql.SQL("TRUNCATE {} RESTART IDENTITY").format(
+                    sql.SQL(", ").join(self._qualified(table) for table in tables)
+                )
+            )
+        for table, constraint, _ in constraints:
+            self._run(
+                sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                    self._qualified(table), sql.Identifier(constraint)
+                )
+            )
+        for table, index, _ in indexes:
+            self._run(sql.SQL("DROP INDEX {}.{}").format(sql.Identifier(self.schema), sql.Identifier(index)))
+        timings["prepare"] = time.perf_counter() - started
+
+        results = {}
+        invalid = []
+        started = time.perf_counter()
+        try:
+            for number, layer in enumerate(layers, 1):
+                log(f"Capa {number}: {', '.join(layer)}")
+                done, error = self._copy_layer([by_table[t] for t in layer])
+                for table, rows, seconds in done:
+                    results[table] = {"rows": rows, "seconds": seconds}
+                    log(f"  {table:<20} {rows:>12} filas {seconds:>8.2f} s {_rate(rows, seconds):>12} filas/s")
+                if error is not None:
+                    raise error
+        finally:
+            timings["copy"] = time.perf_counter() - started
+            started = time.perf_counter()
+            try:
+                if indexes:
+                    log(f"Recreando {len(indexes)} índices...")
+                    self._parallel(self._run, [definition for _, _, definition in indexes])
+            finally:
+                timings["indexes"] = time.perf_counter() - started
+                started = time.perf_counter()
+                try:
+                    if constraints:
+                        # Añadirlas NOT VALID no recorre las tablas y no puede fallar
+                        # por los datos; la validación va aparte, clave a clave.
+                        log(f"Validando {len(constraints)} claves foráneas...")
+                        self._parallel(self._run, self._add_constraints(constraints))
+                        invalid = [
+                            error for error in self._parallel(self._validate, constraints) if error
+                        ]
+                finally:
+                    timings["constraints"] = time.perf_counter() - started
+                    # También si la carga ha fallado: las tablas ya copiadas están
+                    # confirmadas y sin secuencias ni estadísticas al día.
+                    started = time.perf_counter()
+                    for table in results:
+                        self._finish(table)
+                    timings["analyze"] = time.perf_counter() - started
+        return {"tables": results, "timings": timings, "invalid_constraints": invalid}
+
+    def _qualified(self, table: str):
+        return sql.SQL("{}.{}").format(sql.Identifier(self.schema), sql.Identifier(table))
+
+    def _add_constraints(self, constraints) -> list:
+        """Un ``ALTER TABLE`` por tabla con todas sus claves foráneas, ``NOT VALID``."""
+
+        by_table = {}
+        for table, constraint, definition in constraints:
+            by_table.setdefault(table, []).append(
+                sql.SQL("ADD CONSTRAINT {} {} NOT VALID").format(
+                    sql.Identifier(constraint), sql.SQL(definition)
+                )
+            )
+        return [
+            sql.SQL("ALTER TABLE {} {}").format(self._qualified(table), sql.SQL(", ").join(clauses))
+            for table, clauses in by_table.items()
+        ]
+
+    def _validate(self, constraint: tuple[str, str, str]) -> tuple[str, str, str] | None:
+        """Valida una clave; devuelve (tabla, clave, error) si los datos no la cumplen."""
+
+        table, name, _ = constraint
+        try:
+            self._run(
+                sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(
+                    self._qualified(table), sql.Identifier(name)
+                )
+            )
+        except psycopg2.Error as exc:
+            return table, name, str(exc).strip()
+        return None
+
+    def _finish(self, table: str) -> None:
+        """Lleva la secuencia del ``id`` (si la hay) más allá del máximo y actualiza estadísticas."""
+
+        qualified = self._qualified(table)
+        conn = self.connect()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT pg_get_serial_sequence(%s, a.attname) FROM pg_attribute a "
+                    "WHERE a.attrelid = %s::regclass AND a.attname = 'id'",
+                    (f"{self.schema}.{table}", f"{self.schema}.{table}"),
+                )
+                row = cur.fetchone()
+                if row and row[0]:
+                    cur.execute(
+                        sql.SQL("SELECT setval(%s, COALESCE((SELECT max(id) FROM {}), 0) + 1, false)")
+                        .format(qualified),
+                        (row[0],),
+                    )
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("ANALYZE {}").format(qualified))
+        finally:
+            conn.close()
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f}" if seconds > 0 else "-"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="Directorio con los CSV/NDJSON a cargar.")
+    parser.add_argument(
+        "--db-name",
+        default=os.getenv("TARGET_DB", "fastapi_db"),
+        help="Base de datos destino.",
+    )
+    parser.add_argument("--user", default=os.getenv("PGUSER", "postgres"))
+    parser.add_argument(
+        "--password",
+        default=os.getenv("PGPASSWORD"),
+        help="Contraseña del usuario (puede establecerse via variable de entorno).",
+    )
+    parser.add_argument("--host", default=os.getenv("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PGPORT", "5432")))
+    parser.add_argument("--schema", default="public", help="Esquema de las tablas.")
+    parser.add_argument(
+        "--tables",
+        default=None,
+        help="Tablas separadas por comas. Por defecto, todos los ficheros del directorio.",
+    )
+    parser.add_argument("--jobs", type=int, default=4, help="Conexiones en paralelo.")
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Vacía las tablas (y reinicia sus secuencias) antes de cargar.",
+    )
+    parser.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="No elimina los índices durante la carga.",
+    )
+    parser.add_argument(
+        "--defer-constraints",
+        action="store_true",
+        help="Quita las claves foráneas, carga todas las tablas a la vez y las valida al final.",
+    )
+    parser.add_argument(
+        "--restore-file",
+        type=Path,
+        default=None,
+        help="Dónde guardar el SQL que recrea lo que se quita. Por defecto, en el directorio temporal.",
+    )
+    return parser.parse_args()
+
+
+def connection_factory(args: argparse.Namespace):
+    def connect():
+        return psycopg2.connect(
+            dbname=args.db_name,
+            user=args.user,
+            password=args.password,
+            host=args.host,
+            port=args.port,
+        )
+
+    return connect
+
+
+def report(result: dict, elapsed: float) -> None:
+    tables = result["tables"]
+    total = sum(entry["rows"] for entry in tables.values())
+    phases = ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in result["timings"].items())
+    print(f"Total: {total} filas en {len(tables)} tablas, {elapsed:.2f} s "
+          f"({_rate(total, elapsed)} filas/s). Fases: {phases}.")
+    for table, constraint, error in result.get("invalid_constraints", []):
+        print(f"Clave foránea sin validar {table}.{constraint}: {error}", file=sys.stderr)
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.directory.is_dir():
+        print(f"No existe el directorio {args.directory}", file=sys.stderr)
+        return 1
+    sources = sources_from_directory(args.directory)
+    if args.tables:
+        wanted = [name.strip() for name in args.tables.split(",") if name.strip()]
+        sources = [source for source in sources if source.table in wanted]
+    if not sources:
+        print("No hay ficheros .csv/.ndjson/.jsonl que cargar.", file=sys.stderr)
+        return 1
+
+    loader = BulkLoader(connection_factory(args), args.schema, args.jobs)
+    started = time.perf_counter()
+    try:
+        result = loader.load(
+            sources,
+            truncate=args.truncate,
+            defer_indexes=not args.keep_indexes,
+            defer_constraints=args.defer_constraints,
+            restore_file=args.restore_file,
+        )
+    except (psycopg2.Error, RuntimeError) as exc:
+        print(f"Error durante la carga: {exc}", file=sys.stderr)
+        return 1
+    report(result, time.perf_counter() - started)
+    return 1 if result["invalid_constraints"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
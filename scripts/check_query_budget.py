@@ -0,0 +1,467 @@
+"""Comprueba el presupuesto de SQL de cada endpoint: sentencias y filas leídas.
+
+Puebla una base (por defecto una SQLite temporal, con ``generate_dataset.py``)
+y llama a cada endpoint de ``app/routers/`` dentro del proceso, con
+``TestClient``, para varios tamaños de resultado: ``limit`` de 1, 20 y 200 en
+los listados, pedidos con una y con muchas partidas en el detalle, filtros que
+dejan pocas o todas las filas en las exportaciones. Para cada llamada cuenta
+las sentencias SQL ejecutadas y las filas que el controlador entregó a Python,
+y falla si:
+
+* hay más sentencias que el máximo fijado en ``BUDGETS`` (en las exportaciones,
+  más las de cada bloque de ``STREAM_BATCH_SIZE`` filas);
+* se leen más filas que ``rows_per_item`` por elemento devuelto más
+  ``base_rows``, lo que delata que se carga más de lo que se sirve;
+* el número de sentencias crece con el tamaño del resultado, la huella de una
+  carga perezosa por fila (por ejemplo, un campo anidado nuevo en
+  ``app/schemas.py`` que no se carga con ``selectinload``/``joinedload``);
+* una llamada devuelve menos de ``min_items`` elementos: un caso vacío cumple
+  cualquier presupuesto sin medir nada (un filtro que no casa con los datos
+  generados, unos resúmenes sin recalcular).
+
+Cada caso se ejecuta con la serialización ORM + Pydantic y con la ruta rápida
+(``FAST_SERIALIZATION``), y con las cachés de referencia vacías. Sin
+``--only``, también falla si alguna ruta GET del esquema OpenAPI no tiene
+presupuesto, para que un endpoint nuevo no se quede sin comprobar.
+
+Uso::
+
+    python scripts/check_query_budget.py
+    python scripts/check_query_budget.py --database-url postgresql://... --only orders
+
+Termina con código 1 si algún caso supera su presupuesto.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+# Partidas de pedido del conjunto de datos generado
+DEFAULT_ITEMS = 5_000
+LIST_SIZES = (1, 20, 200)
+TOP_SIZES = (1, 10, 100)
+
+# (etiqueta, ruta, parámetros) de cada llamada de un caso
+Call = tuple[str, str, dict]
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Límites de un endpoint y las llamadas con las que se comprueban.
+
+    ``calls`` recibe el contexto (id y fechas de la base) y devuelve las
+    llamadas de distintos tamaños. ``streaming`` indica una exportación, que
+    lee por bloques y admite ``per_batch`` sentencias más por bloque.
+    ``min_items`` es lo mínimo que debe devolver cada llamada (0 en las rutas
+    que no leen datos).
+    """
+
+    name: str
+    calls: Callable[[dict], list[Call]]
+    max_statements: int
+    rows_per_item: float = 1.0
+    base_rows: int = 10
+    streaming: bool = False
+    per_batch: int = 0
+    min_items: int = 1
+
+
+def limits(path: str, sizes=LIST_SIZES, **params) -> Callable[[dict], list[Call]]:
+    return lambda context: [
+        (f"limit={size}", path, {**{k: v.format(**context) for k, v in params.items()}, "limit": size})
+        for size in sizes
+    ]
+
+
+def fixed(path: str, **params) -> Callable[[dict], list[Call]]:
+    return lambda context: [("", path.format(**context), {k: v.format(**context) for k, v in params.items()})]
+
+
+def by_id(collection: str) -> Callable[[dict], list[Call]]:
+    return lambda context: [
+        (label, f"/{collection}/{identifier}", {}) for label, identifier in context[collection]
+    ]
+
+
+def variants(path: str, *param_sets: dict) -> Callable[[dict], list[Call]]:
+    def calls(context: dict) -> list[Call]:
+        result = []
+        for params in param_sets:
+            params = {key: str(value).format(**context) for key, value in params.items()}
+            label = ",".join(f"{key}={value}" for key, value in params.items()) or "todo"
+            result.append((label, path, params))
+        return result
+
+    return calls
+
+
+BUDGETS = [
+    Budget("suppliers.list", limits("/suppliers/"), 1),
+    Budget("suppliers.detail", by_id("suppliers"), 1),
+    Budget("categories.list", limits("/categories/"), 1),
+    Budget("categories.detail", by_id("categories"), 1),
+    Budget("warehouses.list", limits("/warehouses/"), 1),
+    Budget("warehouses.detail", by_id("warehouses"), 1),
+    Budget("customers.list", limits("/customers/"), 1),
+    Budget("customers.detail", by_id("customers"), 1),
+    Budget("products.list", limits("/products/"), 2),
+    Budget("products.fields", limits("/products/", fields="id,name,unit_price"), 2),
+    Budget("products.detail", by_id("products"), 1),
+    Budget(
+        "products.export",
+        variants("/products/export", {"only_active": "true"}, {}),
+        1,
+        streaming=True,
+        per_batch=1,
+    ),
+    Budget("inventory.list", limits("/inventory/"), 2),
+    Budget(
+        "inventory.export",
+        variants("/inventory/export", {"warehouse_id": "{warehouse_id}"}, {}),
+        1,
+        streaming=True,
+        per_batch=1,
+    ),
+    # Un pedido ocupa una fila por partida (selectinload de partidas con su producto)
+    Budget("orders.list", limits("/orders/"), 2, rows_per_item=10),
+    Budget("orders.by_status", limits("/orders/", status="pendiente"), 2, rows_per_item=10),
+    Budget("orders.detail", by_id("orders"), 2),
+    Budget(
+        "orders.export",
+        variants("/orders/export", {"status": "pendiente"}, {}),
+        0,
+        rows_per_item=10,
+        streaming=True,
+        per_batch=2,
+    ),
+    Budget("shipments.list", limits("/shipments/"), 2),
+    Budget("shipments.detail", by_id("shipments"), 1),
+    Budget(
+        "shipments.export",
+        variants("/shipments/export", {"status": "entregado"}, {}),
+        1,
+        streaming=True,
+        per_batch=1,
+    ),
+    # Los agregados devuelven pocas filas: leer más es no haber agregado en SQL
+    Budget("analytics.summary", fixed("/analytics/summary"), 5, base_rows=5),
+    Budget(
+        "analytics.summary_filtered",
+        fixed("/analytics/summary", city="Madrid", date_from="{date_from}", date_to="{date_to}"),
+        5,
+        base_rows=5,
+    ),
+    Budget("analytics.monthly_sales", fixed("/analytics/monthly-sales"), 2),
+    Budget("analytics.top_products", limits("/analytics/top-products", TOP_SIZES), 2),
+    Budget("analytics.top_suppliers", limits("/analytics/top-suppliers", TOP_SIZES), 2),
+    # Dos periodos; las variaciones se limitan en SQL. Con datos, al menos un
+    # producto y un cliente además de los totales
+    Budget(
+        "analytics.compare",
+        limits("/analytics/compare", TOP_SIZES, date_from="{date_from}", date_to="{date_to}"),
+        5,
+        base_rows=5,
+        min_items=3,
+    ),
+    Budget("analytics.customers_by_city", fixed("/analytics/customers-by-city"), 2),
+    Budget("analytics.shipment_status", fixed("/analytics/shipment-status"), 2),
+    Budget("analytics.stock_by_warehouse", fixed("/analytics/stock-by-warehouse"), 2),
+    # Estado del proceso: no deben tocar la base de datos
+    Budget("health.pool", fixed("/health/pool"), 0, min_items=0),
+    Budget("health.cache", fixed("/health/cache"), 0, min_items=0),
+    Budget("health.queries", fixed("/health/queries"), 0, min_items=0),
+    Budget("health.startup", fixed("/health/startup"), 0, min_items=0),
+    Budget("root", fixed("/"), 0, min_items=0),
+]
+
+# Rutas de la documentación de FastAPI, sin presupuesto
+IGNORED_PATHS = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Base de datos ya poblada. Por defecto, SQLite temporal con datos generados.",
+    )
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS, help="Partidas generadas.")
+    parser.add_argument(
+        "--only",
+        default=None,
+        help="Expresión regular: solo los endpoints cuyo nombre coincide.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("orm", "fast", "both"),
+        default="both",
+        help="Ruta de serialización a comprobar.",
+    )
+    return parser.parse_args()
+
+
+class Counters:
+    """Sentencias y filas leídas desde el último ``reset``."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.rows = 0
+
+
+class CountingCursor:
+    """Cursor DBAPI que cuenta las filas que SQLAlchemy le pide."""
+
+    def __init__(self, cursor, counters: Counters):
+        self._cursor = cursor
+        self._counters = counters
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._counters.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._counters.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._counters.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def instrument(engine, counters: Counters) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        counters.statements += 1
+        # SQLAlchemy construye el resultado a partir de context.cursor justo después
+        if context is not None and cursor.description is not None:
+            context.cursor = CountingCursor(cursor, counters)
+
+
+def build_context(session_factory, models) -> dict:
+    """id representativos para el detalle y un periodo con ventas."""
+
+    from sqlalchemy import func, select
+
+    with session_factory() as db:
+        def first_id(model):
+            return db.scalar(select(model.id).order_by(model.id).limit(1))
+
+        per_order = (
+            select(models.OrderItem.order_id, func.count().label("item_count"))
+            .group_by(models.OrderItem.order_id)
+            .subquery()
+        )
+        fewest = db.execute(
+            select(per_order.c.order_id, per_order.c.item_count).order_by(per_order.c.item_count, per_order.c.order_id).limit(1)
+        ).first()
+        most = db.execute(
+            select(per_order.c.order_id, per_order.c.item_count)
+            .order_by(per_order.c.item_count.desc(), per_order.c.order_id)
+            .limit(1)
+        ).first()
+        last_day = db.scalar(select(func.max(models.Order.order_date)))
+        context = {
+            "orders": [(f"{fewest.item_count} partidas", fewest.order_id), (f"{most.item_count} partidas", most.order_id)],
+            "warehouse_id": first_id(models.Warehouse),
+            "date_to": last_day.isoformat(),
+            "date_from": (last_day - timedelta(days=60)).isoformat(),
+        }
+        for collection, model in (
+            ("suppliers", models.Supplier),
+            ("categories", models.Category),
+            ("warehouses", models.Warehouse),
+            ("customers", models.Customer),
+            ("products", models.Product),
+            ("shipments", models.Shipment),
+        ):
+            context[collection] = [("", first_id(model))]
+    return context
+
+
+def response_size(response) -> int:
+    """Elementos devueltos: filas del listado o de la exportación; 1 + hijos en el detalle."""
+
+    content_type = response.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        return sum(1 for line in response.text.splitlines() if line)
+    if "csv" in content_type:
+        return max(0, len(response.text.splitlines()) - 1)
+    body = response.json()
+    if isinstance(body, list):
+        return len(body)
+    if isinstance(body, dict) and isinstance(body.get("items"), list) and "next_cursor" in body:
+        return len(body["items"])
+    return 1 + sum(len(value) for value in body.values() if isinstance(value, list))
+
+
+def uncovered_paths(openapi: dict, called: set[str]) -> list[str]:
+    """Rutas GET de la API a las que ningún presupuesto ha llamado."""
+
+    templates = [
+        path
+        for path, operations in openapi.get("paths", {}).items()
+        if "get" in operations and path not in IGNORED_PATHS
+    ]
+    patterns = {
+        path: re.compile("^" + "[^/]+".join(map(re.escape, re.split(r"\{[^}]+\}", path))) + "$")
+        for path in templates
+    }
+    covered = set()
+    for path in called:
+        # Una ruta fija (/orders/export) gana a la plantilla (/orders/{order_id})
+        if path in patterns:
+            covered.add(path)
+            continue
+        covered.update(template for template, regex in patterns.items() if regex.match(path))
+    return [path for path in templates if path not in covered]
+
+
+def measure(client, counters: Counters, budget: Budget, context: dict) -> tuple[list[dict], list[str]]:
+    """Llama a cada caso de ``budget``; devuelve las mediciones y los casos con error HTTP."""
+
+    from app.cache import invalidate_all
+
+    measurements, errors = [], []
+    for label, path, params in budget.calls(context):
+        invalidate_all()
+        counters.reset()
+        response = client.get(path, params=params)
+        if response.status_code != 200:
+            errors.append(f"{label or path}: HTTP {response.status_code}")
+            continue
+        measurements.append(
+            {
+                "label": label or path,
+                "size": response_size(response),
+                "statements": counters.statements,
+                "rows": counters.rows,
+            }
+        )
+    return measurements, errors
+
+
+def check(budget: Budget, measurements: list[dict]) -> list[str]:
+    from app.crud import STREAM_BATCH_SIZE
+
+    problems = []
+    for item in measurements:
+        allowed = budget.max_statements
+        if budget.streaming:
+            allowed += budget.per_batch * math.ceil(item["size"] / STREAM_BATCH_SIZE)
+        item["allowed"] = allowed
+        if item["size"] < budget.min_items:
+            problems.append(f"{item['label']}: {item['size']} elementos (mínimo {budget.min_items})")
+        if item["statements"] > allowed:
+            problems.append(f"{item['label']}: {item['statements']} sentencias (máximo {allowed})")
+        max_rows = budget.rows_per_item * item["size"] + budget.base_rows
+        if item["rows"] > max_rows:
+            problems.append(f"{item['label']}: {item['rows']} filas leídas (máximo {max_rows:g})")
+
+    # Sentencias por encima del mínimo fijo: no deben crecer con el resultado
+    if len(measurements) > 1:
+        ordered = sorted(measurements, key=lambda item: item["size"])
+        smallest, largest = ordered[0], ordered[-1]
+        extra_small = smallest["statements"] - (smallest["allowed"] - budget.max_statements)
+        extra_large = largest["statements"] - (largest["allowed"] - budget.max_statements)
+        if largest["size"] > smallest["size"] and extra_large > extra_small:
+            problems.append(
+                f"las sentencias crecen con el resultado: {smallest['statements']} con "
+                f"{smallest['size']} elementos, {largest['statements']} con {largest['size']}"
+            )
+    return problems
+
+
+def main() -> int:
+    args = parse_args()
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="query_budget_")
+        database_url = f"sqlite:///{tmpdir}/budget.db"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("DB_CHANGE_LISTENER", "0")
+
+    if not args.database_url:
+        from benchmark_api import populate
+
+        rows = populate(database_url, args.items, seed=42)
+        print(f"Datos generados: {sum(rows.values())} filas.")
+
+    from fastapi.testclient import TestClient
+
+    from app import fastpath, models
+    from app.database import SessionLocal, get_async_engine, get_engine
+    from app.main import app
+
+    counters = Counters()
+    instrument(get_engine(), counters)
+    instrument(get_async_engine().sync_engine, counters)
+    context = build_context(SessionLocal, models)
+
+    modes = ("orm", "fast") if args.mode == "both" else (args.mode,)
+    pattern = re.compile(args.only) if args.only else None
+    failures = 0
+    called = set()
+    # Un solo bucle de eventos para todas las peticiones: las conexiones de
+    # asyncpg quedan ligadas al bucle que las abrió
+    with TestClient(app) as client:
+        print(f"{'endpoint':<30} {'modo':<5} {'caso':<26} {'elem.':>6} {'sent.':>6} {'máx.':>5} {'filas':>7}")
+        for budget in BUDGETS:
+            if pattern is not None and not pattern.search(budget.name):
+                continue
+            for mode in modes:
+                fastpath.ENABLED = mode == "fast"
+                measurements, errors = measure(client, counters, budget, context)
+                called.update(path for _, path, _ in budget.calls(context))
+                for error in errors:
+                    print(f"  FALLO {budget.name} ({mode}): {error}", file=sys.stderr)
+                failures += len(errors)
+                problems = check(budget, measurements)
+                for item in measurements:
+                    print(
+                        f"{budget.name:<30} {mode:<5} {item['label'][:26]:<26} {item['size']:>6} "
+                        f"{item['statements']:>6} {item['allowed']:>5} {item['rows']:>7}"
+                    )
+                for problem in problems:
+                    print(f"  FALLO {budget.name} ({mode}): {problem}", file=sys.stderr)
+                failures += len(problems)
+
+        # Sin filtro, cada ruta GET de la API debe tener su presupuesto
+        if pattern is None:
+            for path in uncovered_paths(app.openapi(), called):
+                print(f"  FALLO {path}: ruta GET sin presupuesto en BUDGETS", file=sys.stderr)
+                failures += 1
+
+    if failures:
+        print(f"{failures} comprobaciones fuera de presupuesto.", file=sys.stderr)
+        return 1
+    print("Todos los endpoints dentro de su presupuesto.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,501 @@
+"""Genera un conjunto de datos sintético y coherente para pruebas de carga.
+
+Produce proveedores, categorías, productos, almacenes, inventario, clientes,
+pedidos, partidas y envíos con claves foráneas válidas, a la escala que se
+pida (de mil a diez millones de partidas con ``--items``). Los datos imitan
+patrones reales para que los planes de consulta y los tiempos se parezcan a
+los de producción:
+
+* estacionalidad: más pedidos en diciembre, menos en agosto y en fin de
+  semana, y un crecimiento anual (``--growth``);
+* popularidad de productos sesgada (Zipf, ``--zipf``): unos pocos productos
+  concentran la mayoría de las partidas;
+* actividad de clientes también Zipf (``--customer-zipf``), más suave: los
+  clientes habituales piden mucho más que el resto; repartidos por ciudades;
+* estado de pedidos y envíos según su antigüedad.
+
+Todo se genera con operaciones vectorizadas de numpy por bloques de pedidos
+(``--chunk-orders``) y se envía directamente a PostgreSQL con
+``scripts/bulk_load.py`` (``COPY`` en paralelo), sin pasar por ficheros ni
+tener todo en memoria. Con ``--output`` se escriben en su lugar ficheros
+``<tabla>.csv.gz`` que ``bulk_load.py`` puede cargar después. Con la misma
+``--seed`` el resultado es idéntico.
+
+Las tablas deben estar vacías (o usar ``--truncate``), porque los ``id`` se
+asignan en el generador. Tras cargar, ``python -m app.manage rebuild-rollups``
+recalcula los resúmenes de ventas.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+from bulk_load import BulkLoader, chunks_source, connection_factory, report
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+
+CITIES = [
+    "Madrid", "Barcelona", "Valencia", "Sevilla", "Zaragoza", "Málaga", "Murcia",
+    "Palma", "Bilbao", "Alicante", "Córdoba", "Valladolid", "Vigo", "Gijón", "Granada",
+]
+# Peso relativo de cada ciudad (aproximadamente su población)
+CITY_WEIGHTS = np.array([33, 16, 8, 7, 7, 6, 5, 4, 3, 3, 3, 3, 3, 3, 2], dtype=float)
+
+# (categoría, unidad, precio medio)
+CATEGORIES = [
+    ("Lácteos", "l", 2.5),
+    ("Carnes", "kg", 11.0),
+    ("Pescados", "kg", 14.0),
+    ("Frutas", "kg", 2.2),
+    ("Verduras", "kg", 1.8),
+    ("Panadería", "ud", 1.5),
+    ("Bebidas", "l", 1.9),
+    ("Conservas", "ud", 3.2),
+    ("Congelados", "kg", 6.5),
+    ("Aceites", "l", 7.5),
+    ("Legumbres", "kg", 2.8),
+    ("Limpieza", "ud", 4.0),
+]
+SUPPLIER_KINDS = ["Distribuciones", "Alimentación", "Comercial", "Productos", "Hermanos", "Cooperativa"]
+CUSTOMER_KINDS = ["Restaurante", "Bar", "Hotel", "Supermercado", "Cafetería", "Colegio", "Catering"]
+SURNAMES = [
+    "García", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Martín",
+    "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Álvarez", "Romero", "Navarro",
+]
+WAREHOUSES = ["Madrid", "Barcelona", "Valencia", "Sevilla", "Bilbao", "Zaragoza"]
+
+TABLES = {
+    "suppliers": ["id", "name", "contact_name", "phone", "email", "city", "country"],
+    "categories": ["id", "name", "description"],
+    "warehouses": ["id", "name", "city", "manager_name"],
+    "products": ["id", "name", "sku", "unit", "unit_price", "supplier_id", "category_id", "is_active"],
+    "customers": ["id", "name", "contact_name", "phone", "email", "city", "country"],
+    "inventories": ["product_id", "warehouse_id", "quantity_on_hand", "safety_stock", "last_restocked"],
+    "orders": ["id", "customer_id", "order_date", "required_date", "status", "total_amount"],
+    "order_items": ["order_id", "product_id", "quantity", "unit_price", "discount"],
+    "shipments": [
+        "order_id", "warehouse_id", "shipped_at", "estimated_delivery", "delivery_status",
+        "tracking_number",
+    ],
+}
+
+DATE_COLUMNS = {"order_date", "required_date", "estimated_delivery", "last_restocked"}
+
+
+@dataclass(frozen=True)
+class Scale:
+    items: int
+    items_per_order: float = 4.0
+
+    @property
+    def orders(self) -> int:
+        return max(1, round(self.items / self.items_per_order))
+
+    @property
+    def customers(self) -> int:
+        return max(100, self.orders // 25)
+
+    @property
+    def products(self) -> int:
+        return int(np.clip(np.sqrt(self.items) * 5, 200, 50_000))
+
+    @property
+    def suppliers(self) -> int:
+        return max(10, self.products // 40)
+
+
+def _names(prefixes, rng, size: int, ids: np.ndarray) -> pd.Series:
+    prefix = pd.Series(np.asarray(prefixes, dtype=object)[rng.integers(0, len(prefixes), size)])
+    surname = pd.Series(np.asarray(SURNAMES, dtype=object)[rng.integers(0, len(SURNAMES), size)])
+    return prefix + " " + surname + " " + pd.Series(ids).astype(str)
+
+
+def _phones(rng, size: int) -> pd.Series:
+    return pd.Series(rng.integers(600_000_000, 700_000_000, size)).astype(str)
+
+
+class Dataset:
+    """Dimensiones en memoria y generación determinista de los pedidos por bloques."""
+
+    def __init__(
+        self,
+        scale: Scale,
+        seed: int = 42,
+        start: date = date(2023, 1, 1),
+        end: date = date(2024, 12, 31),
+        zipf: float = 1.1,
+        customer_zipf: float = 0.8,
+        growth: float = 0.15,
+        chunk_orders: int = 100_000,
+    ):
+        self.scale = scale
+        self.seed = seed
+        self.chunk_orders = chunk_orders
+        self.days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+        self.end = np.datetime64(end)
+        rng = np.random.default_rng([seed, 0])
+
+        self.day_weights = self._seasonality(growth)
+        # Popularidad Zipf sobre un orden aleatorio de productos y de clientes
+        self.product_p = self._zipf_weights(rng, scale.products, zipf)
+        self.customer_p = self._zipf_weights(rng, scale.customers, customer_zipf)
+
+        self.dimensions = self._dimensions(rng)
+        self.prices = self.dimensions["products"]["unit_price"].to_numpy()
+
+    @staticmethod
+    def _zipf_weights(rng, count: int, exponent: float) -> np.ndarray:
+        """Probabilidades proporcionales a rango^-exponent, en orden aleatorio."""
+
+        ranks = np.arange(1, count + 1, dtype=float)
+        popularity = 1.0 / ranks**exponent
+        weights = np.empty(count)
+        weights[rng.permutation(count)] = popularity / popularity.sum()
+        return weights
+
+    def _seasonality(self, growth: float) -> np.ndarray:
+        day_of_year = (self.days - self.days.astype("datetime64[Y]")).astype(int)
+        season = 1 + 0.25 * np.cos(2 * np.pi * (day_of_year - 355) / 365)
+        season -= 0.3 * np.exp(-(((day_of_year - 222) / 15) ** 2))  # agosto
+        # 1970-01-01 fue jueves: 0 = lunes
+        weekday = (self.days.astype(int) + 3) % 7
+        weekly = np.array([1.0, 1.05, 1.05, 1.1, 1.2, 0.6, 0.25])[weekday]
+        years = (self.days - self.days[0]).astype(int) / 365.25
+        weights = season * weekly * (1 + growth) ** years
+        return weights / weights.sum()
+
+    def _dimensions(self, rng) -> dict[str, pd.DataFrame]:
+        scale = self.scale
+        supplier_ids = np.arange(1, scale.suppliers + 1)
+        suppliers = pd.DataFrame({
+            "id": supplier_ids,
+            "name": _names(SUPPLIER_KINDS, rng, scale.suppliers, supplier_ids),
+            "contact_name": _names(["Sr.", "Sra."], rng, scale.suppliers, supplier_ids),
+            "phone": _phones(rng, scale.suppliers),
+            "email": "proveedor" + pd.Series(supplier_ids).astype(str) + "@example.com",
+            "city": np.asarray(CITIES, dtype=object)[
+                rng.choice(len(CITIES), scale.suppliers, p=CITY_WEIGHTS / CITY_WEIGHTS.sum())
+            ],
+            "country": "España",
+        })
+        categories = pd.DataFrame({
+            "id": np.arange(1, len(CATEGORIES) + 1),
+            "name": [name for name, _, _ in CATEGORIES],
+            "description": [f"Productos de {name.lower()}" for name, _, _ in CATEGORIES],
+        })
+        warehouses = pd.DataFrame({
+            "id": np.arange(1, len(WAREHOUSES) + 1),
+            "name": [f"Almacén {city}" for city in WAREHOUSES],
+            "city": WAREHOUSES,
+            "manager_name": _names(["Responsable"], rng, len(WAREHOUSES), np.arange(1, len(WAREHOUSES) + 1)),
+        })
+
+        product_ids = np.arange(1, scale.products + 1)
+        category = rng.integers(0, len(CATEGORIES), scale.products)
+        base_price = np.array([price for _, _, price in CATEGORIES])[category]
+        products = pd.DataFrame({
+            "id": product_ids,
+            "name": pd.Series(np.asarray([name for name, _, _ in CATEGORIES], dtype=object)[category])
+            + " " + pd.Series(np.asarray(SURNAMES, dtype=object)[rng.integers(0, len(SURNAMES), scale.products)])
+            + " " + pd.Series(product_ids).astype(str),
+            "sku": "SKU-" + pd.Series(product_ids).astype(str).str.zfill(7),
+            "unit": np.array([unit for _, unit, _ in CATEGORIES], dtype=object)[category],
+            "unit_price": np.round(base_price * rng.lognormal(0.0, 0.4, scale.products), 2).clip(0.1),
+            "supplier_id": rng.integers(1, scale.suppliers + 1, scale.products),
+            "category_id": category + 1,
+            "is_active": np.where(rng.random(scale.products) < 0.97, "Y", "N"),
+        })
+
+        # Cada producto está en cada almacén con probabilidad 0,7; el stock crece con su popularidad
+        pairs = np.argwhere(rng.random((scale.products, len(WAREHOUSES))) < 0.7)
+        demand = self.product_p[pairs[:, 0]] * scale.items
+        inventories = pd.DataFrame({
+            "product_id": pairs[:, 0] + 1,
+            "warehouse_id": pairs[:, 1] + 1,
+            "quantity_on_hand": rng.poisson(20 + demand / 10),
+            "safety_stock": (5 + demand / 50).astype(int),
+            "last_restocked": self.end - rng.integers(0, 60, len(pairs)),
+        })
+
+        customer_ids = np.arange(1, scale.customers + 1)
+        customers = pd.DataFrame({
+            "id": customer_ids,
+            "name": _names(CUSTOMER_KINDS, rng, scale.customers, customer_ids),
+            "contact_name": _names(["Sr.", "Sra."], rng, scale.customers, customer_ids),
+            "phone": _phones(rng, scale.customers),
+            "email": "cliente" + pd.Series(customer_ids).astype(str) + "@example.com",
+            "city": np.asarray(CITIES, dtype=object)[
+                rng.choice(len(CITIES), scale.customers, p=CITY_WEIGHTS / CITY_WEIGHTS.sum())
+            ],
+            "country": "España",
+        })
+        return {
+            "suppliers": suppliers,
+            "categories": categories,
+            "warehouses": warehouses,
+            "products": products,
+            "customers": customers,
+            "inventories": inventories,
+        }
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.scale.orders // self.chunk_orders)
+
+    def chunk(self, number: int) -> dict[str, pd.DataFrame]:
+        """Pedidos, partidas y envíos del bloque ``number``; siempre los mismos."""
+
+        rng = np.random.default_rng([self.seed, 1, number])
+        first = number * self.chunk_orders + 1
+        count = min(self.chunk_orders, self.scale.orders - first + 1)
+        order_ids = np.arange(first, first + count)
+
+        order_date = rng.choice(self.days, count, p=self.day_weights)
+        age = (self.end - order_date).astype(int)
+        status = np.select(
+            [age < 2, age < 7, rng.random(count) < 0.9],
+            [
+                "pendiente",
+                np.where(rng.random(count) < 0.85, "en tránsito", "retrasado"),
+                "entregado",
+            ],
+            "completado",
+        )
+
+        sizes = 1 + rng.poisson(self.scale.items_per_order - 1, count)
+        item_orders = np.repeat(np.arange(count), sizes)
+        products = rng.choice(self.scale.products, item_orders.size, p=self.product_p)
+        quantity = 1 + rng.geometric(0.25, item_orders.size)
+        unit_price = self.prices[products]
+        discount = np.where(rng.random(item_orders.size) < 0.1, rng.choice([5.0, 10.0, 15.0], item_orders.size), 0.0)
+        line_total = quantity * unit_price * (1 - discount / 100)
+        total = np.round(np.bincount(item_orders, weights=line_total, minlength=count), 2)
+
+        orders = pd.DataFrame({
+            "id": order_ids,
+            "customer_id": rng.choice(self.scale.customers, count, p=self.customer_p) + 1,
+            "order_date": order_date,
+            "required_date": order_date + rng.integers(2, 8, count),
+            "status": status,
+            "total_amount": total,
+        })
+        items = pd.DataFrame({
+            "order_id": order_ids[item_orders],
+            "product_id": products + 1,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "discount": discount,
+        })
+
+        shipped = status != "pendiente"
+        shipped_at = (
+            order_date[shipped].astype("datetime64[s]")
+            + rng.integers(3_600, 3 * 86_400, shipped.sum()).astype("timedelta64[s]")
+        )
+        delivery = np.select(
+            [status[shipped] == "en tránsito", status[shipped] == "retrasado"],
+            ["en tránsito", "retrasado"],
+            "entregado",
+        )
+        shipments = pd.DataFrame({
+            "order_id": order_ids[shipped],
+            "warehouse_id": rng.integers(1, len(WAREHOUSES) + 1, shipped.sum()),
+            "shipped_at": shipped_at,
+            "estimated_delivery": shipped_at.astype("datetime64[D]") + rng.integers(1, 5, shipped.sum()),
+            "delivery_status": delivery,
+            "tracking_number": "TRK" + pd.Series(order_ids[shipped]).astype(str).str.zfill(10),
+        })
+        return {"orders": orders, "order_items": items, "shipments": shipments}
+
+    def frames(self, table: str):
+        """Bloques de ``table`` como DataFrames, en orden."""
+
+        if table in self.dimensions:
+            yield self.dimensions[table]
+            return
+        for number in range(self.chunks):
+            yield self.chunk(number)[table]
+
+
+def to_csv(frame: pd.DataFrame, columns: list[str]) -> bytes:
+    """Bloque en CSV sin cabecera; con pyarrow es unas diez veces más rápido."""
+
+    frame = frame[columns]
+    if pa is None:
+        return frame.to_csv(index=False, header=False, lineterminator="\n").encode("utf-8")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for index, name in enumerate(table.column_names):
+        if name in DATE_COLUMNS:
+            table = table.set_column(index, name, table[name].cast(pa.date32()))
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, pa_csv.WriteOptions(include_header=False))
+    return sink.getvalue().to_pybytes()
+
+
+def write_files(dataset: Dataset, directory: Path) -> dict:
+    directory.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for table, columns in TABLES.items():
+        started = time.perf_counter()
+        rows = 0
+        with gzip.open(directory / f"{table}.csv.gz", "wb", compresslevel=1) as handle:
+            handle.write((",".join(columns) + "\n").encode("utf-8"))
+            for frame in dataset.frames(table):
+                handle.write(to_csv(frame, columns))
+                rows += len(frame)
+        seconds = time.perf_counter() - started
+        counts[table] = rows
+        print(f"  {table:<20} {rows:>12} filas {seconds:>8.2f} s")
+    return counts
+
+
+def check_empty(connect, schema: str) -> list[str]:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            busy = []
+            for table in TABLES:
+                cur.execute(
+                    sql.SQL("SELECT EXISTS (SELECT 1 FROM {}.{})").format(
+                        sql.Identifier(schema), sql.Identifier(table)
+                    )
+                )
+                if cur.fetchone()[0]:
+                    busy.append(table)
+            return busy
+    finally:
+        conn.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000, help="Partidas de pedido a generar.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2023, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2024, 12, 31))
+    parser.add_argument("--zipf", type=float, default=1.1, help="Exponente de popularidad de productos.")
+    parser.add_argument(
+        "--customer-zipf", type=float, default=0.8, help="Exponente de actividad de clientes."
+    )
+    parser.add_argument("--growth", type=float, default=0.15, help="Crecimiento anual de pedidos.")
+    parser.add_argument("--chunk-orders", type=int, default=100_000, help="Pedidos por bloque.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Escribe <tabla>.csv.gz en este directorio en lugar de cargar la base.",
+    )
+    parser.add_argument(
+        "--db-name",
+        default=os.getenv("TARGET_DB", "fastapi_db"),
+        help="Base de datos destino.",
+    )
+    parser.add_argument("--user", default=os.getenv("PGUSER", "postgres"))
+    parser.add_argument(
+        "--password",
+        default=os.getenv("PGPASSWORD"),
+        help="Contraseña del usuario (puede establecerse via variable de entorno).",
+    )
+    parser.add_argument("--host", default=os.getenv("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PGPORT", "5432")))
+    parser.add_argument("--schema", default="public", help="Esquema de las tablas.")
+    parser.add_argument("--jobs", type=int, default=4, help="Conexiones en paralelo.")
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Vacía las tablas (y reinicia sus secuencias) antes de cargar.",
+    )
+    parser.add_argument(
+        "--defer-constraints",
+        action="store_true",
+        help="Quita las claves foráneas durante la carga y las valida al final (ver bulk_load.py).",
+    )
+    parser.add_argument(
+        "--restore-file",
+        type=Path,
+        default=None,
+        help="Dónde guardar el SQL que recrea los índices y claves quitados.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.end < args.start:
+        print("--end no puede ser anterior a --start", file=sys.stderr)
+        return 1
+    scale = Scale(args.items)
+    started = time.perf_counter()
+    dataset = Dataset(
+        scale,
+        seed=args.seed,
+        start=args.start,
+        end=args.end,
+        zipf=args.zipf,
+        customer_zipf=args.customer_zipf,
+        growth=args.growth,
+        chunk_orders=args.chunk_orders,
+    )
+    print(
+        f"Escala: ~{scale.items} partidas, {scale.orders} pedidos, {scale.customers} clientes, "
+        f"{scale.products} productos, {scale.suppliers} proveedores."
+    )
+
+    if args.output is not None:
+        counts = write_files(dataset, args.output)
+        print(f"Total: {sum(counts.values())} filas en {args.output} ({time.perf_counter() - started:.2f} s).")
+        return 0
+
+    connect = connection_factory(args)
+    try:
+        busy = [] if args.truncate else check_empty(connect, args.schema)
+    except psycopg2.Error as exc:
+        print(f"No se pudo conectar: {exc}", file=sys.stderr)
+        return 1
+    if busy:
+        print(
+            f"Las tablas ya tienen datos: {', '.join(busy)}. Usa --truncate para vaciarlas.",
+            file=sys.stderr,
+        )
+        return 1
+
+    sources = [
+        chunks_source(
+            table,
+            columns,
+            lambda table=table, columns=columns: (to_csv(frame, columns) for frame in dataset.frames(table)),
+        )
+        for table, columns in TABLES.items()
+    ]
+    loader = BulkLoader(connect, args.schema, args.jobs)
+    try:
+        result = loader.load(
+            sources,
+            truncate=args.truncate,
+            defer_constraints=args.defer_constraints,
+            restore_file=args.restore_file,
+        )
+    except (psycopg2.Error, RuntimeError) as exc:
+        print(f"Error durante la carga: {exc}", file=sys.stderr)
+        return 1
+    report(result, time.perf_counter() - started)
+    return 1 if result["invalid_constraints"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""Repara en bloque los textos con doble codificación (mojibake) de una base.
+
+Instala ``sql/repair_encoding.sql`` y ejecuta ``repair_text_encoding`` sobre las
+columnas de texto del esquema indicado: un ``UPDATE`` por columna dentro de la
+base de datos, solo sobre las filas afectadas, en una única transacción. Las
+columnas reparadas quedan registradas en la tabla ``encoding_repairs``.
+
+Pensado para ejecutarse una vez tras cada carga o sincronización, de modo que
+los paneles y la API lean UTF-8 limpio sin corregir nada al leer.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+
+SQL_FILE = Path(__file__).resolve().parents[1] / "sql" / "repair_encoding.sql"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--db-name",
+        default=os.getenv("TARGET_DB", "fastapi_db"),
+        help="Base de datos a reparar.",
+    )
+    parser.add_argument("--user", default=os.getenv("PGUSER", "postgres"))
+    parser.add_argument(
+        "--password",
+        default=os.getenv("PGPASSWORD"),
+        help="Contraseña del usuario (puede establecerse via variable de entorno).",
+    )
+    parser.add_argument("--host", default=os.getenv("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PGPORT", "5432")))
+    parser.add_argument("--schema", default="public", help="Esquema a revisar.")
+    parser.add_argument(
+        "--tables",
+        default=None,
+        help="Tablas separadas por comas. Por defecto, todas las del esquema.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Solo cuenta las filas que se repararían, sin modificar nada.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    tables = [name.strip() for name in args.tables.split(",")] if args.tables else None
+
+    started = time.perf_counter()
+    try:
+        conn = psycopg2.connect(
+            dbname=args.db_name,
+            user=args.user,
+            password=args.password,
+            host=args.host,
+            port=args.port,
+        )
+    except psycopg2.Error as exc:
+        print(f"No se pudo conectar: {exc}", file=sys.stderr)
+        return 1
+
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(SQL_FILE.read_text(encoding="utf-8"))
+            cur.execute(
+                "SELECT * FROM repair_text_encoding(%s, %s, %s)",
+                (args.schema, tables, args.dry_run),
+            )
+            repaired = cur.fetchall()
+            if args.dry_run:
+                conn.rollback()
+    except psycopg2.Error as exc:
+        print(f"Error durante la reparación: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    if not repaired:
+        print(f"No hay textos que reparar en '{args.schema}' ({elapsed:.2f} s).")
+        return 0
+
+    verb = "por reparar" if args.dry_run else "reparadas"
+    print(f"{'tabla':<24} {'columna':<24} {'filas ' + verb:>20}")
+    for table, column, rows in repaired:
+        print(f"{table:<24} {column:<24} {rows:>20}")
+    total = sum(rows for _, _, rows in repaired)
+    print(f"Total: {total} valores en {len(repaired)} columnas ({elapsed:.2f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
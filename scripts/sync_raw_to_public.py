@@ -0,0 +1,128 @@
+"""Sincroniza de forma incremental las tablas de ``distributor_raw`` en ``public``.
+
+Sustituye al ``DROP TABLE`` + ``CREATE TABLE AS`` que hacía
+``app/sync_public_from_raw.sql``: instala ``sql/sync_from_raw.sql`` y, tabla a
+tabla, borra las filas que ya no existen en origen e inserta o actualiza por
+lotes solo las nuevas o las que cambiaron (comparando el hash de cada fila),
+todo en una única transacción. Las tablas no se recrean, así que conservan sus
+índices y estadísticas y la API y los paneles pueden seguir leyéndolas.
+
+Al terminar muestra, por tabla, las filas insertadas, actualizadas y borradas y
+el tiempo empleado. Con ``--dry-run`` calcula lo mismo y deshace los cambios.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+SQL_FILES = ("repair_encoding.sql", "sync_from_raw.sql")
+
+# Orden de sincronización: los productos referencian a los proveedores
+DEFAULT_TABLES = ("providers", "clients", "workers", "allergens", "products")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--db-name",
+        default=os.getenv("TARGET_DB", "fastapi_db"),
+        help="Base de datos a sincronizar.",
+    )
+    parser.add_argument("--user", default=os.getenv("PGUSER", "postgres"))
+    parser.add_argument(
+        "--password",
+        default=os.getenv("PGPASSWORD"),
+        help="Contraseña del usuario (puede establecerse via variable de entorno).",
+    )
+    parser.add_argument("--host", default=os.getenv("PGHOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PGPORT", "5432")))
+    parser.add_argument("--source-schema", default="distributor_raw", help="Esquema de origen.")
+    parser.add_argument("--target-schema", default="public", help="Esquema de destino.")
+    parser.add_argument(
+        "--tables",
+        default=",".join(DEFAULT_TABLES),
+        help="Tablas separadas por comas, en el orden en que se sincronizan.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Filas de origen por cada INSERT ... ON CONFLICT.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Calcula las diferencias sin aplicarlas.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    tables = [name.strip() for name in args.tables.split(",") if name.strip()]
+
+    started = time.perf_counter()
+    try:
+        conn = psycopg2.connect(
+            dbname=args.db_name,
+            user=args.user,
+            password=args.password,
+            host=args.host,
+            port=args.port,
+        )
+    except psycopg2.Error as exc:
+        print(f"No se pudo conectar: {exc}", file=sys.stderr)
+        return 1
+
+    results = []
+    try:
+        with conn, conn.cursor() as cur:
+            for name in SQL_FILES:
+                cur.execute((SQL_DIR / name).read_text(encoding="utf-8"))
+            for table in tables:
+                table_started = time.perf_counter()
+                cur.execute(
+                    "SELECT inserted, updated, deleted FROM sync_table_rows(%s, %s, %s, 'id', %s)",
+                    (args.source_schema, args.target_schema, table, args.batch_size),
+                )
+                inserted, updated, deleted = cur.fetchone()
+                results.append(
+                    (table, inserted, updated, deleted, time.perf_counter() - table_started)
+                )
+            if args.dry_run:
+                conn.rollback()
+            else:
+                # Estadísticas al día solo donde hubo cambios
+                for table, inserted, updated, deleted, _ in results:
+                    if inserted or updated or deleted:
+                        cur.execute(
+                            sql.SQL("ANALYZE {}.{}").format(
+                                sql.Identifier(args.target_schema), sql.Identifier(table)
+                            )
+                        )
+    except psycopg2.Error as exc:
+        print(f"Error durante la sincronización: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    header = "Cambios pendientes (no aplicados)" if args.dry_run else "Cambios aplicados"
+    print(f"{header}: {args.source_schema} → {args.target_schema}")
+    print(f"{'tabla':<20} {'insertadas':>12} {'actualizadas':>12} {'borradas':>12} {'segundos':>10}")
+    for table, inserted, updated, deleted, seconds in results:
+        print(f"{table:<20} {inserted:>12} {updated:>12} {deleted:>12} {seconds:>10.2f}")
+    total = sum(inserted + updated + deleted for _, inserted, updated, deleted, _ in results)
+    print(f"Total: {total} filas cambiadas en {len(results)} tablas ({elapsed:.2f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+-- Avisos de cambios por LISTEN/NOTIFY y contadores de versión por tabla
+-- Ejecuta este script después de sql/schema.sql. Cada sentencia que modifica una
+-- tabla del dominio incrementa su fila en table_versions y publica en el canal
+-- "table_changes" un JSON con la tabla, la operación y la nueva versión; los
+-- procesos de la API lo escuchan para invalidar sus cachés y calcular ETags.
+-- Los disparadores son por sentencia (no por fila), así que una carga masiva
+-- genera un único aviso por tabla.
+--
+-- Contrapartida: el UPDATE de table_versions bloquea la fila de la tabla hasta
+-- el commit, así que las transacciones que escriben en una misma tabla se
+-- serializan desde su primera sentencia de escritura. Una sincronización o
+-- carga masiva larga (sync_raw_to_public.py, bulk_load.py) hace esperar a los
+-- demás escritores de esas tablas hasta que termina; conviene lanzarlas en
+-- ventanas sin escrituras de la aplicación. No se usa una secuencia (nextval no
+-- bloquea) porque su valor es visible antes del commit: un lector calcularía el
+-- ETag nuevo con los datos antiguos y el cliente guardaría esa respuesta como
+-- vigente. Con la fila, la versión nueva y los datos se ven a la vez.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO table_versions AS tv (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (table_name)
+    DO UPDATE SET version = tv.version + 1, updated_at = now()
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify(
+        'table_changes',
+        json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'version', new_version)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tbl text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY[
+        'suppliers',
+        'categories',
+        'products',
+        'warehouses',
+        'inventories',
+        'customers',
+        'orders',
+        'order_items',
+        'shipments'
+    ]
+    LOOP
+        -- La fila inicial habilita los ETags de la tabla desde ya
+        INSERT INTO table_versions (table_name) VALUES (tbl)
+        ON CONFLICT (table_name) DO NOTHING;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tbl || '_notify_change', tbl);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()',
+            tbl || '_notify_change',
+            tbl
+        );
+    END LOOP;
+END$$;
@@ -0,0 +1,123 @@
+-- Reparación en bloque de textos con doble codificación (UTF-8 leído como Latin-1)
+-- Textos como "CafÃ© con leÃ±a" son UTF-8 interpretado como Latin-1/Windows-1252
+-- y guardado otra vez como UTF-8. Este script crea:
+--   * repair_mojibake(text): deshace esa conversión; si el resultado no es UTF-8
+--     válido devuelve el texto sin cambios.
+--   * repair_text(text): aplica repair_mojibake hasta tres veces a los textos con
+--     secuencias típicas de mojibake (para reparar al copiar, sin UPDATE aparte).
+--   * repair_text_encoding(esquema, tablas, simulacion): repara todas las columnas
+--     de texto de las tablas indicadas (todas las del esquema si es NULL) con un
+--     UPDATE por columna, solo sobre las filas que contienen secuencias típicas de
+--     mojibake, y deja constancia en encoding_repairs de cada columna reparada.
+-- Se ejecuta una vez tras cada carga (scripts/repair_encoding.py); la
+-- sincronización desde raw (sql/sync_from_raw.sql) repara al copiar con
+-- repair_text. Los lectores reciben UTF-8 limpio sin coste.
+
+CREATE TABLE IF NOT EXISTS encoding_repairs (
+    id SERIAL PRIMARY KEY,
+    schema_name VARCHAR(63) NOT NULL,
+    table_name VARCHAR(63) NOT NULL,
+    column_name VARCHAR(63) NOT NULL,
+    rows_repaired BIGINT NOT NULL,
+    repaired_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION repair_mojibake(value text) RETURNS text AS $$
+BEGIN
+    BEGIN
+        RETURN convert_from(convert_to(value, 'LATIN1'), 'UTF8');
+    EXCEPTION WHEN others THEN
+        NULL;
+    END;
+    -- Los bytes 0x80-0x9F leídos como Windows-1252 dan comillas, guiones, etc.
+    BEGIN
+        RETURN convert_from(convert_to(value, 'WIN1252'), 'UTF8');
+    EXCEPTION WHEN others THEN
+        RETURN value;
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT;
+
+-- Primer byte de una secuencia UTF-8 de dos bytes seguido de un byte de
+-- continuación, ambos vistos como Latin-1 o Windows-1252
+CREATE OR REPLACE FUNCTION mojibake_pattern() RETURNS text AS $$
+    SELECT '[Â-ß][\u0080-¿€‚ƒ„…'
+           '†‡ˆ‰Š‹ŒŽ‘’“”•'
+           '–—˜™š›œžŸ]'::text;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION repair_text(value text) RETURNS text AS $$
+DECLARE
+    repaired text;
+BEGIN
+    -- Mismo criterio que repair_text_encoding, valor a valor
+    FOR pass IN 1..3 LOOP
+        EXIT WHEN value !~ mojibake_pattern();
+        repaired := repair_mojibake(value);
+        EXIT WHEN repaired = value;
+        value := repaired;
+    END LOOP;
+    RETURN value;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT;
+
+CREATE OR REPLACE FUNCTION repair_text_encoding(
+    target_schema text DEFAULT 'public',
+    target_tables text[] DEFAULT NULL,
+    dry_run boolean DEFAULT false
+) RETURNS TABLE (repaired_table text, repaired_column text, rows_repaired bigint) AS $$
+DECLARE
+    mojibake CONSTANT text := mojibake_pattern();
+    col record;
+    affected bigint;
+    total bigint;
+    pass int;
+BEGIN
+    FOR col IN
+        SELECT c.table_name::text AS tbl, c.column_name::text AS colname
+        FROM information_schema.columns c
+        JOIN information_schema.tables t
+          ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = target_schema
+          AND t.table_type = 'BASE TABLE'
+          AND c.data_type IN ('character varying', 'text', 'character')
+          AND c.table_name <> 'encoding_repairs'
+          AND (target_tables IS NULL OR c.table_name = ANY (target_tables))
+        ORDER BY c.table_name, c.ordinal_position
+    LOOP
+        IF dry_run THEN
+            EXECUTE format(
+                'SELECT count(*) FROM %I.%I WHERE %I ~ %L AND repair_mojibake(%I) <> %I',
+                target_schema, col.tbl, col.colname, mojibake, col.colname, col.colname
+            ) INTO total;
+        ELSE
+            -- Hasta tres pasadas para textos convertidos más de una vez
+            total := 0;
+            FOR pass IN 1..3 LOOP
+                EXECUTE format(
+                    'UPDATE %I.%I SET %I = repair_mojibake(%I) '
+                    'WHERE %I ~ %L AND repair_mojibake(%I) <> %I',
+                    target_schema, col.tbl, col.colname, col.colname,
+                    col.colname, mojibake, col.colname, col.colname
+                );
+                GET DIAGNOSTICS affected = ROW_COUNT;
+                EXIT WHEN affected = 0;
+                IF pass = 1 THEN
+                    total := affected;
+                END IF;
+            END LOOP;
+            IF total > 0 THEN
+                INSERT INTO encoding_repairs (schema_name, table_name, column_name, rows_repaired)
+                VALUES (target_schema, col.tbl, col.colname, total);
+            END IF;
+        END IF;
+
+        IF total > 0 THEN
+            repaired_table := col.tbl;
+            repaired_column := col.colname;
+            rows_repaired := total;
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
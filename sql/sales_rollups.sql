@@ -0,0 +1,128 @@
+-- Tablas de resumen diario de ventas y disparadores que marcan los días a recalcular
+-- Ejecuta este script después de sql/schema.sql (y de sql/change_notifications.sql
+-- si se usa). Los disparadores no recalculan nada: solo apuntan en
+-- rollup_dirty_days las fechas de pedido afectadas por cada sentencia, usando las
+-- tablas de transición, de modo que una carga masiva cuesta un único INSERT por
+-- sentencia. Después `python -m app.manage refresh-rollups` (o la propia API con
+-- SALES_ROLLUPS=1) recalcula solo esos días. Para poblar las tablas la primera
+-- vez: `python -m app.manage rebuild-rollups`.
+--
+-- Los disparadores marcan con ON CONFLICT DO UPDATE y no con DO NOTHING: así la
+-- transacción que escribe bloquea la marca del día hasta su commit aunque ya
+-- existiera, y el recálculo (SELECT ... FOR UPDATE SKIP LOCKED) la deja en la
+-- cola en lugar de borrarla y recalcular el día sin ver esas filas.
+
+CREATE TABLE IF NOT EXISTS daily_sales (
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    customer_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    status VARCHAR(40) NOT NULL,
+    quantity BIGINT NOT NULL,
+    total_sales NUMERIC(14, 2) NOT NULL,
+    line_count INT NOT NULL,
+    PRIMARY KEY (day, product_id, customer_id, warehouse_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS ix_daily_sales_product_id ON daily_sales(product_id);
+CREATE INDEX IF NOT EXISTS ix_daily_sales_customer_id ON daily_sales(customer_id);
+
+CREATE TABLE IF NOT EXISTS daily_order_totals (
+    day DATE NOT NULL,
+    customer_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    status VARCHAR(40) NOT NULL,
+    order_count INT NOT NULL,
+    total_amount NUMERIC(14, 2) NOT NULL,
+    PRIMARY KEY (day, customer_id, warehouse_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS ix_daily_order_totals_customer_id ON daily_order_totals(customer_id);
+
+CREATE TABLE IF NOT EXISTS rollup_dirty_days (
+    day DATE PRIMARY KEY,
+    marked_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- orders: la fecha está en la propia fila (la antigua y la nueva en un UPDATE)
+CREATE OR REPLACE FUNCTION rollup_mark_orders() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_dirty_days (day)
+        SELECT DISTINCT order_date FROM new_rows
+        ON CONFLICT (day) DO UPDATE SET marked_at = now();
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_dirty_days (day)
+        SELECT DISTINCT order_date FROM old_rows
+        ON CONFLICT (day) DO UPDATE SET marked_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- order_items y shipments: la fecha es la de su pedido
+CREATE OR REPLACE FUNCTION rollup_mark_order_children() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_dirty_days (day)
+        SELECT DISTINCT o.order_date FROM new_rows r JOIN orders o ON o.id = r.order_id
+        ON CONFLICT (day) DO UPDATE SET marked_at = now();
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_dirty_days (day)
+        SELECT DISTINCT o.order_date FROM old_rows r JOIN orders o ON o.id = r.order_id
+        ON CONFLICT (day) DO UPDATE SET marked_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tbl text;
+    fn text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['orders', 'order_items', 'shipments']
+    LOOP
+        fn := CASE WHEN tbl = 'orders' THEN 'rollup_mark_orders' ELSE 'rollup_mark_order_children' END;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tbl || '_rollup_insert', tbl);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tbl || '_rollup_update', tbl);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tbl || '_rollup_delete', tbl);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            tbl || '_rollup_insert', tbl, fn
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON %I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            tbl || '_rollup_update', tbl, fn
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            tbl || '_rollup_delete', tbl, fn
+        );
+    END LOOP;
+
+    -- Con sql/change_notifications.sql instalado, las tablas de resumen también
+    -- publican avisos y llevan contador de versión (ETags de /analytics)
+    IF to_regproc('notify_table_change') IS NOT NULL THEN
+        FOREACH tbl IN ARRAY ARRAY['daily_sales', 'daily_order_totals']
+        LOOP
+            INSERT INTO table_versions (table_name) VALUES (tbl)
+            ON CONFLICT (table_name) DO NOTHING;
+
+            EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tbl || '_notify_change', tbl);
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()',
+                tbl || '_notify_change',
+                tbl
+            );
+        END LOOP;
+    END IF;
+END$$;
@@ -92,3 +92,9 @@ CREATE INDEX idx_inventory_product ON inventories(product_id);
 CREATE INDEX idx_inventory_warehouse ON inventories(warehouse_id);
 CREATE INDEX idx_orders_status ON orders(status);
 CREATE INDEX idx_shipments_status ON shipments(delivery_status);
+CREATE INDEX idx_customers_city ON customers(city);
+CREATE INDEX idx_orders_customer ON orders(customer_id);
+CREATE INDEX idx_orders_date ON orders(order_date);
+CREATE INDEX idx_order_items_order ON order_items(order_id);
+CREATE INDEX idx_order_items_product ON order_items(product_id);
+CREATE INDEX idx_shipments_order ON shipments(order_id);
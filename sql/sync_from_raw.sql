@@ -0,0 +1,125 @@
+-- Sincronización incremental de tablas entre esquemas (distributor_raw → public)
+-- Requiere sql/repair_encoding.sql (usa repair_text). Crea:
+--   * sync_table_rows(origen, destino, tabla, clave, lote): deja la tabla destino
+--     igual que la de origen aplicando solo las diferencias. Borra las filas cuya
+--     clave ya no está en origen e inserta o actualiza (INSERT ... ON CONFLICT) por
+--     lotes de claves las filas nuevas o cuyo hash (md5 de la fila) cambió. Los
+--     textos se copian ya reparados con repair_text, así que una fila reparada no
+--     cuenta como cambiada en la siguiente pasada. Devuelve las filas insertadas,
+--     actualizadas y borradas.
+-- Si la tabla destino no existe se crea con la estructura, índices y clave
+-- primaria de la de origen; si le faltan columnas se añaden, y si no tiene clave
+-- primaria (las creadas con CREATE TABLE AS) se le añade. Nunca se borra ni se
+-- recrea la tabla, de modo que sus índices, estadísticas y permisos se conservan
+-- y los lectores siguen consultándola mientras se sincroniza.
+
+CREATE OR REPLACE FUNCTION sync_table_rows(
+    source_schema text,
+    target_schema text,
+    target_table text,
+    key_column text DEFAULT 'id',
+    batch_size int DEFAULT 5000
+) RETURNS TABLE (synced_table text, inserted bigint, updated bigint, deleted bigint) AS $$
+DECLARE
+    source_rel CONSTANT text := format('%I.%I', source_schema, target_table);
+    target_rel CONSTANT text := format('%I.%I', target_schema, target_table);
+    col record;
+    columns text;
+    source_values text;
+    target_values text;
+    assignments text;
+    last_key bigint;
+    batch_last bigint;
+    batch_inserted bigint;
+    batch_updated bigint;
+BEGIN
+    IF to_regclass(target_rel) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %s (LIKE %s INCLUDING CONSTRAINTS INCLUDING INDEXES)',
+            target_rel, source_rel
+        );
+    END IF;
+
+    FOR col IN
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod) AS coltype
+        FROM pg_attribute a
+        WHERE a.attrelid = source_rel::regclass AND a.attnum > 0 AND NOT a.attisdropped
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_attribute t
+              WHERE t.attrelid = target_rel::regclass AND t.attname = a.attname
+                AND NOT t.attisdropped
+          )
+    LOOP
+        EXECUTE format('ALTER TABLE %s ADD COLUMN %I %s', target_rel, col.attname, col.coltype);
+    END LOOP;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = target_rel::regclass AND i.indisunique
+          AND i.indnkeyatts = 1 AND a.attname = key_column
+    ) THEN
+        EXECUTE format('ALTER TABLE %s ADD PRIMARY KEY (%I)', target_rel, key_column);
+    END IF;
+
+    -- Columnas de origen, en su orden; los textos se copian reparados
+    SELECT
+        string_agg(format('%I', a.attname), ', ' ORDER BY a.attnum),
+        string_agg(
+            CASE WHEN t.typcategory = 'S'
+                THEN format(
+                    'repair_text(s.%I)::%s AS %I',
+                    a.attname, format_type(a.atttypid, a.atttypmod), a.attname
+                )
+                ELSE format('s.%I', a.attname)
+            END,
+            ', ' ORDER BY a.attnum
+        ),
+        string_agg(format('d.%I', a.attname), ', ' ORDER BY a.attnum),
+        string_agg(format('%I = EXCLUDED.%I', a.attname, a.attname), ', ' ORDER BY a.attnum)
+            FILTER (WHERE a.attname <> key_column)
+    INTO columns, source_values, target_values, assignments
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = source_rel::regclass AND a.attnum > 0 AND NOT a.attisdropped;
+
+    EXECUTE format(
+        'DELETE FROM %s d WHERE NOT EXISTS (SELECT 1 FROM %s s WHERE s.%I = d.%I)',
+        target_rel, source_rel, key_column, key_column
+    );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    inserted := 0;
+    updated := 0;
+    last_key := NULL;
+    LOOP
+        -- Un lote de claves de origen; solo se escriben las filas nuevas o distintas.
+        -- xmax = 0 en la fila devuelta indica que se insertó y no se actualizó.
+        EXECUTE format(
+            'WITH src AS ('
+            '    SELECT %3$s FROM %1$s s WHERE $1 IS NULL OR s.%5$I > $1 ORDER BY s.%5$I LIMIT $2'
+            '), changed AS ('
+            '    INSERT INTO %2$s AS t (%4$s)'
+            '    SELECT src.* FROM src LEFT JOIN %2$s d ON d.%5$I = src.%5$I'
+            '    WHERE d.%5$I IS NULL OR md5(ROW(%6$s)::text) <> md5(src::text)'
+            '    ON CONFLICT (%5$I) DO UPDATE SET %7$s'
+            '    RETURNING (t.xmax = 0) AS is_insert'
+            ') SELECT (SELECT max(%5$I) FROM src),'
+            '         (SELECT count(*) FILTER (WHERE is_insert) FROM changed),'
+            '         (SELECT count(*) FILTER (WHERE NOT is_insert) FROM changed)',
+            source_rel, target_rel, source_values, columns, key_column, target_values,
+            coalesce(assignments, format('%I = EXCLUDED.%I', key_column, key_column))
+        )
+        INTO batch_last, batch_inserted, batch_updated
+        USING last_key, batch_size;
+
+        EXIT WHEN batch_last IS NULL;
+        inserted := inserted + batch_inserted;
+        updated := updated + batch_updated;
+        last_key := batch_last;
+    END LOOP;
+
+    synced_table := target_table;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
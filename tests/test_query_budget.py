@@ -0,0 +1,70 @@
+"""Presupuesto de SQL de cada endpoint (``scripts/check_query_budget.py``).
+
+Los mismos casos que el script, sobre una SQLite temporal poblada con
+``generate_dataset.py``, por las rutas ORM y rápida.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import check_query_budget as budgets  # noqa: E402
+
+# Menos partidas que el script: basta para que los listados llenen su limit
+ITEMS = 2_000
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    from fastapi.testclient import TestClient
+
+    from benchmark_api import populate
+
+    database_url = f"sqlite:///{tmp_path_factory.mktemp('query_budget')}/budget.db"
+    previous = {name: os.environ.get(name) for name in ("DATABASE_URL", "DB_CHANGE_LISTENER")}
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DB_CHANGE_LISTENER"] = "0"
+    populate(database_url, ITEMS, seed=42)
+
+    from app import models
+    from app.database import SessionLocal, get_async_engine, get_engine
+    from app.main import app
+
+    try:
+        with TestClient(app) as client:
+            counters = budgets.Counters()
+            budgets.instrument(get_engine(), counters)
+            budgets.instrument(get_async_engine().sync_engine, counters)
+            context = budgets.build_context(SessionLocal, models)
+            yield client, counters, context
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@pytest.mark.parametrize("mode", ["orm", "fast"])
+@pytest.mark.parametrize("budget", budgets.BUDGETS, ids=lambda budget: budget.name)
+def test_budget(api, budget, mode, monkeypatch):
+    from app import fastpath
+
+    client, counters, context = api
+    monkeypatch.setattr(fastpath, "ENABLED", mode == "fast")
+    measurements, errors = budgets.measure(client, counters, budget, context)
+    assert errors == []
+    assert budgets.check(budget, measurements) == []
+
+
+def test_every_get_route_has_a_budget(api):
+    from app.main import app
+
+    client, _, context = api
+    called = {path for budget in budgets.BUDGETS for _, path, _ in budget.calls(context)}
+    assert budgets.uncovered_paths(app.openapi(), called) == []